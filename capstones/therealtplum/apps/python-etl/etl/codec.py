@@ -0,0 +1,183 @@
+"""
+JSON codec for the ETL and websocket hot paths.
+
+Uses the fastest backend installed: orjson, then msgspec, then the stdlib
+json module. Every backend exposes the same functions:
+
+- loads(str | bytes)  -> Python objects
+- dumps(obj)          -> str (compact), falling back to stdlib json for types
+                         the fast backend can't serialise
+- payload_hash(obj)   -> sha256 hex of the sorted-key stdlib encoding, so the
+                         source_payload_hash values already stored in
+                         instruments stay valid whichever backend is active
+
+Decode errors are always raised as json.JSONDecodeError (DecodeError), so
+callers keep their existing except clauses.
+
+Typed decoders (decode_polygon_aggs, decode_kalshi_markets) return plain
+dicts shaped like the TypedDicts below. With msgspec installed
+decode_polygon_aggs decodes straight into its shape, validating field types
+and skipping fields we never read. decode_kalshi_markets always decodes
+untyped: its markets are hashed and stored whole, so every field must
+survive and type drift must not fail the page, whichever backend is active.
+"""
+
+import hashlib
+import json
+from typing import Any, List, Optional, TypedDict, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - depends on environment
+    msgspec = None
+
+BACKEND = "orjson" if orjson is not None else "msgspec" if msgspec is not None else "json"
+
+DecodeError = json.JSONDecodeError
+
+# Built once: json.dumps(..., sort_keys=True) constructs a new encoder per call
+_hash_encoder = json.JSONEncoder(sort_keys=True)
+
+
+# ----------------------------------------------------------------------
+# Payload shapes
+# ----------------------------------------------------------------------
+
+
+class PolygonAgg(TypedDict, total=False):
+    T: str
+    o: Optional[float]
+    h: Optional[float]
+    l: Optional[float]
+    c: Optional[float]
+    v: Optional[float]
+    vw: Optional[float]
+    t: Optional[int]
+    n: Optional[int]
+
+
+class PolygonAggsResponse(TypedDict, total=False):
+    status: str
+    ticker: str
+    resultsCount: int
+    results: List[PolygonAgg]
+
+
+class KalshiMarket(TypedDict, total=False):
+    ticker: str
+    title: Optional[str]
+    subtitle: Optional[str]
+    status: Optional[str]
+    series_ticker: Optional[str]
+    event_ticker: Optional[str]
+    yes_bid: Optional[float]
+    yes_ask: Optional[float]
+    yesBid: Optional[float]
+    yesAsk: Optional[float]
+    yes_price: Optional[float]
+    yesPrice: Optional[float]
+    last_price: Optional[float]
+    volume: Optional[float]
+    total_volume: Optional[float]
+
+
+class KalshiMarketsPage(TypedDict, total=False):
+    cursor: Optional[str]
+    markets: List[KalshiMarket]
+    results: List[KalshiMarket]
+
+
+# ----------------------------------------------------------------------
+# Backend functions
+# ----------------------------------------------------------------------
+
+
+if orjson is not None:
+
+    def loads(data: Union[str, bytes]) -> Any:
+        return orjson.loads(data)  # orjson.JSONDecodeError subclasses json.JSONDecodeError
+
+    def _fast_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+elif msgspec is not None:
+
+    _msgspec_decoder = msgspec.json.Decoder()
+    _msgspec_encoder = msgspec.json.Encoder()
+
+    def loads(data: Union[str, bytes]) -> Any:
+        try:
+            return _msgspec_decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise DecodeError(str(e), data if isinstance(data, str) else "", 0) from e
+
+    def _fast_dumps(obj: Any) -> str:
+        return _msgspec_encoder.encode(obj).decode("utf-8")
+
+else:
+
+    def loads(data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+    _compact_encoder = json.JSONEncoder(separators=(",", ":"))
+
+    def _fast_dumps(obj: Any) -> str:
+        return _compact_encoder.encode(obj)
+
+
+def dumps(obj: Any) -> str:
+    """Serialise to a compact JSON string."""
+    try:
+        return _fast_dumps(obj)
+    except TypeError:
+        # e.g. Decimal / date values the fast backend rejects
+        return json.dumps(obj, default=str, separators=(",", ":"))
+
+
+def payload_hash(obj: Any) -> str:
+    """
+    sha256 hex of json.dumps(obj, sort_keys=True) - byte-identical to the
+    hashes the reference loaders have always stored.
+    """
+    return hashlib.sha256(_hash_encoder.encode(obj).encode("utf-8")).hexdigest()
+
+
+# ----------------------------------------------------------------------
+# Typed decoders
+# ----------------------------------------------------------------------
+
+
+def _typed_loader(shape):
+    if msgspec is None:
+        return loads
+    decoder = msgspec.json.Decoder(shape)
+
+    def decode(data: Union[str, bytes]):
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise DecodeError(str(e), data if isinstance(data, str) else "", 0) from e
+
+    return decode
+
+
+_decode_polygon_aggs = _typed_loader(PolygonAggsResponse)
+
+
+def decode_polygon_aggs(data: Union[str, bytes]) -> PolygonAggsResponse:
+    """Decode a Polygon aggregates response (/prev, grouped daily, range)."""
+    return _decode_polygon_aggs(data)
+
+
+def decode_kalshi_markets(data: Union[str, bytes]) -> KalshiMarketsPage:
+    """
+    Decode a Kalshi GET /markets page. Untyped on purpose: markets are
+    passed through (payload hashes, external_ref), so undeclared fields are
+    kept and a null ticker or string price doesn't reject the page.
+    """
+    return loads(data)
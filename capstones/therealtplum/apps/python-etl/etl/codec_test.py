@@ -0,0 +1,47 @@
+"""
+Unit tests for the JSON codec.
+
+Run with: python -m pytest etl/codec_test.py
+Or: python etl/codec_test.py
+"""
+
+import hashlib
+import json
+import os
+import sys
+import unittest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from etl import codec
+
+
+class TestDecodeKalshiMarkets(unittest.TestCase):
+    def test_keeps_undeclared_fields_and_type_drift(self):
+        page = codec.decode_kalshi_markets(
+            b'{"cursor": "abc", "markets": ['
+            b'{"ticker": "A", "yes_bid": 40, "rules_primary": "r", "custom_strike": {"x": 1}},'
+            b'{"ticker": null, "yes_bid": "41"}'
+            b"]}"
+        )
+        self.assertEqual(page["cursor"], "abc")
+        self.assertEqual(page["markets"][0]["rules_primary"], "r")
+        self.assertEqual(page["markets"][0]["custom_strike"], {"x": 1})
+        self.assertIsNone(page["markets"][1]["ticker"])
+        self.assertEqual(page["markets"][1]["yes_bid"], "41")
+
+    def test_bad_json_raises_decode_error(self):
+        with self.assertRaises(codec.DecodeError):
+            codec.decode_kalshi_markets(b"{not json")
+
+
+class TestPayloadHash(unittest.TestCase):
+    def test_matches_stdlib_sorted_encoding(self):
+        obj = {"b": 1, "a": [1, 2, {"d": None, "c": "x"}]}
+        expected = hashlib.sha256(json.dumps(obj, sort_keys=True).encode("utf-8")).hexdigest()
+        self.assertEqual(codec.payload_hash(obj), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,237 @@
+"""
+Running daily OHLCV bars built from repeated price snapshots.
+
+Snapshot jobs (kalshi_market_data) only see a point-in-time mid and a
+cumulative contract volume. DailyBarAccumulator folds any number of those
+snapshots (or stream updates) into one bar per (instrument_id, price_date):
+first / max / min / last price, plus the volume traded since the previous
+observation. upsert_daily_bars() then merges the bars into
+instrument_price_daily in one statement:
+
+- open:   kept from the first write of the day
+- high:   GREATEST(stored, new)
+- low:    LEAST(stored, new)
+- close:  latest
+- volume: stored + delta
+
+so bars keep accumulating across runs instead of being overwritten.
+
+Volume deltas need the last cumulative volume seen for each instrument.
+Within a process the accumulator tracks it; across runs it is kept in
+instrument_volume_baseline (services/db/schema_daily_bars.sql), written by
+save_volume_baseline() in the same transaction as the bar merge, so a
+failed run can't leave bars and baseline out of step. An instrument with
+no saved baseline is seeded from its stored bar for the day (e.g. a flat
+mode row holding the cumulative volume); with neither, its first
+observation contributes 0 volume.
+"""
+
+import logging
+from datetime import date
+from typing import Dict, List, Optional, Set
+
+from psycopg2.extras import execute_values
+
+log = logging.getLogger(__name__)
+
+
+class DailyBar:
+    __slots__ = ("open", "high", "low", "close", "volume")
+
+    def __init__(self, price: float):
+        self.open = self.high = self.low = self.close = price
+        self.volume = 0.0
+
+    def update(self, price: float):
+        if price > self.high:
+            self.high = price
+        if price < self.low:
+            self.low = price
+        self.close = price
+
+
+class DailyBarAccumulator:
+    """
+    Compact per-(instrument_id, price_date) running bars between flushes.
+
+    Usage:
+        acc = DailyBarAccumulator(baseline=load_volume_baseline(cur, "kalshi", date.today()))
+        acc.add(instrument_id, date.today(), mid, cumulative_volume)
+        ...
+        upsert_daily_bars(cur, acc.flush(), "kalshi")
+        save_volume_baseline(cur, acc.updated_volumes(), "kalshi")
+        conn.commit()
+    """
+
+    def __init__(self, baseline: Optional[Dict[int, float]] = None):
+        self._bars: Dict[tuple, DailyBar] = {}
+        # instrument_id -> last cumulative volume observed
+        self.last_volumes: Dict[int, float] = dict(baseline or {})
+        # Instruments observed since construction (their baselines moved)
+        self._observed: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._bars)
+
+    def add(self, instrument_id: int, price_date: date, price: float, cumulative_volume: float = 0):
+        """
+        Fold one observation into the instrument's bar for price_date.
+        Observations without a usable price are ignored (volume carries
+        forward to the next priced one). Kalshi quotes run 1-99 cents, and
+        snapshots of quote-less markets report 0, so prices <= 0 count as
+        missing: merged into a stored bar they would pin low (and open) to 0.
+        """
+        if price is None or price <= 0:
+            return
+
+        key = (instrument_id, price_date)
+        bar = self._bars.get(key)
+        if bar is None:
+            bar = self._bars[key] = DailyBar(price)
+        else:
+            bar.update(price)
+
+        cumulative_volume = float(cumulative_volume or 0)
+        previous = self.last_volumes.get(instrument_id)
+        # A drop means the source reset its counter; don't emit negative volume
+        if previous is not None and cumulative_volume > previous:
+            bar.volume += cumulative_volume - previous
+        self.last_volumes[instrument_id] = cumulative_volume
+        self._observed.add(instrument_id)
+
+    def updated_volumes(self) -> Dict[int, float]:
+        """Last cumulative volumes of the instruments observed, for save_volume_baseline()."""
+        return {instrument_id: self.last_volumes[instrument_id] for instrument_id in self._observed}
+
+    def flush(self) -> List[dict]:
+        """Return the accumulated bars as price rows and start a new window."""
+        rows = [
+            {
+                "instrument_id": instrument_id,
+                "price_date": price_date,
+                "open": bar.open,
+                "high": bar.high,
+                "low": bar.low,
+                "close": bar.close,
+                "volume": bar.volume,
+            }
+            for (instrument_id, price_date), bar in self._bars.items()
+        ]
+        self._bars.clear()
+        return rows
+
+
+def upsert_daily_bars(cur, rows: List[dict], data_source: str):
+    """
+    Merge accumulated bars into instrument_price_daily in one statement
+    (see module docstring for the merge rules).
+    """
+    if not rows:
+        return
+
+    execute_values(
+        cur,
+        """
+        INSERT INTO instrument_price_daily (
+            instrument_id,
+            price_date,
+            open,
+            high,
+            low,
+            close,
+            adj_close,
+            volume,
+            data_source
+        )
+        VALUES %s
+        ON CONFLICT (instrument_id, price_date, data_source)
+        DO UPDATE SET
+            open       = COALESCE(instrument_price_daily.open, EXCLUDED.open),
+            high       = GREATEST(instrument_price_daily.high, EXCLUDED.high),
+            low        = LEAST(instrument_price_daily.low, EXCLUDED.low),
+            close      = EXCLUDED.close,
+            adj_close  = EXCLUDED.adj_close,
+            volume     = COALESCE(instrument_price_daily.volume, 0) + EXCLUDED.volume,
+            updated_at = NOW();
+        """,
+        [
+            (
+                r["instrument_id"],
+                r["price_date"],
+                r["open"],
+                r["high"],
+                r["low"],
+                r["close"],
+                r["close"],  # adj_close = close for these sources
+                r["volume"],
+                data_source,
+            )
+            for r in rows
+        ],
+        page_size=1000,
+    )
+    log.info(f"Merged {len(rows)} accumulated bars into instrument_price_daily")
+
+
+# ----------------------------------------------------------------------
+# Cross-run volume baseline (instrument_volume_baseline)
+# ----------------------------------------------------------------------
+
+
+def load_volume_baseline(cur, data_source: str, price_date: date) -> Dict[int, float]:
+    """
+    instrument_id -> last cumulative volume. Instruments without a saved
+    baseline fall back to the volume of their stored bar for price_date.
+    """
+    cur.execute(
+        """
+        SELECT instrument_id, cumulative_volume
+        FROM instrument_volume_baseline
+        WHERE data_source = %s
+        """,
+        (data_source,),
+    )
+    baseline = {instrument_id: float(volume) for instrument_id, volume in cur.fetchall()}
+    saved = len(baseline)
+
+    cur.execute(
+        """
+        SELECT instrument_id, volume
+        FROM instrument_price_daily
+        WHERE data_source = %s
+          AND price_date = %s
+          AND volume IS NOT NULL
+        """,
+        (data_source, price_date),
+    )
+    for instrument_id, volume in cur.fetchall():
+        baseline.setdefault(instrument_id, float(volume))
+
+    log.info(
+        f"Loaded volume baseline for {len(baseline)} instruments "
+        f"({len(baseline) - saved} seeded from stored bars)"
+    )
+    return baseline
+
+
+def save_volume_baseline(cur, volumes: Dict[int, float], data_source: str):
+    """
+    Upsert instrument_id -> last cumulative volume. Call it in the same
+    transaction as upsert_daily_bars() so both commit (or fail) together.
+    """
+    if not volumes:
+        return
+
+    execute_values(
+        cur,
+        """
+        INSERT INTO instrument_volume_baseline (instrument_id, data_source, cumulative_volume)
+        VALUES %s
+        ON CONFLICT (instrument_id, data_source)
+        DO UPDATE SET
+            cumulative_volume = EXCLUDED.cumulative_volume,
+            updated_at        = NOW();
+        """,
+        [(instrument_id, data_source, volume) for instrument_id, volume in volumes.items()],
+        page_size=1000,
+    )
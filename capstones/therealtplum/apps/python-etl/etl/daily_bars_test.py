@@ -0,0 +1,90 @@
+"""
+Unit tests for the daily bar accumulator.
+
+Run with: python -m pytest etl/daily_bars_test.py
+Or: python etl/daily_bars_test.py
+"""
+
+import os
+import sys
+import unittest
+from datetime import date
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from etl.daily_bars import DailyBarAccumulator, load_volume_baseline
+
+DAY = date(2025, 11, 29)
+
+
+class FakeCursor:
+    """Returns one canned result set per execute()."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.queries = []
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+
+    def fetchall(self):
+        return self.results.pop(0)
+
+
+class TestAccumulator(unittest.TestCase):
+    def test_ohlc(self):
+        acc = DailyBarAccumulator()
+        for price in (50, 55, 45, 52):
+            acc.add(1, DAY, price)
+        [row] = acc.flush()
+        self.assertEqual(
+            (row["open"], row["high"], row["low"], row["close"]),
+            (50, 55, 45, 52),
+        )
+        self.assertEqual(len(acc), 0)
+
+    def test_quoteless_snapshots_are_skipped(self):
+        acc = DailyBarAccumulator()
+        acc.add(1, DAY, 0, 100)
+        acc.add(1, DAY, None, 100)
+        self.assertEqual(acc.flush(), [])
+
+        acc.add(1, DAY, 0, 100)
+        acc.add(1, DAY, 40, 120)
+        acc.add(1, DAY, 0, 130)
+        acc.add(1, DAY, 42, 150)
+        [row] = acc.flush()
+        # Neither open nor low is pinned to 0
+        self.assertEqual((row["open"], row["low"], row["close"]), (40, 40, 42))
+        # Volume of skipped snapshots carries forward to the next priced one
+        self.assertEqual(row["volume"], 30)
+
+    def test_volume_deltas(self):
+        acc = DailyBarAccumulator(baseline={1: 100.0})
+        acc.add(1, DAY, 50, 110)
+        acc.add(1, DAY, 51, 125)
+        # Counter reset: no negative volume
+        acc.add(1, DAY, 52, 5)
+        acc.add(2, DAY, 30, 999)  # no baseline: first observation counts 0
+        rows = {r["instrument_id"]: r for r in acc.flush()}
+        self.assertEqual(rows[1]["volume"], 25)
+        self.assertEqual(rows[2]["volume"], 0)
+        self.assertEqual(acc.updated_volumes(), {1: 5.0, 2: 999.0})
+
+    def test_updated_volumes_only_observed(self):
+        acc = DailyBarAccumulator(baseline={1: 100.0, 2: 200.0})
+        acc.add(2, DAY, 50, 210)
+        self.assertEqual(acc.updated_volumes(), {2: 210.0})
+
+
+class TestLoadBaseline(unittest.TestCase):
+    def test_saved_baseline_beats_stored_bar(self):
+        cur = FakeCursor([(1, 100)], [(1, 7), (2, 40)])
+        baseline = load_volume_baseline(cur, "kalshi", DAY)
+        self.assertEqual(baseline, {1: 100.0, 2: 40.0})
+        self.assertEqual(cur.queries[1][1], ("kalshi", DAY))
+
+
+if __name__ == "__main__":
+    unittest.main()
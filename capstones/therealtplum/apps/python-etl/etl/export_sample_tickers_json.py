@@ -2,7 +2,6 @@ import os
 import sys
 import json
 import logging
-import time
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
@@ -10,6 +9,8 @@ import requests
 import psycopg2
 import psycopg2.extras
 
+from etl import polygon_client
+
 # -------------------------------------------------------------------
 # Config
 # -------------------------------------------------------------------
@@ -21,9 +22,6 @@ POLYGON_API_KEY = os.getenv("POLYGON_API_KEY")
 # How many instruments to export from the latest focus snapshot
 SAMPLE_TICKERS_LIMIT = int(os.getenv("SAMPLE_TICKERS_LIMIT", "100"))
 
-# Small sleep between Polygon API requests to be nice to their API
-POLYGON_REQUEST_SLEEP_SECS = float(os.getenv("POLYGON_REQUEST_SLEEP_SECS", "0.02"))
-
 # Which insight types to treat as "short" and "recent"
 SAMPLE_TICKERS_SHORT_KIND = os.getenv("SAMPLE_TICKERS_SHORT_KIND", "overview")
 SAMPLE_TICKERS_RECENT_KIND = os.getenv("SAMPLE_TICKERS_RECENT_KIND", "recent")
@@ -79,14 +77,10 @@ def fetch_ticker_snapshot(ticker: str) -> Optional[float]:
         log.warning("POLYGON_API_KEY not set; skipping percentage change fetch from Polygon")
         return None
     
-    url = f"https://api.polygon.io/v2/snapshot/locale/us/markets/stocks/tickers/{ticker}"
-    params = {
-        "apiKey": POLYGON_API_KEY,
-    }
+    url = f"/v2/snapshot/locale/us/markets/stocks/tickers/{ticker}"
     
     try:
-        resp = requests.get(url, params=params, timeout=10)
-        resp.raise_for_status()
+        resp = polygon_client.get(url, timeout=10)
     except requests.exceptions.RequestException as e:
         log.debug(f"ticker={ticker}: request error from Polygon snapshot endpoint: {e}")
         return None
@@ -331,9 +325,6 @@ def main():
                 else:
                     # If Polygon doesn't have it, we'll leave it null and frontend can calculate
                     row["day_over_day_change_percent"] = None
-                
-                if POLYGON_REQUEST_SLEEP_SECS > 0:
-                    time.sleep(POLYGON_REQUEST_SLEEP_SECS)
             log.info("Finished fetching percentage changes from Polygon.")
         else:
             log.info("POLYGON_API_KEY not set; skipping percentage change fetch.")
@@ -0,0 +1,131 @@
+"""
+Shared client for Kalshi's public market-data REST endpoints.
+
+Provides:
+- one pooled keep-alive requests.Session per process
+- a process-wide token-bucket rate limiter (replaces per-job sleeps)
+- iter_market_pages() to walk the cursor-paginated GET /markets listing
+
+Usage:
+    from etl import kalshi_client
+
+    for markets in kalshi_client.iter_market_pages(status="open"):
+        ...
+"""
+
+import os
+import logging
+import threading
+from typing import Any, Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from etl import codec
+from etl.rate_limit import TokenBucket
+
+BASE_URL = os.getenv("KALSHI_BASE_URL", "https://api.elections.kalshi.com/trade-api/v2")
+
+# Public-endpoint request budget for this process (0 = unlimited)
+MAX_REQUESTS_PER_SEC = float(os.getenv("KALSHI_MAX_REQUESTS_PER_SEC", "10"))
+
+# Keep-alive connections held open to the Kalshi API
+POOL_SIZE = int(os.getenv("KALSHI_POOL_SIZE", "8"))
+
+# Markets per /markets page (Kalshi max) and a safety cap on pages per walk
+MARKETS_PAGE_LIMIT = 1000
+MAX_PAGES = 1000
+
+log = logging.getLogger(__name__)
+
+rate_limiter = TokenBucket(MAX_REQUESTS_PER_SEC)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def get(path: str, params: Optional[Dict[str, Any]] = None, timeout: float = 30) -> requests.Response:
+    """
+    GET a Kalshi endpoint (path relative to BASE_URL) through the shared
+    session and rate limiter.
+    """
+    rate_limiter.acquire()
+    resp = get_session().get(f"{BASE_URL}{path}", params=params, timeout=timeout)
+    resp.raise_for_status()
+    return resp
+
+
+def get_json(path: str, params: Optional[Dict[str, Any]] = None, timeout: float = 30) -> Any:
+    """GET a Kalshi endpoint and return the decoded JSON body."""
+    return codec.loads(get(path, params=params, timeout=timeout).content)
+
+
+def iter_market_pages(status: Optional[str] = "open", **filters) -> Iterator[list[dict]]:
+    """
+    Yield each page of markets from GET /markets, following Kalshi's cursor.
+
+    `filters` are passed through as query params (e.g. event_ticker=...,
+    series_ticker=...). This is a public endpoint that doesn't require
+    authentication. A request error ends pagination (after logging) so pages
+    already handled by the caller are kept.
+    """
+    params = {"limit": MARKETS_PAGE_LIMIT}
+    if status:
+        params["status"] = status
+    params.update({k: v for k, v in filters.items() if v})
+
+    cursor = None
+    page = 0
+
+    while True:
+        if cursor:
+            params["cursor"] = cursor
+        else:
+            # Remove cursor on first request
+            params.pop("cursor", None)
+
+        log.info(f"Fetching Kalshi markets page {page + 1} (cursor={cursor})")
+
+        try:
+            data = codec.decode_kalshi_markets(get("/markets", params=params, timeout=30).content)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            log.error(f"Error fetching Kalshi markets: {e}")
+            if getattr(e, "response", None) is not None:
+                log.error(f"Response status: {e.response.status_code}, body: {e.response.text}")
+            return
+
+        # Kalshi API structure may vary - try different response formats
+        markets = data.get("markets", []) or data.get("results", []) or []
+        log.info(f"Received {len(markets)} markets on page {page + 1}")
+
+        if not markets:
+            return
+
+        yield markets
+
+        # Get next cursor for pagination
+        cursor = data.get("cursor")
+        if not cursor:
+            # No more pages
+            return
+
+        page += 1
+
+        # Safety limit to prevent infinite loops
+        if page > MAX_PAGES:
+            log.warning(f"Reached maximum page limit ({MAX_PAGES}), stopping")
+            return
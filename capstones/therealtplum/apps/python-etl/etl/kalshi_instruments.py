@@ -1,14 +1,19 @@
 import os
-import json
-import hashlib
 import logging
-import requests
 import psycopg2
+from psycopg2 import errors
+from psycopg2.extras import execute_values
+
+from etl import codec, kalshi_client
+from etl.kalshi_market_metadata import sync_market_metadata
+from etl.kalshi_ticker_parser import cache_stats
+from etl.payload_hash_cache import PayloadHashCache
+from etl.pipeline import PipelineStage
+from etl.sports_team_dictionary import configure_parser
 
 # Kalshi API configuration
 KALSHI_API_KEY = os.getenv("KALSHI_API_KEY")
 KALSHI_KEY_ID = os.getenv("KALSHI_KEY_ID")
-KALSHI_BASE_URL = os.getenv("KALSHI_BASE_URL", "https://api.elections.kalshi.com/trade-api/v2")
 
 # Note: Kalshi uses RSA-PSS signing for authenticated requests, but public market data
 # endpoints may not require authentication. For now, we'll use public endpoints.
@@ -22,6 +27,21 @@ logging.basicConfig(
 )
 log = logging.getLogger(__name__)
 
+# "bulk": upsert each /markets page with one INSERT ... ON CONFLICT statement
+# "row":  SELECT-then-UPDATE/INSERT per market (original behaviour)
+UPSERT_MODE = os.getenv("KALSHI_INSTRUMENTS_UPSERT_MODE", "bulk").lower()
+
+# Fetch pages on a background thread while earlier pages are being written
+# (see etl.pipeline); "false" runs fetch and write strictly in turn
+PIPELINE = os.getenv("KALSHI_INSTRUMENTS_PIPELINE", "true").lower() in ("1", "true", "yes")
+
+# After the upsert, parse new/changed tickers into kalshi_market_metadata
+# (skipped with a warning until `make db-apply-kalshi-metadata-schema` has
+# created the table)
+PARSE_METADATA = os.getenv("KALSHI_INSTRUMENTS_METADATA", "true").lower() in ("1", "true", "yes")
+
+PRIMARY_SOURCE = "kalshi"
+
 
 def get_conn():
     return psycopg2.connect(DATABASE_URL)
@@ -49,14 +69,14 @@ def compute_payload_hash(market: dict) -> str:
         "series_ticker": market.get("series_ticker"),
         "event_ticker": market.get("event_ticker"),
     }
-    s = json.dumps(relevant, sort_keys=True)
-    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+    return codec.payload_hash(relevant)
 
 
-def upsert_instrument(cur, market: dict):
+def market_row(market: dict) -> dict | None:
     """
-    Upsert a Kalshi market as an instrument.
-    
+    Build the instruments column values for one Kalshi market, or None if
+    the payload has no ticker.
+
     Kalshi markets have:
     - ticker: unique identifier (e.g., "BIDEN-2024")
     - title: market question/title
@@ -64,35 +84,63 @@ def upsert_instrument(cur, market: dict):
     - status: market status (open, closed, etc.)
     - series_ticker: series identifier
     - event_ticker: event identifier
+
+    Kalshi-specific fields go into external_ref, serialised here so the
+    batch writer can send it straight to the JSONB column.
     """
     ticker = market.get("ticker")
     if not ticker:
-        return
+        return None
 
-    # Use title as name, fallback to ticker
-    name = market.get("title") or market.get("subtitle") or ticker
-    
-    asset_class = normalize_asset_class(market)
-    
     # Kalshi is a US-based exchange
-    exchange = "KALSHI"
-    currency_code = "USD"
-    region = "US"
-    country_code = "US"
-    
-    primary_source = "kalshi"
-    status = "active" if market.get("status") in ["open", "active"] else "inactive"
-    
-    payload_hash = compute_payload_hash(market)
-    
-    # Store Kalshi-specific data in external_ref JSONB
-    external_ref = {
-        "kalshi_ticker": ticker,
-        "series_ticker": market.get("series_ticker"),
-        "event_ticker": market.get("event_ticker"),
-        "market_status": market.get("status"),
-        "subtitle": market.get("subtitle"),
+    return {
+        "ticker": ticker,
+        # Use title as name, fallback to ticker
+        "name": market.get("title") or market.get("subtitle") or ticker,
+        "asset_class": normalize_asset_class(market),
+        "exchange": "KALSHI",
+        "currency_code": "USD",
+        "region": "US",
+        "country_code": "US",
+        "primary_source": PRIMARY_SOURCE,
+        "status": "active" if market.get("status") in ["open", "active"] else "inactive",
+        "external_ref": codec.dumps({
+            "kalshi_ticker": ticker,
+            "series_ticker": market.get("series_ticker"),
+            "event_ticker": market.get("event_ticker"),
+            "market_status": market.get("status"),
+            "subtitle": market.get("subtitle"),
+        }),
+        "source_payload_hash": compute_payload_hash(market),
     }
+
+
+def upsert_instrument(cur, market: dict, hash_cache: PayloadHashCache | None = None):
+    """
+    Upsert a single Kalshi market as an instrument (row mode).
+    """
+    row = market_row(market)
+    if row is None:
+        return
+
+    ticker = row["ticker"]
+    name = row["name"]
+    asset_class = row["asset_class"]
+    exchange = row["exchange"]
+    currency_code = row["currency_code"]
+    region = row["region"]
+    country_code = row["country_code"]
+    primary_source = row["primary_source"]
+    status = row["status"]
+    external_ref = row["external_ref"]
+    payload_hash = row["source_payload_hash"]
+    
+    # Skip without a round trip if the preloaded hash already matches
+    if hash_cache is not None:
+        if hash_cache.is_unchanged(ticker, payload_hash):
+            return
+        # Remembered only once the page's transaction commits
+        hash_cache.stage(ticker, payload_hash)
     
     # Check existing hash for (ticker, primary_source)
     cur.execute(
@@ -104,10 +152,10 @@ def upsert_instrument(cur, market: dict):
         """,
         (ticker, primary_source),
     )
-    row = cur.fetchone()
+    existing = cur.fetchone()
     
-    if row is not None:
-        existing_hash = row[0]
+    if existing is not None:
+        existing_hash = existing[0]
         # If nothing changed, skip
         if existing_hash == payload_hash:
             return
@@ -138,7 +186,7 @@ def upsert_instrument(cur, market: dict):
                 region,
                 country_code,
                 status,
-                json.dumps(external_ref),
+                external_ref,
                 payload_hash,
                 ticker,
                 primary_source,
@@ -174,83 +222,198 @@ def upsert_instrument(cur, market: dict):
                 country_code,
                 primary_source,
                 status,
-                json.dumps(external_ref),
+                external_ref,
                 payload_hash,
             ),
         )
 
 
+def upsert_markets_page(cur, markets: list[dict], hash_cache: PayloadHashCache | None = None) -> dict:
+    """
+    Upsert one /markets page with a single INSERT ... ON CONFLICT statement
+    (execute_values) that only touches rows whose source_payload_hash changed.
+
+    Conflicts resolve on the instruments unique key
+    (ticker, asset_class, primary_source).
+
+    With a preloaded hash_cache, unchanged markets are dropped before the
+    statement is built and counted as unchanged without touching the DB.
+
+    Returns counts: {"sent", "inserted", "updated", "unchanged"}.
+    """
+    # Last occurrence wins if a ticker repeats within a page;
+    # ON CONFLICT cannot touch the same row twice in one statement.
+    rows = {}
+    skipped = 0
+    for market in markets:
+        row = market_row(market)
+        if row is None:
+            continue
+        if hash_cache is not None and hash_cache.is_unchanged(row["ticker"], row["source_payload_hash"]):
+            skipped += 1
+            continue
+        rows[row["ticker"]] = row
+
+    counts = {"sent": len(rows), "inserted": 0, "updated": 0, "unchanged": skipped}
+    if not rows:
+        return counts
+
+    written = execute_values(
+        cur,
+        """
+        INSERT INTO instruments (
+            ticker,
+            name,
+            asset_class,
+            exchange,
+            currency_code,
+            region,
+            country_code,
+            primary_source,
+            status,
+            external_ref,
+            source_last_seen_at,
+            source_payload_hash
+        )
+        VALUES %s
+        ON CONFLICT (ticker, asset_class, primary_source)
+        DO UPDATE SET
+            name                = EXCLUDED.name,
+            exchange            = EXCLUDED.exchange,
+            currency_code       = EXCLUDED.currency_code,
+            region              = EXCLUDED.region,
+            country_code        = EXCLUDED.country_code,
+            status              = EXCLUDED.status,
+            external_ref        = EXCLUDED.external_ref,
+            source_last_seen_at = NOW(),
+            source_payload_hash = EXCLUDED.source_payload_hash
+        WHERE instruments.source_payload_hash IS DISTINCT FROM EXCLUDED.source_payload_hash
+        RETURNING (xmax = 0) AS inserted
+        """,
+        [
+            (
+                row["ticker"],
+                row["name"],
+                row["asset_class"],
+                row["exchange"],
+                row["currency_code"],
+                row["region"],
+                row["country_code"],
+                row["primary_source"],
+                row["status"],
+                row["external_ref"],
+                row["source_payload_hash"],
+            )
+            for row in rows.values()
+        ],
+        template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb, NOW(), %s)",
+        page_size=len(rows),
+        fetch=True,
+    )
+
+    counts["inserted"] = sum(1 for (inserted,) in written if inserted)
+    counts["updated"] = len(written) - counts["inserted"]
+    counts["unchanged"] += counts["sent"] - len(written)
+
+    if hash_cache is not None:
+        for row in rows.values():
+            hash_cache.stage(row["ticker"], row["source_payload_hash"])
+    return counts
+
+
+# ----------------------------------------------------------------------
+# Fetch all markets from Kalshi
+# ----------------------------------------------------------------------
+
+
+def sync_metadata(conn):
+    """
+    Parse new/changed tickers into kalshi_market_metadata and commit. A
+    missing table (schema not applied yet) is logged and skipped, since the
+    instruments themselves are already committed.
+    """
+    # Team ids come from the sports_teams dictionary (disk-cached)
+    dictionary = configure_parser()
+    try:
+        parsed = sync_market_metadata(
+            conn,
+            PRIMARY_SOURCE,
+            dictionary_stamp=dictionary.stamp if dictionary is not None else None,
+        )
+    except errors.UndefinedTable as e:
+        conn.rollback()
+        log.warning(
+            f"Skipping ticker metadata, run `make db-apply-kalshi-metadata-schema` "
+            f"or set KALSHI_INSTRUMENTS_METADATA=false: {e}"
+        )
+        return
+    conn.commit()
+    stats = cache_stats()
+    log.info(
+        f"Parsed ticker metadata for {parsed} new or changed markets "
+        f"(parse cache: {stats['hits']} hits, {stats['misses']} misses, "
+        f"hit rate {stats['hit_rate']:.1%}, size {stats['size']}/{stats['maxsize']})"
+    )
+
+
 def fetch_all_markets():
     """
-    Fetch all active markets from Kalshi API.
-    
-    Kalshi API endpoint: GET /markets
-    This is a public endpoint that doesn't require authentication.
-    
-    Note: Kalshi API uses cursor-based pagination. The response includes
-    a 'cursor' field that should be used for the next page.
+    Fetch all active markets from Kalshi API and upsert them as instruments.
+
+    Kalshi API endpoint: GET /markets (cursor-paginated, see
+    kalshi_client.iter_market_pages).
+    Pages flow through a PipelineStage so the next fetch overlaps the
+    current page's write unless KALSHI_INSTRUMENTS_PIPELINE is off.
     """
-    base_url = f"{KALSHI_BASE_URL}/markets"
-    params = {
-        "limit": 1000,  # Max per page
-        "status": "open",  # Only fetch open markets
-    }
-    
     conn = get_conn()
     conn.autocommit = False
     cur = conn.cursor()
     
     updates = 0
-    cursor = None
-    page = 0
+    totals = {"inserted": 0, "updated": 0, "unchanged": 0}
     
     try:
-        while True:
-            if cursor:
-                params["cursor"] = cursor
+        hash_cache = PayloadHashCache.load(conn, PRIMARY_SOURCE)
+
+        stage = PipelineStage(
+            kalshi_client.iter_market_pages(status="open"),
+            name="kalshi_instruments",
+            threaded=PIPELINE,
+        )
+
+        for page, markets in enumerate(stage, start=1):
+            if UPSERT_MODE == "bulk":
+                counts = upsert_markets_page(cur, markets, hash_cache)
+                for key in totals:
+                    totals[key] += counts[key]
+                log.info(
+                    f"Page {page}: sent {counts['sent']}, inserted {counts['inserted']}, "
+                    f"updated {counts['updated']}, unchanged {counts['unchanged']}"
+                )
             else:
-                # Remove cursor on first request
-                params.pop("cursor", None)
-            
-            log.info(f"Fetching Kalshi markets page {page + 1} (cursor={cursor})")
-            
-            try:
-                resp = requests.get(base_url, params=params, timeout=30)
-                resp.raise_for_status()
-                data = resp.json()
-            except requests.exceptions.RequestException as e:
-                log.error(f"Error fetching Kalshi markets: {e}")
-                if hasattr(e, 'response') and e.response is not None:
-                    log.error(f"Response status: {e.response.status_code}, body: {e.response.text}")
-                break
-            
-            # Kalshi API structure may vary - try different response formats
-            markets = data.get("markets", []) or data.get("results", []) or []
-            log.info(f"Received {len(markets)} markets on page {page + 1}")
-            
-            if not markets:
-                break
-            
-            for market in markets:
-                upsert_instrument(cur, market)
-                updates += 1
-            
+                for market in markets:
+                    upsert_instrument(cur, market, hash_cache)
+
+            updates += len(markets)
             conn.commit()
-            
-            # Get next cursor for pagination
-            cursor = data.get("cursor")
-            if not cursor:
-                # No more pages
-                break
-            
-            page += 1
-            
-            # Safety limit to prevent infinite loops
-            if page > 1000:
-                log.warning("Reached maximum page limit (1000), stopping")
-                break
+            if hash_cache is not None:
+                hash_cache.commit()
+        
+        if PARSE_METADATA:
+            sync_metadata(conn)
         
         log.info(f"Done. Upserted/checked ~{updates} Kalshi markets.")
+        log.info(stage.stats.summary())
+        if UPSERT_MODE == "bulk":
+            log.info(
+                f"Totals: inserted {totals['inserted']}, updated {totals['updated']}, "
+                f"unchanged {totals['unchanged']}"
+            )
+        if hash_cache is not None:
+            log.info(
+                f"Payload hash cache: {hash_cache.skipped} unchanged skipped locally, "
+                f"{hash_cache.passed} sent to DB"
+            )
     
     except Exception as e:
         log.exception(f"Error in fetch_all_markets: {e}")
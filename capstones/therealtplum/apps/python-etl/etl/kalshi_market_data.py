@@ -1,14 +1,19 @@
 import os
 import json
 import logging
-import time
 from datetime import datetime, timezone, date
 
 import requests
 import psycopg2
 from psycopg2.extras import execute_batch
 
-KALSHI_BASE_URL = os.getenv("KALSHI_BASE_URL", "https://api.elections.kalshi.com/trade-api/v2")
+from etl import kalshi_client
+from etl.daily_bars import (
+    DailyBarAccumulator,
+    load_volume_baseline,
+    save_volume_baseline,
+    upsert_daily_bars,
+)
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgres://app:app@db:5432/fmhub")
 
@@ -18,11 +23,24 @@ logging.basicConfig(
 )
 log = logging.getLogger(__name__)
 
-# How many instruments to process in one run
-MAX_INSTRUMENTS = int(os.getenv("KALSHI_MAX_INSTRUMENTS", "500"))
+# "bulk":   walk the paginated /markets listing and price every market on
+#           each page (cost scales with pages, no instrument cap)
+# "ticker": GET /markets/{ticker} per instrument (original behaviour)
+MODE = os.getenv("KALSHI_MARKET_DATA_MODE", "bulk").lower()
+
+# Optional /markets filters for bulk mode
+EVENT_TICKER = os.getenv("KALSHI_MARKET_DATA_EVENT_TICKER") or None
+SERIES_TICKER = os.getenv("KALSHI_MARKET_DATA_SERIES_TICKER") or None
 
-# Small sleep between requests
-REQUEST_SLEEP_SECS = float(os.getenv("KALSHI_SLEEP_SECS", "0.1"))
+# "flat":       write the current mid as open=high=low=close (overwrites)
+# "accumulate": merge each snapshot into a running daily bar (keep open,
+#               widen high/low, latest close, add volume traded since the
+#               previous snapshot); see etl.daily_bars. Needs
+#               services/db/schema_daily_bars.sql
+BAR_MODE = os.getenv("KALSHI_MARKET_DATA_BAR_MODE", "flat").lower()
+
+# How many instruments to process in one run (ticker mode only)
+MAX_INSTRUMENTS = int(os.getenv("KALSHI_MAX_INSTRUMENTS", "500"))
 
 # Flush to DB every N price rows
 BATCH_SIZE = int(os.getenv("KALSHI_BATCH_SIZE", "100"))
@@ -54,6 +72,23 @@ def fetch_kalshi_instruments(cur):
     return rows
 
 
+def fetch_kalshi_instrument_ids(cur) -> dict[str, int]:
+    """
+    Map ticker -> instrument_id for every active Kalshi instrument (no cap).
+    """
+    cur.execute(
+        """
+        SELECT ticker, id
+        FROM instruments
+        WHERE primary_source = 'kalshi'
+          AND status = 'active'
+        """
+    )
+    ids = {ticker: instrument_id for ticker, instrument_id in cur.fetchall()}
+    log.info(f"Loaded {len(ids)} active Kalshi instrument ids")
+    return ids
+
+
 def upsert_market_data_rows(cur, rows):
     """
     Upsert into instrument_price_daily.
@@ -123,38 +158,14 @@ def upsert_market_data_rows(cur, rows):
     log.info(f"Upserted {len(rows)} rows into instrument_price_daily")
 
 
-def fetch_market_data(ticker: str) -> dict | None:
+def market_to_price(market: dict) -> dict:
     """
-    Fetch current market data for a Kalshi market.
-    
-    Kalshi API endpoint: GET /markets/{ticker}
-    Returns current yes price, volume, and order book data.
-    
+    Turn one Kalshi market payload (from /markets or /markets/{ticker}) into
+    a daily price row.
+
     Note: Kalshi markets are binary (yes/no). The yes price represents
     the probability (0-100) that the event will occur.
     """
-    url = f"{KALSHI_BASE_URL}/markets/{ticker}"
-    
-    try:
-        resp = requests.get(url, timeout=20)
-        resp.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        log.warning(f"ticker={ticker}: request error from Kalshi API: {e}")
-        return None
-    
-    try:
-        data = resp.json()
-    except json.JSONDecodeError as e:
-        log.warning(f"ticker={ticker}: failed to decode JSON: {e}")
-        return None
-    
-    # Kalshi API may return market directly or nested
-    market = data.get("market") or data
-    
-    if not market or not isinstance(market, dict):
-        log.warning(f"ticker={ticker}: no market data in response")
-        return None
-    
     # Extract current yes price (0-100, representing probability)
     # Kalshi markets have a "yes" and "no" side
     # The yes price is the current probability estimate
@@ -193,6 +204,120 @@ def fetch_market_data(ticker: str) -> dict | None:
     }
 
 
+def fetch_market_data(ticker: str) -> dict | None:
+    """
+    Fetch current market data for a Kalshi market.
+    
+    Kalshi API endpoint: GET /markets/{ticker}
+    Returns current yes price, volume, and order book data.
+    """
+    try:
+        data = kalshi_client.get_json(f"/markets/{ticker}", timeout=20)
+    except requests.exceptions.RequestException as e:
+        log.warning(f"ticker={ticker}: request error from Kalshi API: {e}")
+        return None
+    except json.JSONDecodeError as e:
+        log.warning(f"ticker={ticker}: failed to decode JSON: {e}")
+        return None
+    
+    # Kalshi API may return market directly or nested
+    market = data.get("market") or data
+    
+    if not market or not isinstance(market, dict):
+        log.warning(f"ticker={ticker}: no market data in response")
+        return None
+    
+    return market_to_price(market)
+
+
+def load_per_ticker(conn, cur, bars: DailyBarAccumulator | None = None) -> int:
+    """
+    Ticker mode: one GET /markets/{ticker} per instrument, capped at
+    KALSHI_MAX_INSTRUMENTS. With `bars`, snapshots are folded into the
+    accumulator instead of written. Returns rows priced.
+    """
+    instruments = fetch_kalshi_instruments(cur)
+    batch_rows = []
+    total_rows = 0
+    
+    for idx, (instrument_id, ticker) in enumerate(instruments, start=1):
+        if idx % 50 == 0:
+            log.info(f"Processed {idx}/{len(instruments)} instruments so far...")
+        
+        market_data = fetch_market_data(ticker)
+        if not market_data:
+            continue
+        
+        total_rows += 1
+        if bars is not None:
+            bars.add(instrument_id, market_data["price_date"], market_data["close"], market_data["volume"])
+            continue
+        
+        batch_rows.append({"instrument_id": instrument_id, **market_data})
+        
+        # Flush periodically
+        if len(batch_rows) >= BATCH_SIZE:
+            log.info(f"Flushing batch of {len(batch_rows)} market data rows to DB...")
+            upsert_market_data_rows(cur, batch_rows)
+            conn.commit()
+            batch_rows.clear()
+    
+    # Final flush
+    if batch_rows:
+        log.info(f"Flushing final batch of {len(batch_rows)} market data rows to DB...")
+        upsert_market_data_rows(cur, batch_rows)
+        conn.commit()
+        batch_rows.clear()
+    
+    return total_rows
+
+
+def load_bulk_snapshot(conn, cur, bars: DailyBarAccumulator | None = None) -> int:
+    """
+    Bulk mode: walk the /markets listing (optionally filtered by event or
+    series) and price every market on each page that matches an active
+    Kalshi instrument, one batched upsert and commit per page. With `bars`,
+    snapshots are folded into the accumulator instead of written.
+    Returns rows priced.
+    """
+    instrument_ids = fetch_kalshi_instrument_ids(cur)
+    if not instrument_ids:
+        log.info("No active Kalshi instruments; nothing to do.")
+        return 0
+    
+    total_rows = 0
+    unmatched = 0
+    pages = kalshi_client.iter_market_pages(
+        status="open",
+        event_ticker=EVENT_TICKER,
+        series_ticker=SERIES_TICKER,
+    )
+    for page, markets in enumerate(pages, start=1):
+        # Last occurrence wins; one statement can't upsert the same key twice
+        rows = {}
+        for market in markets:
+            instrument_id = instrument_ids.get(market.get("ticker"))
+            if instrument_id is None:
+                unmatched += 1
+                continue
+            rows[instrument_id] = {"instrument_id": instrument_id, **market_to_price(market)}
+        
+        if bars is not None:
+            for row in rows.values():
+                bars.add(row["instrument_id"], row["price_date"], row["close"], row["volume"])
+        elif rows:
+            upsert_market_data_rows(cur, list(rows.values()))
+            conn.commit()
+        total_rows += len(rows)
+        log.info(f"Page {page}: priced {len(rows)} of {len(markets)} markets")
+    
+    log.info(
+        f"Bulk snapshot matched {total_rows} of {len(instrument_ids)} active instruments "
+        f"({unmatched} listed markets have no instrument)"
+    )
+    return total_rows
+
+
 def run():
     """
     Main ETL function to fetch and store Kalshi market data.
@@ -202,48 +327,23 @@ def run():
     cur = conn.cursor()
     
     try:
-        instruments = fetch_kalshi_instruments(cur)
-        batch_rows = []
-        total_rows = 0
+        log.info(f"Starting kalshi_market_data ETL (mode={MODE}, bars={BAR_MODE})")
         
-        for idx, (instrument_id, ticker) in enumerate(instruments, start=1):
-            if idx % 50 == 0:
-                log.info(f"Processed {idx}/{len(instruments)} instruments so far...")
-            
-            market_data = fetch_market_data(ticker)
-            if not market_data:
-                if REQUEST_SLEEP_SECS > 0:
-                    time.sleep(REQUEST_SLEEP_SECS)
-                continue
-            
-            row = {
-                "instrument_id": instrument_id,
-                "price_date": market_data["price_date"],
-                "open": market_data["open"],
-                "high": market_data["high"],
-                "low": market_data["low"],
-                "close": market_data["close"],
-                "volume": market_data["volume"],
-            }
-            batch_rows.append(row)
-            total_rows += 1
-            
-            # Flush periodically
-            if len(batch_rows) >= BATCH_SIZE:
-                log.info(f"Flushing batch of {len(batch_rows)} market data rows to DB...")
-                upsert_market_data_rows(cur, batch_rows)
-                conn.commit()
-                batch_rows.clear()
-            
-            if REQUEST_SLEEP_SECS > 0:
-                time.sleep(REQUEST_SLEEP_SECS)
+        bars = None
+        if BAR_MODE == "accumulate":
+            bars = DailyBarAccumulator(baseline=load_volume_baseline(cur, DATA_SOURCE, date.today()))
         
-        # Final flush
-        if batch_rows:
-            log.info(f"Flushing final batch of {len(batch_rows)} market data rows to DB...")
-            upsert_market_data_rows(cur, batch_rows)
+        if MODE == "ticker":
+            total_rows = load_per_ticker(conn, cur, bars)
+        else:
+            total_rows = load_bulk_snapshot(conn, cur, bars)
+        
+        if bars is not None:
+            # One batched merge for the whole run; the volume baseline
+            # commits with it
+            upsert_daily_bars(cur, bars.flush(), DATA_SOURCE)
+            save_volume_baseline(cur, bars.updated_volumes(), DATA_SOURCE)
             conn.commit()
-            batch_rows.clear()
         
         log.info(f"kalshi_market_data ETL completed successfully. Total rows upserted ~{total_rows}.")
     
@@ -259,4 +359,3 @@ def run():
 
 if __name__ == "__main__":
     run()
-
@@ -0,0 +1,205 @@
+"""
+Parsed-ticker metadata for Kalshi instruments (kalshi_market_metadata table,
+services/db/schema_kalshi_market_metadata.sql).
+
+kalshi_instruments calls sync_market_metadata() after each ingest. It
+parses only instruments whose source_payload_hash differs from the one
+their metadata row was built from (new, changed, or never parsed), or
+whose row was built by another parser version / team dictionary (so a
+reseeded sports_teams relinks team_ids), using
+kalshi_ticker_parser.parse_many, and bulk-writes the results.
+
+Consumers then query the indexed columns instead of reparsing tickers or
+scanning /markets, e.g. KU moneylines in the next week:
+
+    find_team_markets(cur, "KU", market_type="moneyline",
+                      start_date=date.today(), end_date=date.today() + timedelta(days=7))
+"""
+
+import logging
+from datetime import date
+from typing import Optional
+
+from psycopg2.extras import execute_values
+
+from etl import codec
+from etl.kalshi_ticker_parser import PARSER_VERSION, parse_many
+
+# Instruments fetched (and parsed) per round trip while syncing
+SYNC_FETCH_SIZE = 5000
+
+log = logging.getLogger(__name__)
+
+
+def parser_version(dictionary_stamp: Optional[str] = None) -> str:
+    """Stored with each row: parser version plus the team dictionary stamp in use."""
+    return f"{PARSER_VERSION}/{dictionary_stamp or 'builtin'}"
+
+
+def metadata_row(
+    instrument_id: int,
+    ticker: str,
+    payload_hash: Optional[str],
+    parsed: dict,
+    version: Optional[str] = None,
+) -> tuple:
+    """Column values for one kalshi_market_metadata row."""
+    team_codes = parsed.get("team_codes")
+    team_ids = parsed.get("team_ids")
+    return (
+        instrument_id,
+        ticker,
+        parsed["category"],
+        parsed["parsed"],
+        parsed.get("event_type"),
+        parsed.get("market_type"),
+        parsed.get("sport"),
+        list(team_codes) if team_codes else None,
+        list(team_ids) if team_ids else None,
+        parsed.get("outcome"),
+        parsed.get("date"),
+        parsed.get("year"),
+        codec.dumps(parsed),
+        payload_hash,
+        version,
+    )
+
+
+def upsert_metadata(cur, rows: list[tuple]):
+    if not rows:
+        return
+    execute_values(
+        cur,
+        """
+        INSERT INTO kalshi_market_metadata (
+            instrument_id,
+            ticker,
+            category,
+            parsed,
+            event_type,
+            market_type,
+            sport,
+            team_codes,
+            team_ids,
+            outcome,
+            event_date,
+            event_year,
+            parsed_fields,
+            source_payload_hash,
+            parser_version
+        )
+        VALUES %s
+        ON CONFLICT (instrument_id)
+        DO UPDATE SET
+            ticker              = EXCLUDED.ticker,
+            category            = EXCLUDED.category,
+            parsed              = EXCLUDED.parsed,
+            event_type          = EXCLUDED.event_type,
+            market_type         = EXCLUDED.market_type,
+            sport               = EXCLUDED.sport,
+            team_codes          = EXCLUDED.team_codes,
+            team_ids            = EXCLUDED.team_ids,
+            outcome             = EXCLUDED.outcome,
+            event_date          = EXCLUDED.event_date,
+            event_year          = EXCLUDED.event_year,
+            parsed_fields       = EXCLUDED.parsed_fields,
+            source_payload_hash = EXCLUDED.source_payload_hash,
+            parser_version      = EXCLUDED.parser_version
+        """,
+        rows,
+        template="(%s, %s, %s, %s, %s, %s, %s, %s::text[], %s::bigint[], %s, %s::date, %s, %s::jsonb, %s, %s)",
+        page_size=len(rows),
+    )
+
+
+def sync_market_metadata(conn, primary_source: str = "kalshi", dictionary_stamp: Optional[str] = None) -> int:
+    """
+    Parse and write metadata for every instrument that is new, whose
+    payload hash changed since it was last parsed, or that was parsed with
+    another parser version or team dictionary (`dictionary_stamp`, from
+    TeamDictionary.stamp; None for the parser's built-in teams). Runs in
+    the caller's transaction. Returns the number of rows written.
+    """
+    written = 0
+    version = parser_version(dictionary_stamp)
+
+    # Named (server-side) cursor: the first sync covers the whole universe.
+    # Its snapshot is fixed when opened, so our own writes don't feed back.
+    with conn.cursor(name="kalshi_metadata_sync") as read_cur, conn.cursor() as write_cur:
+        read_cur.itersize = SYNC_FETCH_SIZE
+        read_cur.execute(
+            """
+            SELECT i.id, i.ticker, i.source_payload_hash
+            FROM instruments i
+            LEFT JOIN kalshi_market_metadata m ON m.instrument_id = i.id
+            WHERE i.primary_source = %s
+              AND (m.instrument_id IS NULL
+                   OR m.source_payload_hash IS DISTINCT FROM i.source_payload_hash
+                   OR m.parser_version IS DISTINCT FROM %s)
+            """,
+            (primary_source, version),
+        )
+        while True:
+            instruments = read_cur.fetchmany(SYNC_FETCH_SIZE)
+            if not instruments:
+                break
+            parsed = parse_many(ticker for _, ticker, _ in instruments)
+            upsert_metadata(
+                write_cur,
+                [
+                    metadata_row(instrument_id, ticker, payload_hash, result, version)
+                    for (instrument_id, ticker, payload_hash), result in zip(instruments, parsed)
+                ],
+            )
+            written += len(instruments)
+
+    return written
+
+
+def find_team_markets(
+    cur,
+    team_code: Optional[str] = None,
+    market_type: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    sport: Optional[str] = None,
+    team_id: Optional[int] = None,
+) -> list[dict]:
+    """
+    Sports markets for a team (by ticker code, or by sports_teams.id, which
+    also matches the team's alternate codes), optionally filtered by
+    market_type, sport and an inclusive event_date range.
+    """
+    clauses = ["m.category = 'sports'"]
+    params: list = []
+    if team_code:
+        clauses.append("m.team_codes @> ARRAY[%s]::text[]")
+        params.append(team_code)
+    if team_id is not None:
+        clauses.append("m.team_ids @> ARRAY[%s]::bigint[]")
+        params.append(team_id)
+    if market_type:
+        clauses.append("m.market_type = %s")
+        params.append(market_type)
+    if sport:
+        clauses.append("m.sport = %s")
+        params.append(sport)
+    if start_date:
+        clauses.append("m.event_date >= %s")
+        params.append(start_date)
+    if end_date:
+        clauses.append("m.event_date <= %s")
+        params.append(end_date)
+
+    cur.execute(
+        f"""
+        SELECT m.instrument_id, m.ticker, m.sport, m.event_date, m.market_type,
+               m.team_codes, m.outcome, m.parsed_fields
+        FROM kalshi_market_metadata m
+        WHERE {" AND ".join(clauses)}
+        ORDER BY m.event_date, m.ticker
+        """,
+        params,
+    )
+    columns = [desc[0] for desc in cur.description]
+    return [dict(zip(columns, row)) for row in cur.fetchall()]
@@ -0,0 +1,65 @@
+"""
+Unit tests for Kalshi market metadata rows.
+
+Run with: python -m pytest etl/kalshi_market_metadata_test.py
+Or: python etl/kalshi_market_metadata_test.py
+"""
+
+import os
+import sys
+import unittest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from etl import codec
+from etl.kalshi_market_metadata import metadata_row, parser_version
+from etl.kalshi_ticker_parser import PARSER_VERSION, ParsedTicker, parse_cached
+
+
+class TestMetadataRow(unittest.TestCase):
+    def test_sports_ticker(self):
+        parsed = ParsedTicker(
+            category="sports",
+            parsed=True,
+            event_type="game",
+            market_type="moneyline",
+            sport="NCAA Men's Basketball",
+            team_codes=("KU", "UK"),
+            team_ids=(1, None),
+            outcome="KU",
+            date="2025-11-29",
+        )
+        row = metadata_row(7, "KXNCAAMBGAME-25NOV29KUUK-KU", "abc", parsed, "1/builtin")
+
+        self.assertEqual(len(row), 15)
+        self.assertEqual(row[:7], (7, "KXNCAAMBGAME-25NOV29KUUK-KU", "sports", True, "game", "moneyline", "NCAA Men's Basketball"))
+        # Tuples become lists for the array columns
+        self.assertEqual(row[7], ["KU", "UK"])
+        self.assertEqual(row[8], [1, None])
+        self.assertEqual(row[9:12], ("KU", "2025-11-29", None))
+        self.assertEqual(codec.loads(row[12])["team_codes"], ["KU", "UK"])
+        self.assertEqual(row[13:], ("abc", "1/builtin"))
+
+    def test_unparsed_ticker(self):
+        row = metadata_row(8, "SOMETHING", None, ParsedTicker(category="other", parsed=False))
+        self.assertEqual(row[2:4], ("other", False))
+        # Missing fields (and empty team lists) map to NULL
+        self.assertEqual(row[4:12], (None,) * 8)
+        self.assertEqual(row[13:], (None, None))
+
+    def test_parser_output(self):
+        parsed = parse_cached("FED-25DEC-T3.75")
+        row = metadata_row(9, "FED-25DEC-T3.75", "h", parsed)
+        self.assertEqual(row[2], parsed["category"])
+        self.assertEqual(codec.loads(row[12])["category"], parsed["category"])
+
+
+class TestParserVersion(unittest.TestCase):
+    def test_includes_dictionary_stamp(self):
+        self.assertEqual(parser_version("3:x/1:y"), f"{PARSER_VERSION}/3:x/1:y")
+        self.assertEqual(parser_version(None), f"{PARSER_VERSION}/builtin")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Encodings for the latest Kalshi quote stored at kalshi:price:{ticker}.
+
+The websocket service writes one of (KALSHI_WS_PRICE_ENCODING):
+
+- "json":   {"ticker", "yes_price", "volume", "timestamp" (ISO)} string (original)
+- "hash":   Redis hash {p, v, ts}, all integers
+- "packed": 21-byte little-endian struct (version, price, volume, ts)
+
+Integer fields:
+- price:  yes price in hundredths of a cent (Kalshi prices are cents, and a
+          bid/ask mid can land on a half cent)
+- volume: contracts
+- ts:     epoch milliseconds
+
+Readers should use decode_price() / read_price() rather than parsing the
+value themselves, so the encoding can change without touching them.
+"packed" values are binary: read them with a client created with
+decode_responses=False.
+
+Switching encodings changes the Redis type of existing keys (string vs
+hash); let the old keys expire (1h TTL) or delete kalshi:price:* first.
+"""
+
+import struct
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Union
+
+from etl import codec
+
+ENCODINGS = ("json", "hash", "packed")
+
+PRICE_SCALE = 100
+
+PACKED_VERSION = 1
+_PACKED = struct.Struct("<Biqq")  # version, price, volume, ts_ms
+
+
+def price_key(ticker: str) -> str:
+    return f"kalshi:price:{ticker}"
+
+
+def to_scaled_price(yes_price: float) -> int:
+    return int(round(float(yes_price or 0) * PRICE_SCALE))
+
+
+def encode_price(ticker: str, yes_price: float, volume: float, ts_ms: int, encoding: str = "json"):
+    """
+    Build the stored value for one quote. Returns a str (json), dict (hash
+    mapping) or bytes (packed). Raises ValueError for an unknown encoding.
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown price encoding {encoding!r}; expected one of {ENCODINGS}")
+    if encoding == "hash":
+        return {"p": to_scaled_price(yes_price), "v": int(volume or 0), "ts": int(ts_ms)}
+    if encoding == "packed":
+        return _PACKED.pack(PACKED_VERSION, to_scaled_price(yes_price), int(volume or 0), int(ts_ms))
+    return codec.dumps({
+        "ticker": ticker,
+        "yes_price": yes_price,
+        "volume": volume,
+        "timestamp": datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc).isoformat(),
+    })
+
+
+def decode_price(value: Union[str, bytes, Dict[Any, Any], None]) -> Optional[Dict[str, Any]]:
+    """
+    Decode any stored encoding into {"yes_price", "volume", "ts_ms"}
+    (yes_price in cents). The encoding is detected from the value itself.
+    Returns None for a missing key.
+    """
+    if not value:
+        return None
+
+    if isinstance(value, dict):
+        fields = {(k.decode() if isinstance(k, bytes) else k): v for k, v in value.items()}
+        return {
+            "yes_price": int(fields["p"]) / PRICE_SCALE,
+            "volume": int(fields["v"]),
+            "ts_ms": int(fields["ts"]),
+        }
+
+    if isinstance(value, (bytes, bytearray)) and len(value) == _PACKED.size and value[0] == PACKED_VERSION:
+        _, price, volume, ts_ms = _PACKED.unpack(value)
+        return {"yes_price": price / PRICE_SCALE, "volume": volume, "ts_ms": ts_ms}
+
+    data = codec.loads(value)
+    ts = data.get("timestamp")
+    return {
+        "yes_price": data.get("yes_price"),
+        "volume": data.get("volume"),
+        "ts_ms": int(datetime.fromisoformat(ts).timestamp() * 1000) if ts else None,
+    }
+
+
+def read_price(redis_client, ticker: str, encoding: str = "json") -> Optional[Dict[str, Any]]:
+    """Fetch and decode the latest quote with a synchronous redis client."""
+    key = price_key(ticker)
+    if encoding == "hash":
+        return decode_price(redis_client.hgetall(key))
+    return decode_price(redis_client.get(key))
+
+
+async def read_price_async(redis_client, ticker: str, encoding: str = "json") -> Optional[Dict[str, Any]]:
+    """Fetch and decode the latest quote with a redis.asyncio client."""
+    key = price_key(ticker)
+    if encoding == "hash":
+        return decode_price(await redis_client.hgetall(key))
+    return decode_price(await redis_client.get(key))
@@ -0,0 +1,63 @@
+"""
+Unit tests for the kalshi:price:{ticker} encodings.
+
+Run with: python -m pytest etl/kalshi_quotes_test.py
+Or: python etl/kalshi_quotes_test.py
+"""
+
+import os
+import sys
+import unittest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from etl.kalshi_quotes import ENCODINGS, decode_price, encode_price, price_key
+
+TS_MS = 1732827600123
+
+
+class TestRoundTrip(unittest.TestCase):
+    def assertRoundTrip(self, encoding, yes_price, volume=1234):
+        value = encode_price("KXTEST-25", yes_price, volume, TS_MS, encoding)
+        self.assertEqual(
+            decode_price(value),
+            {"yes_price": yes_price, "volume": volume, "ts_ms": TS_MS},
+        )
+
+    def test_all_encodings(self):
+        for encoding in ENCODINGS:
+            for price in (1, 45, 99, 45.5, 0.5):
+                with self.subTest(encoding=encoding, price=price):
+                    self.assertRoundTrip(encoding, price)
+
+    def test_hash_bytes_keys(self):
+        # What a decode_responses=False client returns for HGETALL
+        mapping = encode_price("KXTEST-25", 45.5, 10, TS_MS, "hash")
+        raw = {k.encode(): str(v).encode() for k, v in mapping.items()}
+        self.assertEqual(decode_price(raw), {"yes_price": 45.5, "volume": 10, "ts_ms": TS_MS})
+
+    def test_hash_str_values(self):
+        # decode_responses=True: field values come back as strings
+        mapping = encode_price("KXTEST-25", 45.5, 10, TS_MS, "hash")
+        raw = {k: str(v) for k, v in mapping.items()}
+        self.assertEqual(decode_price(raw), {"yes_price": 45.5, "volume": 10, "ts_ms": TS_MS})
+
+    def test_packed_is_compact(self):
+        self.assertEqual(len(encode_price("KXTEST-25", 45.5, 10, TS_MS, "packed")), 21)
+
+    def test_missing_key(self):
+        self.assertIsNone(decode_price(None))
+        self.assertIsNone(decode_price({}))
+        self.assertIsNone(decode_price(b""))
+
+    def test_unknown_encoding(self):
+        with self.assertRaises(ValueError):
+            encode_price("KXTEST-25", 45, 10, TS_MS, "msgpack")
+
+    def test_price_key(self):
+        self.assertEqual(price_key("KXTEST-25"), "kalshi:price:KXTEST-25")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -33,6 +33,7 @@ load_dotenv()
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from etl.kalshi_ticker_parser import parse_kalshi_ticker
+from etl.sports_team_dictionary import configure_parser
 
 logging.basicConfig(
     level=logging.INFO,
@@ -328,6 +329,8 @@ def display_results(markets: List[Dict]):
 def main():
     """Main entry point."""
     try:
+        # Resolve teams from sports_teams (cached on disk) as well as the built-ins
+        configure_parser()
         markets = search_ncaa_ku_moneylines()
         display_results(markets)
         
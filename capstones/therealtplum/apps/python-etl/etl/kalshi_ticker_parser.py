@@ -9,15 +9,28 @@ Examples:
 - KX2028DRUN-28-AOC → 2028 Democratic primary, Alexandria Ocasio-Cortez
 - GOVPARTYAL-26-D → 2026 Alabama Governor, Democrat
 - FED-25DEC-T3.75 → Federal Reserve rate, Dec 2025, Target 3.75%
+
+Hot paths (ingest pages, the websocket stream) should use parse_many() or
+parse_cached(), which share read-only results through an LRU cache
+(KALSHI_PARSE_CACHE_SIZE); cache_stats() reports the hit rate.
 """
 
+import os
 import re
-from typing import Dict, Optional, Tuple
+import functools
+from typing import Dict, Iterable, List, Optional, Tuple
 from datetime import datetime
 import logging
 
 log = logging.getLogger(__name__)
 
+# Bumped whenever a parser change alters results for existing tickers, so
+# stored metadata (etl.kalshi_market_metadata) gets reparsed
+PARSER_VERSION = 1
+
+# Parsed tickers kept by parse_cached() / parse_many() (LRU)
+PARSE_CACHE_SIZE = int(os.getenv("KALSHI_PARSE_CACHE_SIZE", "65536"))
+
 # Team/League abbreviations mapping
 SPORTS_LEAGUES = {
     "NBA": "NBA",
@@ -51,27 +64,42 @@ US_STATES = {
     "WI": "Wisconsin", "WY": "Wyoming", "DC": "District of Columbia",
 }
 
-# Common team abbreviations (expand as needed)
-TEAM_ABBREVIATIONS = {
-    # NBA
-    "TOR": "Toronto", "CHA": "Charlotte", "NY": "New York", "BOS": "Boston",
-    "LAL": "LA Lakers", "GSW": "Golden State", "MIA": "Miami", "CHI": "Chicago",
-    # NHL
-    "WSH": "Washington", "NYI": "NY Islanders", "TOR": "Toronto", "MTL": "Montreal",
-    # NCAA Basketball
+# Team abbreviations per league (expand as needed). Keys are SPORTS_LEAGUES
+# codes; each league only resolves its own teams, so codes shared across
+# leagues can't produce a cross-league split.
+NCAA_TEAMS = {
     "KU": "Kansas", "KAN": "Kansas", "KANSAS": "Kansas",
     "UK": "Kentucky", "DUKE": "Duke", "UNC": "North Carolina", "UCLA": "UCLA",
     "NOVA": "Villanova", "GONZ": "Gonzaga", "BAYLOR": "Baylor", "MICH": "Michigan",
     "MSU": "Michigan State", "PUR": "Purdue", "IND": "Indiana", "ILL": "Illinois",
-    # A-League
-    "AUC": "Auckland", "WPH": "Wellington Phoenix", "MAC": "Macarthur", "VIC": "Victory",
-    "PER": "Perth", "WES": "Western United", "CCM": "Central Coast", "SYD": "Sydney",
-    "NUJ": "Newcastle Jets", "MEL": "Melbourne",
-    # Argentine Primera
-    "BAR": "Barcelona", "GLP": "Gimnasia LP", "RAC": "Racing", "TIG": "Tigre",
-    "CC": "Central Córdoba", "ELP": "Estudiantes LP",
 }
 
+LEAGUE_TEAMS = {
+    "NBA": {
+        "TOR": "Toronto", "CHA": "Charlotte", "NY": "New York", "BOS": "Boston",
+        "LAL": "LA Lakers", "GSW": "Golden State", "MIA": "Miami", "CHI": "Chicago",
+    },
+    "NHL": {
+        "WSH": "Washington", "NYI": "NY Islanders", "TOR": "Toronto", "MTL": "Montreal",
+    },
+    "NCAA": NCAA_TEAMS,
+    "NCAAFB": NCAA_TEAMS,
+    "NCAAMB": NCAA_TEAMS,
+    "NCAAMBK": NCAA_TEAMS,
+    "ALEAGUE": {
+        "AUC": "Auckland", "WPH": "Wellington Phoenix", "MAC": "Macarthur", "VIC": "Victory",
+        "PER": "Perth", "WES": "Western United", "CCM": "Central Coast", "SYD": "Sydney",
+        "NUJ": "Newcastle Jets", "MEL": "Melbourne",
+    },
+    "ARGPREMDIV": {
+        "BAR": "Barcelona", "GLP": "Gimnasia LP", "RAC": "Racing", "TIG": "Tigre",
+        "CC": "Central Córdoba", "ELP": "Estudiantes LP",
+    },
+}
+
+# All known codes; used for leagues without their own table
+TEAM_ABBREVIATIONS = {code: name for teams in LEAGUE_TEAMS.values() for code, name in teams.items()}
+
 # Party codes
 PARTY_CODES = {
     "D": "Democrat",
@@ -104,6 +132,104 @@ CANDIDATE_CODES = {
 }
 
 
+
+class TeamSplitter:
+    """
+    Splits a concatenated team pair ("TORCHA") into two known codes.
+
+    Tries split points from the longest possible first code down, so it
+    prefers the longest first code (as the old sorted scans did) and costs
+    at most one pair of set lookups per character.
+
+    `teams` maps code -> display name; `team_ids` (optional) maps code ->
+    sports_teams.id for codes that came from the team dictionary.
+    """
+
+    __slots__ = ("teams", "team_ids", "_max_len")
+
+    def __init__(self, teams: Dict[str, str], team_ids: Optional[Dict[str, int]] = None):
+        self.teams = teams
+        self.team_ids = team_ids or {}
+        self._max_len = max(map(len, teams), default=0)
+
+    def split(self, teams_part: str) -> Optional[Tuple[str, str]]:
+        teams = self.teams
+        for i in range(min(self._max_len, len(teams_part) - 1), 0, -1):
+            code1 = teams_part[:i]
+            if code1 in teams:
+                code2 = teams_part[i:]
+                if code2 in teams:
+                    return code1, code2
+        return None
+
+
+def build_team_splitters(league_teams: Dict[str, Dict[str, str]]) -> Dict[str, TeamSplitter]:
+    """One splitter per league (leagues sharing a table share a splitter)."""
+    by_table: Dict[int, TeamSplitter] = {}
+    return {
+        league: by_table.setdefault(id(teams), TeamSplitter(teams))
+        for league, teams in league_teams.items()
+    }
+
+
+_TEAM_SPLITTERS = build_team_splitters(LEAGUE_TEAMS)
+_DEFAULT_SPLITTER = TeamSplitter(TEAM_ABBREVIATIONS)
+
+
+def install_team_dictionary(league_tables: Dict[str, Dict[str, Tuple[int, str]]]):
+    """
+    Resolve sports teams from a loaded team dictionary as well as
+    LEAGUE_TEAMS (see etl.sports_team_dictionary.configure_parser).
+
+    `league_tables` maps a SPORTS_LEAGUES code to {code: (team_id, name)}.
+    Dictionary entries take precedence; LEAGUE_TEAMS fills any gaps.
+    Parsed games then also carry "team_ids".
+    """
+    global _TEAM_SPLITTERS
+    splitters = build_team_splitters(LEAGUE_TEAMS)
+    for league, table in league_tables.items():
+        teams = dict(LEAGUE_TEAMS.get(league, {}))
+        teams.update((code, name) for code, (_, name) in table.items())
+        team_ids = {code: team_id for code, (team_id, _) in table.items()}
+        splitters[league] = TeamSplitter(teams, team_ids)
+    _TEAM_SPLITTERS = splitters
+    _parse_frozen.cache_clear()
+
+# Event suffixes for corporate tickers ({COMPANY}{EVENT}-{DATE}), in match order
+CORPORATE_EVENTS = {
+    "FOLD": "Stock Split/Fold",
+    "US": "US Market",
+    "FTC": "FTC Case",
+    "PORT": "Portfolio",
+    "HOTDOG": "Hot Dog Price",
+}
+
+MONTHS = {
+    "JAN": 1, "FEB": 2, "MAR": 3, "APR": 4, "MAY": 5, "JUN": 6,
+    "JUL": 7, "AUG": 8, "SEP": 9, "OCT": 10, "NOV": 11, "DEC": 12,
+}
+
+# Compiled once at import. Patterns are anchored at the start of the ticker
+# (used with .match), like the re.match calls they replace.
+_DATE_RE = re.compile(r"(\d{2})-?([A-Z]{3})(\d{2})")
+_SONG_DATE_RE = re.compile(r"([A-Z]{3})(\d{2})(\d{2})")
+_SPREAD_RE = re.compile(r"[A-Z]+\d+")
+_SPORTS_RE = re.compile(
+    r"KX(" + "|".join(re.escape(c) for c in sorted(SPORTS_LEAGUES, key=len, reverse=True)) + r")GAME-"
+)
+_PRIMARY_RE = re.compile(r"KX(\d{4})([DR])RUN-(\d{2})-([A-Z]+)")
+_GOVERNOR_RE = re.compile(r"GOVPARTY([A-Z]{2})-(\d{2})-([DR])")
+_CONTROL_RE = re.compile(r"CONTROL([HS])-(\d{4})-([DR])")
+_SONG_RE = re.compile(r"KX1SONG-([A-Z]+)-([A-Z]{3}\d{2}\d{2})")
+_GENRE_RE = re.compile(r"[^-]*GENRE-[^-]*-[^-]*\Z")
+_CORPORATE_RE = re.compile(
+    r"(?!KX)(?=[\s\S]*?(?:" + "|".join(re.escape(e) for e in CORPORATE_EVENTS) + r")-)"
+)
+_FED_RE = re.compile(r"FED-(\d{2}[A-Z]{3})-T([\d.]+)")
+_FEDHIKE_RE = re.compile(r"FEDHIKE-(\d{2}[A-Z]{3}\d{2})")
+_INDICATOR_RE = re.compile(r"([A-Z]+)-(\d{2})")
+
+
 def parse_date_encoded(date_str: str) -> Optional[Tuple[str, str]]:
     """
     Parse Kalshi date encoding.
@@ -117,26 +243,17 @@ def parse_date_encoded(date_str: str) -> Optional[Tuple[str, str]]:
     Returns: (iso_date, display_date) or None if parsing fails
     """
     # Pattern: YYMMMDD or YY-MMMDD
-    match = re.match(r"(\d{2})-?([A-Z]{3})(\d{2})", date_str)
+    match = _DATE_RE.match(date_str)
     if not match:
         return None
     
     year_short, month_str, day = match.groups()
-    year = 2000 + int(year_short)
-    
-    month_map = {
-        "JAN": 1, "FEB": 2, "MAR": 3, "APR": 4, "MAY": 5, "JUN": 6,
-        "JUL": 7, "AUG": 8, "SEP": 9, "OCT": 10, "NOV": 11, "DEC": 12,
-    }
-    
-    if month_str not in month_map:
+    month = MONTHS.get(month_str)
+    if month is None:
         return None
     
-    month = month_map[month_str]
-    day_int = int(day)
-    
     try:
-        date_obj = datetime(year, month, day_int)
+        date_obj = datetime(2000 + int(year_short), month, int(day))
         iso_date = date_obj.strftime("%Y-%m-%d")
         display_date = date_obj.strftime("%b %d, %Y")
         return (iso_date, display_date)
@@ -154,120 +271,134 @@ def parse_sports_game_ticker(ticker: str) -> Optional[Dict]:
     - KXALEAGUEGAME-25DEC05AUCWPH-TIE → A-League, Dec 5, 2025, Auckland vs Wellington Phoenix, Tie
     """
     # Pattern: KX{LEAGUE}GAME-{DATE}{TEAM1}{TEAM2}-{OUTCOME}
-    # Need to be more careful - team codes vary in length
-    # Try to match known league patterns first
-    for league_code in SPORTS_LEAGUES.keys():
-        if ticker.startswith(f"KX{league_code}GAME-"):
-            # Extract date and teams
-            remaining = ticker[len(f"KX{league_code}GAME-"):]
-            # Date is YYMMMDD format (7 chars: YY + MMM + DD)
-            if len(remaining) < 7:
-                continue
-            date_str = remaining[:7]  # Standard 7-char format (YYMMMDD)
-            teams_and_outcome = remaining[7:]  # Everything after the date
-            
-            # Parse the date
-            date_info = parse_date_encoded(date_str)
-            if not date_info:
-                continue
-            
-            # Split teams and outcome - outcome is after last dash (if present)
-            outcome = None
-            teams_part = teams_and_outcome
-            
-            if "-" in teams_and_outcome:
-                teams_part, outcome = teams_and_outcome.rsplit("-", 1)
-            
-            league = SPORTS_LEAGUES.get(league_code, league_code)
-            date_info = parse_date_encoded(date_str)
-            if not date_info:
-                continue
-            
-            iso_date, display_date = date_info
-            
-            # Try to identify team codes from the teams_part
-            # Common patterns: 3-4 char codes, sometimes longer
-            # For NBA: TOR, CHA, etc. (3 chars)
-            # For A-League: AUC, WPH, etc. (3-4 chars)
-            # This is a heuristic - we'll improve with more examples
-            team1_code = None
-            team2_code = None
-            
-            # Try matching known team codes (longest first)
-            # Strategy: try all combinations of known codes
-            matched = False
-            team1_code = None
-            team2_code = None
-            
-            # Sort codes by length (longest first) to prefer longer matches
-            sorted_codes = sorted(TEAM_ABBREVIATIONS.keys(), key=len, reverse=True)
-            
-            # Try startswith approach first
-            for code1 in sorted_codes:
-                if teams_part.startswith(code1):
-                    remaining_team = teams_part[len(code1):]
-                    # Check if remaining exactly matches another known code
-                    if remaining_team and remaining_team in TEAM_ABBREVIATIONS:
-                        team1_code = code1
-                        team2_code = remaining_team
-                        matched = True
-                        break
-            
-            # If not matched, try endswith approach
-            if not matched:
-                for code2 in sorted_codes:
-                    if teams_part.endswith(code2):
-                        remaining = teams_part[:-len(code2)]
-                        # Check if remaining exactly matches another known code
-                        if remaining in TEAM_ABBREVIATIONS:
-                            team1_code = remaining
-                            team2_code = code2
-                            matched = True
-                            break
-            
-            # Last resort: split in middle (rough heuristic)
-            if not matched:
-                mid = len(teams_part) // 2
-                team1_code = teams_part[:mid]
-                team2_code = teams_part[mid:]
-            
-            team1 = TEAM_ABBREVIATIONS.get(team1_code, team1_code)
-            team2 = TEAM_ABBREVIATIONS.get(team2_code, team2_code)
-            
-            # Determine market type and outcome display
-            if outcome:
-                if outcome == "TIE":
-                    market_type = "tie"
-                    outcome_display = "Tie"
-                elif outcome in [team1_code, team2_code]:
-                    market_type = "moneyline"
-                    outcome_display = team1 if outcome == team1_code else team2
-                else:
-                    market_type = "spread" if re.match(r"[A-Z]+\d+", outcome) else "other"
-                    outcome_display = outcome
-            else:
-                # No outcome suffix - this is the base game market
-                market_type = "game"
-                outcome_display = None
-            
-            result = {
-                "category": "sports",
-                "sport": league,
-                "event_type": "game",
-                "date": iso_date,
-                "date_display": display_date,
-                "teams": [team1, team2],
-                "team_codes": [team1_code, team2_code],
-                "market_type": market_type,
-            }
-            
-            if outcome:
-                result["outcome"] = outcome
-                result["outcome_display"] = outcome_display
-            
-            return result
+    # League codes are matched by _SPORTS_RE (at most one can match)
+    match = _SPORTS_RE.match(ticker)
+    if not match:
+        return None
     
-    return None
+    league_code = match.group(1)
+    remaining = ticker[match.end():]
+    # Date is YYMMMDD format (7 chars: YY + MMM + DD)
+    if len(remaining) < 7:
+        return None
+    date_str = remaining[:7]  # Standard 7-char format (YYMMMDD)
+    teams_and_outcome = remaining[7:]  # Everything after the date
+    
+    # Parse the date
+    date_info = parse_date_encoded(date_str)
+    if not date_info:
+        return None
+    iso_date, display_date = date_info
+    
+    # Split teams and outcome - outcome is after last dash (if present)
+    outcome = None
+    teams_part = teams_and_outcome
+    
+    if "-" in teams_and_outcome:
+        teams_part, outcome = teams_and_outcome.rsplit("-", 1)
+    
+    league = SPORTS_LEAGUES.get(league_code, league_code)
+    
+    # Split the pair with the league's own team index (e.g. TORCHA → TOR, CHA)
+    splitter = _TEAM_SPLITTERS.get(league_code, _DEFAULT_SPLITTER)
+    split = splitter.split(teams_part)
+    if split:
+        team1_code, team2_code = split
+    else:
+        # Last resort: split in middle (rough heuristic)
+        mid = len(teams_part) // 2
+        team1_code = teams_part[:mid]
+        team2_code = teams_part[mid:]
+    
+    team1 = splitter.teams.get(team1_code, team1_code)
+    team2 = splitter.teams.get(team2_code, team2_code)
+    
+    # Determine market type and outcome display
+    if outcome:
+        if outcome == "TIE":
+            market_type = "tie"
+            outcome_display = "Tie"
+        elif outcome in [team1_code, team2_code]:
+            market_type = "moneyline"
+            outcome_display = team1 if outcome == team1_code else team2
+        else:
+            market_type = "spread" if _SPREAD_RE.match(outcome) else "other"
+            outcome_display = outcome
+    else:
+        # No outcome suffix - this is the base game market
+        market_type = "game"
+        outcome_display = None
+    
+    result = {
+        "category": "sports",
+        "sport": league,
+        "event_type": "game",
+        "date": iso_date,
+        "date_display": display_date,
+        "teams": [team1, team2],
+        "team_codes": [team1_code, team2_code],
+        "market_type": market_type,
+    }
+    
+    if splitter.team_ids:
+        result["team_ids"] = [splitter.team_ids.get(team1_code), splitter.team_ids.get(team2_code)]
+    
+    if outcome:
+        result["outcome"] = outcome
+        result["outcome_display"] = outcome_display
+    
+    return result
+
+
+def _parse_primary(ticker: str) -> Optional[Dict]:
+    # KX{YEAR}{PARTY}RUN-{YEAR}-{CANDIDATE}
+    match = _PRIMARY_RE.match(ticker)
+    if not match:
+        return None
+    year, party_code, year_short, candidate_code = match.groups()
+    return {
+        "category": "election",
+        "event_type": "primary",
+        "year": int(year),
+        "party": PARTY_CODES.get(party_code, party_code),
+        "party_code": party_code,
+        "candidate": CANDIDATE_CODES.get(candidate_code, candidate_code),
+        "candidate_code": candidate_code,
+    }
+
+
+def _parse_governor(ticker: str) -> Optional[Dict]:
+    # GOVPARTY{STATE}-{YEAR}-{PARTY}
+    match = _GOVERNOR_RE.match(ticker)
+    if not match:
+        return None
+    state_code, year_short, party_code = match.groups()
+    return {
+        "category": "election",
+        "event_type": "governor",
+        "year": 2000 + int(year_short),
+        "state": US_STATES.get(state_code, state_code),
+        "state_code": state_code,
+        "party": PARTY_CODES.get(party_code, party_code),
+        "party_code": party_code,
+    }
+
+
+def _parse_chamber_control(ticker: str) -> Optional[Dict]:
+    # CONTROL{H/S}-{YEAR}-{PARTY}
+    match = _CONTROL_RE.match(ticker)
+    if not match:
+        return None
+    chamber, year, party_code = match.groups()
+    return {
+        "category": "election",
+        "event_type": "chamber_control",
+        "year": int(year),
+        "chamber": "House" if chamber == "H" else "Senate",
+        "chamber_code": chamber,
+        "party": PARTY_CODES.get(party_code, party_code),
+        "party_code": party_code,
+    }
 
 
 def parse_election_ticker(ticker: str) -> Optional[Dict]:
@@ -280,59 +411,7 @@ def parse_election_ticker(ticker: str) -> Optional[Dict]:
     - GOVPARTYAL-26-D → 2026 Alabama Governor, Democrat
     - CONTROLH-2026-D → 2026 House Control, Democrat
     """
-    # Pattern 1: KX{YEAR}{PARTY}RUN-{YEAR}-{CANDIDATE}
-    match = re.match(r"KX(\d{4})([DR])RUN-(\d{2})-([A-Z]+)", ticker)
-    if match:
-        year, party_code, year_short, candidate_code = match.groups()
-        party = PARTY_CODES.get(party_code, party_code)
-        candidate = CANDIDATE_CODES.get(candidate_code, candidate_code)
-        
-        return {
-            "category": "election",
-            "event_type": "primary",
-            "year": int(year),
-            "party": party,
-            "party_code": party_code,
-            "candidate": candidate,
-            "candidate_code": candidate_code,
-        }
-    
-    # Pattern 2: GOVPARTY{STATE}-{YEAR}-{PARTY}
-    match = re.match(r"GOVPARTY([A-Z]{2})-(\d{2})-([DR])", ticker)
-    if match:
-        state_code, year_short, party_code = match.groups()
-        state = US_STATES.get(state_code, state_code)
-        year = 2000 + int(year_short)
-        party = PARTY_CODES.get(party_code, party_code)
-        
-        return {
-            "category": "election",
-            "event_type": "governor",
-            "year": year,
-            "state": state,
-            "state_code": state_code,
-            "party": party,
-            "party_code": party_code,
-        }
-    
-    # Pattern 3: CONTROL{H/S}-{YEAR}-{PARTY}
-    match = re.match(r"CONTROL([HS])-(\d{4})-([DR])", ticker)
-    if match:
-        chamber, year, party_code = match.groups()
-        chamber_name = "House" if chamber == "H" else "Senate"
-        party = PARTY_CODES.get(party_code, party_code)
-        
-        return {
-            "category": "election",
-            "event_type": "chamber_control",
-            "year": int(year),
-            "chamber": chamber_name,
-            "chamber_code": chamber,
-            "party": party,
-            "party_code": party_code,
-        }
-    
-    return None
+    return _parse_primary(ticker) or _parse_governor(ticker) or _parse_chamber_control(ticker)
 
 
 def parse_corporate_event_ticker(ticker: str) -> Optional[Dict]:
@@ -350,28 +429,20 @@ def parse_corporate_event_ticker(ticker: str) -> Optional[Dict]:
         return None
     
     # Known event types to match first
-    event_types = ["FOLD", "US", "FTC", "PORT", "HOTDOG"]
-    for event_type in event_types:
-        if f"{event_type}-" in ticker:
+    for event_type, event_name in CORPORATE_EVENTS.items():
+        separator = f"{event_type}-"
+        if separator in ticker:
             # Extract company and date
-            parts = ticker.split(f"{event_type}-")
+            parts = ticker.split(separator)
             if len(parts) == 2:
-                company = parts[0]
-                date_str = parts[1]
+                company, date_str = parts
                 date_info = parse_date_encoded(date_str)
                 if date_info:
                     iso_date, display_date = date_info
-                    event_map = {
-                        "FOLD": "Stock Split/Fold",
-                        "US": "US Market",
-                        "FTC": "FTC Case",
-                        "PORT": "Portfolio",
-                        "HOTDOG": "Hot Dog Price",
-                    }
                     return {
                         "category": "corporate",
                         "company": company,
-                        "event_type": event_map.get(event_type, event_type),
+                        "event_type": event_name,
                         "date": iso_date,
                         "date_display": display_date,
                     }
@@ -379,6 +450,55 @@ def parse_corporate_event_ticker(ticker: str) -> Optional[Dict]:
     return None
 
 
+def _parse_fed_rate(ticker: str) -> Optional[Dict]:
+    # FED-{DATE}-T{VALUE}
+    match = _FED_RE.match(ticker)
+    if not match:
+        return None
+    date_str, target_rate = match.groups()
+    date_info = parse_date_encoded(date_str + "01")  # Use first day of month
+    if not date_info:
+        return None
+    iso_date, display_date = date_info
+    return {
+        "category": "economic",
+        "indicator": "Federal Reserve Rate",
+        "date": iso_date,
+        "date_display": display_date,
+        "target_rate": float(target_rate),
+    }
+
+
+def _parse_fed_hike(ticker: str) -> Optional[Dict]:
+    # FEDHIKE-{DATE}
+    match = _FEDHIKE_RE.match(ticker)
+    if not match:
+        return None
+    date_info = parse_date_encoded(match.group(1))
+    if not date_info:
+        return None
+    iso_date, display_date = date_info
+    return {
+        "category": "economic",
+        "indicator": "Fed Rate Hike",
+        "date": iso_date,
+        "date_display": display_date,
+    }
+
+
+def _parse_indicator(ticker: str) -> Optional[Dict]:
+    # {INDICATOR}-{YEAR}
+    match = _INDICATOR_RE.match(ticker)
+    if not match:
+        return None
+    indicator, year_short = match.groups()
+    return {
+        "category": "economic",
+        "indicator": indicator,
+        "year": 2000 + int(year_short),
+    }
+
+
 def parse_economic_ticker(ticker: str) -> Optional[Dict]:
     """
     Parse economic indicator tickers.
@@ -388,47 +508,50 @@ def parse_economic_ticker(ticker: str) -> Optional[Dict]:
     - FEDHIKE-25DEC31 → Fed rate hike, Dec 31, 2025
     - CHINAUSGDP-30 → China-US GDP, 2030
     """
-    # Pattern 1: FED-{DATE}-T{VALUE}
-    match = re.match(r"FED-(\d{2}[A-Z]{3})-T([\d.]+)", ticker)
-    if match:
-        date_str, target_rate = match.groups()
-        date_info = parse_date_encoded(date_str + "01")  # Use first day of month
-        if date_info:
-            iso_date, display_date = date_info
-            return {
-                "category": "economic",
-                "indicator": "Federal Reserve Rate",
-                "date": iso_date,
-                "date_display": display_date,
-                "target_rate": float(target_rate),
-            }
-    
-    # Pattern 2: FEDHIKE-{DATE}
-    match = re.match(r"FEDHIKE-(\d{2}[A-Z]{3}\d{2})", ticker)
-    if match:
-        date_str = match.group(1)
-        date_info = parse_date_encoded(date_str)
-        if date_info:
-            iso_date, display_date = date_info
-            return {
-                "category": "economic",
-                "indicator": "Fed Rate Hike",
-                "date": iso_date,
-                "date_display": display_date,
-            }
-    
-    # Pattern 3: {INDICATOR}-{YEAR}
-    match = re.match(r"([A-Z]+)-(\d{2})", ticker)
-    if match:
-        indicator, year_short = match.groups()
-        year = 2000 + int(year_short)
-        return {
-            "category": "economic",
-            "indicator": indicator,
-            "year": year,
-        }
-    
-    return None
+    return _parse_fed_rate(ticker) or _parse_fed_hike(ticker) or _parse_indicator(ticker)
+
+
+def _parse_song(ticker: str) -> Optional[Dict]:
+    # KX1SONG-{ARTIST}-{DATE}, date format: DEC2725 → Dec 27, 2025
+    match = _SONG_RE.match(ticker)
+    if not match:
+        return None
+    artist, date_str = match.groups()
+    month_str, day, year_short = _SONG_DATE_RE.match(date_str).groups()
+    month = MONTHS.get(month_str)
+    if month is None:
+        return None
+    try:
+        date_obj = datetime(2000 + int(year_short), month, int(day))
+    except ValueError:
+        return None
+    return {
+        "category": "entertainment",
+        "event_type": "#1 Song",
+        "artist": artist,
+        "date": date_obj.strftime("%Y-%m-%d"),
+        "date_display": date_obj.strftime("%b %d, %Y"),
+    }
+
+
+def _parse_genre(ticker: str) -> Optional[Dict]:
+    # {ARTIST}GENRE-{YEAR}-{GENRE}
+    if "GENRE-" not in ticker:
+        return None
+    parts = ticker.split("-")
+    if len(parts) != 3 or not parts[0].endswith("GENRE"):
+        return None
+    try:
+        year = 2000 + int(parts[1])
+    except ValueError:
+        return None
+    return {
+        "category": "entertainment",
+        "event_type": "Genre",
+        "artist": parts[0][:-5],  # Remove "GENRE"
+        "year": year,
+        "genre": parts[2],
+    }
 
 
 def parse_entertainment_ticker(ticker: str) -> Optional[Dict]:
@@ -439,82 +562,87 @@ def parse_entertainment_ticker(ticker: str) -> Optional[Dict]:
     - KX1SONG-DRAKE-DEC2725 → #1 Song, Drake, Dec 27, 2025
     - BEYONCEGENRE-30-AFA → Beyoncé genre, 2030, Afrobeats
     """
-    # Pattern 1: KX1SONG-{ARTIST}-{DATE}
-    match = re.match(r"KX1SONG-([A-Z]+)-([A-Z]{3}\d{2}\d{2})", ticker)
-    if match:
-        artist, date_str = match.groups()
-        # Date format: DEC2725 → Dec 27, 2025
-        date_match = re.match(r"([A-Z]{3})(\d{2})(\d{2})", date_str)
-        if date_match:
-            month_str, day, year_short = date_match.groups()
-            year = 2000 + int(year_short)
-            month_map = {
-                "JAN": 1, "FEB": 2, "MAR": 3, "APR": 4, "MAY": 5, "JUN": 6,
-                "JUL": 7, "AUG": 8, "SEP": 9, "OCT": 10, "NOV": 11, "DEC": 12,
-            }
-            if month_str in month_map:
-                try:
-                    date_obj = datetime(year, month_map[month_str], int(day))
-                    iso_date = date_obj.strftime("%Y-%m-%d")
-                    display_date = date_obj.strftime("%b %d, %Y")
-                    return {
-                        "category": "entertainment",
-                        "event_type": "#1 Song",
-                        "artist": artist,
-                        "date": iso_date,
-                        "date_display": display_date,
-                    }
-                except ValueError:
-                    pass
-    
-    # Pattern 2: {ARTIST}GENRE-{YEAR}-{GENRE}
-    # Check for GENRE pattern before economic parser
-    if "GENRE-" in ticker:
-        parts = ticker.split("-")
-        if len(parts) == 3:
-            artist_part = parts[0]
-            if artist_part.endswith("GENRE"):
-                artist = artist_part[:-5]  # Remove "GENRE"
-                year_short = parts[1]
-                genre_code = parts[2]
-                try:
-                    year = 2000 + int(year_short)
-                    return {
-                        "category": "entertainment",
-                        "event_type": "Genre",
-                        "artist": artist,
-                        "year": year,
-                        "genre": genre_code,
-                    }
-                except ValueError:
-                    pass
+    # GENRE is checked here, before the economic parser sees the ticker
+    return _parse_song(ticker) or _parse_genre(ticker)
+
+
+# ----------------------------------------------------------------------
+# Dispatch engine
+# ----------------------------------------------------------------------
+
+# Every rule in priority order: (name, pattern, handler). A rule's pattern
+# matching means its handler may return a result; the handler still has the
+# final say (e.g. an invalid date). The order is the order parse_kalshi_ticker
+# has always tried parsers in (entertainment before economic to catch GENRE).
+_RULES = (
+    ("sports", _SPORTS_RE, parse_sports_game_ticker),
+    ("primary", _PRIMARY_RE, _parse_primary),
+    ("governor", _GOVERNOR_RE, _parse_governor),
+    ("control", _CONTROL_RE, _parse_chamber_control),
+    ("song", _SONG_RE, _parse_song),
+    ("genre", _GENRE_RE, _parse_genre),
+    ("corporate", _CORPORATE_RE, parse_corporate_event_ticker),
+    ("fed", _FED_RE, _parse_fed_rate),
+    ("fedhike", _FEDHIKE_RE, _parse_fed_hike),
+    ("indicator", _INDICATOR_RE, _parse_indicator),
+)
+_RULE_INDEX = {name: i for i, (name, _, _) in enumerate(_RULES)}
+
+# All rule patterns as named alternatives of one regex. re tries the
+# alternatives in order, so lastgroup names the first rule whose pattern
+# matches - a ticker is classified in a single pass.
+_DISPATCH_RE = re.compile("|".join(f"(?P<{name}>{pattern.pattern})" for name, pattern, _ in _RULES))
+
+
+def _parse_dispatch(ticker: str) -> Optional[Dict]:
+    match = _DISPATCH_RE.match(ticker)
+    if not match:
+        return None
+    
+    first = _RULE_INDEX[match.lastgroup]
+    result = _RULES[first][2](ticker)
+    if result:
+        return result
     
+    # The handler rejected the ticker (rare): fall through to later rules,
+    # exactly as the sequential parser chain would
+    for _, pattern, handler in _RULES[first + 1:]:
+        if pattern.match(ticker):
+            result = handler(ticker)
+            if result:
+                return result
+    return None
+
+
+def _parse_sequential(ticker: str) -> Optional[Dict]:
+    """Reference chain (one parser after another); used to check and benchmark the engine."""
+    for parser_func in (
+        parse_sports_game_ticker,
+        parse_election_ticker,
+        parse_entertainment_ticker,
+        parse_corporate_event_ticker,
+        parse_economic_ticker,
+    ):
+        result = parser_func(ticker)
+        if result:
+            return result
     return None
 
 
 def parse_kalshi_ticker(ticker: str) -> Dict:
     """
-    Main parser function. Tries all parsers and returns structured metadata.
+    Main parser function. Classifies the ticker in one pass over the compiled
+    rule table and returns structured metadata.
     
     Returns dict with:
     - category: "sports" | "election" | "corporate" | "economic" | "entertainment" | "other"
     - parsed: True if successfully parsed, False otherwise
     - ... (category-specific fields)
     """
-    # Try each parser in order (entertainment before economic to catch GENRE patterns)
-    parsers = [
-        ("sports", parse_sports_game_ticker),
-        ("election", parse_election_ticker),
-        ("entertainment", parse_entertainment_ticker),
-        ("corporate", parse_corporate_event_ticker),
-        ("economic", parse_economic_ticker),
-    ]
-    
-    for category, parser_func in parsers:
-        result = parser_func(ticker)
-        if result:
-            result["parsed"] = True
-            return result
+    result = _parse_dispatch(ticker)
+    if result:
+        result["parsed"] = True
+        return result
     
     # If no parser matched, return minimal structure
     return {
@@ -524,7 +652,108 @@ def parse_kalshi_ticker(ticker: str) -> Dict:
     }
 
 
+class ParsedTicker(dict):
+    """
+    Read-only parse result shared through the cache. Still a dict (so it
+    serialises as JSON), with list fields stored as tuples; copy it with
+    dict(result) to modify.
+    """
+
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("ParsedTicker is read-only; copy it with dict() first")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        # dict's default reduce refills the copy item by item, which the
+        # overrides above reject; rebuild it from a plain dict instead
+        return (ParsedTicker, (dict(self),))
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_frozen(ticker: str) -> ParsedTicker:
+    result = parse_kalshi_ticker(ticker)
+    return ParsedTicker(
+        (key, tuple(value) if isinstance(value, list) else value) for key, value in result.items()
+    )
+
+
+def parse_cached(ticker: str) -> ParsedTicker:
+    """parse_kalshi_ticker() through the LRU cache; returns a shared read-only result."""
+    return _parse_frozen(ticker)
+
+
+def parse_many(tickers: Iterable[str]) -> List[ParsedTicker]:
+    """
+    Parse a batch (e.g. one /markets page), in order. Each distinct ticker is
+    looked up once per batch, then through the LRU cache.
+    """
+    tickers = list(tickers)
+    parsed = {ticker: _parse_frozen(ticker) for ticker in dict.fromkeys(tickers)}
+    return [parsed[ticker] for ticker in tickers]
+
+
+def cache_stats() -> Dict[str, float]:
+    """Hit/miss counters and hit rate of the parse cache, for monitoring."""
+    info = _parse_frozen.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": info.hits / lookups if lookups else 0.0,
+        "size": info.currsize,
+        "maxsize": info.maxsize,
+    }
+
+
+def benchmark(tickers, repeat: int = 3) -> Dict[str, float]:
+    """Tickers per second for the dispatch engine and the sequential chain (best of `repeat`)."""
+    import time
+    
+    rates = {}
+    for name, func in (("engine", _parse_dispatch), ("sequential", _parse_sequential)):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for ticker in tickers:
+                func(ticker)
+            best = min(best, time.perf_counter() - start)
+        rates[name] = len(tickers) / best if best else float("inf")
+    return rates
+
+
+def _load_market_tickers(path: str) -> list:
+    """Tickers from a saved GET /markets dump (one page, a list of pages, or a list of markets)."""
+    import json
+    
+    with open(path) as f:
+        data = json.load(f)
+    tickers = []
+    for item in data if isinstance(data, list) else [data]:
+        if "ticker" in item:
+            markets = [item]
+        else:
+            markets = item.get("markets") or item.get("results") or []
+        tickers.extend(m["ticker"] for m in markets if m.get("ticker"))
+    return tickers
+
+
 if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) > 1:
+        # Benchmark over a /markets dump: python kalshi_ticker_parser.py markets.json
+        tickers = _load_market_tickers(sys.argv[1])
+        mismatches = sum(1 for t in tickers if _parse_dispatch(t) != _parse_sequential(t))
+        rates = benchmark(tickers)
+        print(f"{len(tickers)} tickers, {mismatches} mismatches vs sequential chain")
+        for name, rate in rates.items():
+            print(f"  {name}: {rate:,.0f} tickers/s")
+        sys.exit(0)
+    
     # Test cases
     test_tickers = [
         "KXNBAGAME-25NOV29TORCHA",
@@ -543,4 +772,3 @@ if __name__ == "__main__":
         print(f"{ticker}")
         print(f"  → {result}")
         print()
-
@@ -5,6 +5,8 @@ Run with: python -m pytest etl/kalshi_ticker_parser_test.py
 Or: python etl/kalshi_ticker_parser_test.py
 """
 
+import copy
+import pickle
 import unittest
 from kalshi_ticker_parser import (
     parse_kalshi_ticker,
@@ -14,6 +16,12 @@ from kalshi_ticker_parser import (
     parse_economic_ticker,
     parse_entertainment_ticker,
     parse_date_encoded,
+    parse_many,
+    parse_cached,
+    cache_stats,
+    ParsedTicker,
+    _parse_dispatch,
+    _parse_sequential,
 )
 
 
@@ -52,6 +60,17 @@ class TestSportsParsing(unittest.TestCase):
         self.assertEqual(result["date"], "2025-12-05")
         self.assertIn("outcome", result)
 
+    def test_team_split_uses_league_teams(self):
+        result = parse_sports_game_ticker("KXNCAAMBGAME-25NOV29KANSASDUKE-KANSAS")
+        self.assertEqual(result["team_codes"], ["KANSAS", "DUKE"])
+        self.assertEqual(result["teams"], ["Kansas", "Duke"])
+        self.assertEqual(result["market_type"], "moneyline")
+        self.assertEqual(result["outcome_display"], "Kansas")
+
+        # CHA is an NBA code, so it isn't resolved for an NHL game
+        result = parse_sports_game_ticker("KXNHLGAME-25NOV29TORCHA")
+        self.assertEqual(result["teams"], ["Toronto", "CHA"])
+
 
 class TestElectionParsing(unittest.TestCase):
     def test_primary_ticker(self):
@@ -129,6 +148,60 @@ class TestMainParser(unittest.TestCase):
             self.assertEqual(result["category"], expected_category)
             self.assertTrue(result["parsed"])
 
+    def test_dispatch_matches_sequential_chain(self):
+        # Includes tickers whose first matching rule rejects them and must
+        # fall through to a later parser
+        tickers = [
+            "KXNBAGAME-25NOV29TORCHA",
+            "KXNCAAFBGAME-25NOV29KUUK-KU",
+            "KXNBAGAME-25XYZ29TORCHA",
+            "KXNBAGAME-25NOV",
+            "KX2028RRUN-28-DJT",
+            "CONTROLH-2026-D",
+            "KX1SONG-DRAKE-FEB3025",
+            "KXGENRE-30-AFA",
+            "APPLEUS-29DEC31",
+            "APPLEFOLD-25XYZ31",
+            "FED-25XYZ-T3.75",
+            "FEDHIKE-25DEC31",
+            "CHINAUSGDP-30",
+            "UNKNOWN-TICKER-123",
+            "",
+        ]
+        for ticker in tickers:
+            self.assertEqual(_parse_dispatch(ticker), _parse_sequential(ticker), ticker)
+
+
+class TestParseMany(unittest.TestCase):
+    def test_parse_many_matches_single_parse(self):
+        tickers = ["KXNBAGAME-25NOV29TORCHA", "FED-25DEC-T3.75", "KXNBAGAME-25NOV29TORCHA", "UNKNOWN-TICKER-123"]
+        results = parse_many(tickers)
+        self.assertEqual(len(results), len(tickers))
+        for ticker, result in zip(tickers, results):
+            expected = parse_kalshi_ticker(ticker)
+            self.assertEqual(dict(result), {k: tuple(v) if isinstance(v, list) else v for k, v in expected.items()})
+        # Repeated tickers share one frozen result
+        self.assertIs(results[0], results[2])
+        with self.assertRaises(TypeError):
+            results[0]["category"] = "other"
+
+    def test_cache_stats(self):
+        parse_many(["KX2028DRUN-28-AOC"])
+        before = cache_stats()
+        parse_many(["KX2028DRUN-28-AOC"])
+        after = cache_stats()
+        self.assertEqual(after["hits"], before["hits"] + 1)
+        self.assertGreater(after["hit_rate"], 0)
+
+    def test_copy_and_pickle(self):
+        result = parse_cached("KXNBAGAME-25NOV29TORCHA")
+        for clone in (copy.copy(result), copy.deepcopy(result), pickle.loads(pickle.dumps(result))):
+            self.assertIsInstance(clone, ParsedTicker)
+            self.assertEqual(clone, result)
+            self.assertIsNot(clone, result)
+            with self.assertRaises(TypeError):
+                clone["category"] = "other"
+
 
 if __name__ == "__main__":
     unittest.main()
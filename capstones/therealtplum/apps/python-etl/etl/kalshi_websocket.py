@@ -7,14 +7,20 @@ in the database for historical tracking.
 """
 
 import os
-import json
+import re
 import asyncio
+import itertools
 import logging
+import time
 import websockets
-from datetime import datetime, timezone
 from typing import Optional, Dict, Any
 import redis.asyncio as aioredis
 
+from etl import codec, kalshi_quotes
+from etl.message_queue import MessageQueue
+from etl.redis_batch_writer import RedisBatchWriter
+from etl.tick_stream import normalize_tick, stream_key
+
 # Kalshi WebSocket configuration
 KALSHI_WS_URL = os.getenv(
     "KALSHI_WS_URL", 
@@ -28,6 +34,62 @@ KALSHI_WS_DEMO_URL = os.getenv(
 # Redis configuration
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 
+# TTL for kalshi:market:* / kalshi:price:* keys
+REDIS_TTL_SECS = 3600
+
+# Redis writes are batched into one pipeline per flush: flush when this many
+# writes are pending or every KALSHI_WS_FLUSH_INTERVAL_MS, whichever is first
+REDIS_MAX_BATCH = int(os.getenv("KALSHI_WS_REDIS_MAX_BATCH", "500"))
+REDIS_FLUSH_INTERVAL_MS = float(os.getenv("KALSHI_WS_FLUSH_INTERVAL_MS", "250"))
+
+# Keep only the newest pending value per key between flushes (readers only
+# need the latest state), and never hold a value longer than
+# KALSHI_WS_MAX_STALENESS_MS before flushing it
+REDIS_COALESCE = os.getenv("KALSHI_WS_COALESCE", "true").lower() == "true"
+REDIS_MAX_STALENESS_MS = float(os.getenv("KALSHI_WS_MAX_STALENESS_MS", "1000"))
+
+# Value format for kalshi:price:{ticker}: "json" (original string), "hash"
+# (integer fields p/v/ts) or "packed" (21-byte struct). Read it back with
+# etl.kalshi_quotes.read_price(), which handles all three
+PRICE_ENCODING = os.getenv("KALSHI_WS_PRICE_ENCODING", "json").lower()
+if PRICE_ENCODING not in kalshi_quotes.ENCODINGS:
+    raise RuntimeError(
+        f"KALSHI_WS_PRICE_ENCODING={PRICE_ENCODING!r} is not one of {kalshi_quotes.ENCODINGS}"
+    )
+
+# Also append every update to the capped kalshi:ticks stream for
+# consumer-group readers (etl.tick_stream.TickStreamReader); the stream is
+# trimmed to roughly KALSHI_WS_TICK_STREAM_MAXLEN entries
+TICK_STREAM = os.getenv("KALSHI_WS_TICK_STREAM", "false").lower() == "true"
+TICK_STREAM_MAXLEN = int(os.getenv("KALSHI_WS_TICK_STREAM_MAXLEN", "1000000"))
+TICK_STREAM_KEY = stream_key("kalshi")
+
+# Wrap each batch in MULTI/EXEC instead of a plain pipeline
+REDIS_TRANSACTION = os.getenv("KALSHI_WS_REDIS_TRANSACTION", "false").lower() == "true"
+
+# Inbound frames are queued between the socket reader and processing workers
+# so the reader never waits on downstream work. Overflow policy when full:
+# "drop_oldest", "coalesce" (replace a queued frame for the same market) or
+# "block" (lossless, backpressure reaches the socket)
+INBOUND_QUEUE_SIZE = int(os.getenv("KALSHI_WS_QUEUE_SIZE", "10000"))
+INBOUND_OVERFLOW = os.getenv("KALSHI_WS_OVERFLOW", "drop_oldest").lower()
+PROCESS_WORKERS = int(os.getenv("KALSHI_WS_WORKERS", "4"))
+
+# How often queue counters are logged
+STATS_INTERVAL_SECS = float(os.getenv("KALSHI_WS_STATS_INTERVAL_SECS", "60"))
+
+# Channels requested for every subscribed market
+WS_CHANNELS = [c.strip() for c in os.getenv("KALSHI_WS_CHANNELS", "ticker").split(",") if c.strip()]
+
+# Market tickers carried per subscribe / update_subscription frame; keeps
+# each command well under the server's frame size limit
+SUBSCRIBE_CHUNK_SIZE = int(os.getenv("KALSHI_WS_SUBSCRIBE_CHUNK_SIZE", "500"))
+
+# A subscribe command still missing acks after this long is given up on;
+# its unconfirmed markets are forgotten so the next set_subscriptions
+# retries them
+SUBSCRIBE_ACK_TIMEOUT_SECS = float(os.getenv("KALSHI_WS_SUBSCRIBE_ACK_TIMEOUT_SECS", "30"))
+
 # Use demo environment if specified
 USE_DEMO = os.getenv("KALSHI_USE_DEMO", "false").lower() == "true"
 
@@ -37,6 +99,28 @@ logging.basicConfig(
 )
 log = logging.getLogger(__name__)
 
+# Cheap (type, market) key for raw frames, so the coalesce policy can match
+# frames without parsing them on the reader. Only last-value frames (a full
+# snapshot of the market) may replace each other; deltas, trades and fills
+# must all be processed
+LAST_VALUE_TYPES = frozenset({"ticker"})
+_FRAME_TYPE_RE = re.compile(r'"type"\s*:\s*"([^"]+)"')
+_FRAME_TICKER_RE = re.compile(r'"(?:market_)?ticker"\s*:\s*"([^"]+)"')
+
+
+def frame_key(message: str) -> Optional[tuple]:
+    """
+    (type, ticker) for a raw last-value market frame, or None (never
+    coalesced) for other types and frames without a ticker.
+    """
+    msg_type = _FRAME_TYPE_RE.search(message)
+    if not msg_type or msg_type.group(1) not in LAST_VALUE_TYPES:
+        return None
+    ticker = _FRAME_TICKER_RE.search(message)
+    if not ticker:
+        return None
+    return (msg_type.group(1), ticker.group(1))
+
 
 class KalshiWebSocketClient:
     """
@@ -62,10 +146,27 @@ class KalshiWebSocketClient:
         self.api_secret = api_secret
         
         self.redis_client: Optional[aioredis.Redis] = None
+        self.redis_writer: Optional[RedisBatchWriter] = None
         self.ws: Optional[websockets.WebSocketClientProtocol] = None
         self.running = False
         self.subscribed_markets: set[str] = set()
         
+        # Frames received over the lifetime of this client (all connections)
+        self.messages_received = 0
+        
+        # Subscription bookkeeping for the current connection: command id ->
+        # [tickers, acks still expected, sent at] until every channel has
+        # acked, and server sid <-> tickers
+        self._cmd_ids = itertools.count(1)
+        self._pending_subscribes: Dict[int, list] = {}
+        self._sid_markets: Dict[int, set[str]] = {}
+        self._market_sids: Dict[str, set[int]] = {}
+        self.inbound = MessageQueue(
+            INBOUND_QUEUE_SIZE,
+            policy=INBOUND_OVERFLOW,
+            key_func=frame_key,
+        )
+        
     async def connect_redis(self):
         """Connect to Redis for caching market data."""
         try:
@@ -74,13 +175,25 @@ class KalshiWebSocketClient:
                 decode_responses=True,
             )
             await self.redis_client.ping()
+            self.redis_writer = RedisBatchWriter(
+                self.redis_client,
+                max_batch=REDIS_MAX_BATCH,
+                flush_interval=REDIS_FLUSH_INTERVAL_MS / 1000,
+                transaction=REDIS_TRANSACTION,
+                coalesce=REDIS_COALESCE,
+                max_staleness=REDIS_MAX_STALENESS_MS / 1000,
+            )
+            await self.redis_writer.start()
             log.info("Connected to Redis")
         except Exception as e:
             log.error(f"Failed to connect to Redis: {e}")
             raise
     
     async def disconnect_redis(self):
-        """Disconnect from Redis."""
+        """Flush pending writes and disconnect from Redis."""
+        if self.redis_writer:
+            await self.redis_writer.stop()
+            self.redis_writer = None
         if self.redis_client:
             await self.redis_client.close()
             log.info("Disconnected from Redis")
@@ -112,6 +225,89 @@ class KalshiWebSocketClient:
             log.error(f"Failed to connect to WebSocket: {e}")
             raise
     
+    @staticmethod
+    def _chunks(tickers: list[str]):
+        size = max(1, SUBSCRIBE_CHUNK_SIZE)
+        for i in range(0, len(tickers), size):
+            yield tickers[i:i + size]
+    
+    async def _send_cmd(self, cmd: str, params: Dict[str, Any]) -> int:
+        cmd_id = next(self._cmd_ids)
+        await self.ws.send(codec.dumps({"id": cmd_id, "cmd": cmd, "params": params}))
+        return cmd_id
+    
+    async def _send_subscribe(self, tickers: list[str]):
+        """Send subscribe commands for `tickers`, SUBSCRIBE_CHUNK_SIZE per frame."""
+        frames = 0
+        for chunk in self._chunks(tickers):
+            cmd_id = await self._send_cmd(
+                "subscribe",
+                {"channels": WS_CHANNELS, "market_tickers": chunk},
+            )
+            self._pending_subscribes[cmd_id] = [chunk, len(WS_CHANNELS), time.monotonic()]
+            frames += 1
+        if frames:
+            log.info(f"Subscribing to {len(tickers)} markets in {frames} frames")
+    
+    async def _on_subscribed(self, data: Dict[str, Any]):
+        """
+        Record the sid the server assigned to one of our subscribe commands.
+        
+        The server acks a command once per channel, each with its own sid,
+        so the command stays pending until all WS_CHANNELS have acked.
+        Markets removed while it was in flight are deleted from the new sid
+        (or the sid is dropped if none are left).
+        """
+        msg = data.get("msg") or data.get("data") or {}
+        sid = msg.get("sid")
+        cmd_id = data.get("id")
+        pending = self._pending_subscribes.get(cmd_id)
+        if sid is None or pending is None:
+            return
+        tickers = pending[0]
+        pending[1] -= 1
+        if pending[1] <= 0:
+            del self._pending_subscribes[cmd_id]
+        
+        wanted = [t for t in tickers if t in self.subscribed_markets]
+        if not wanted:
+            await self._send_cmd("unsubscribe", {"sids": [sid]})
+            return
+        
+        self._sid_markets.setdefault(sid, set()).update(wanted)
+        for ticker in wanted:
+            self._market_sids.setdefault(ticker, set()).add(sid)
+        
+        removed = [t for t in tickers if t not in self.subscribed_markets]
+        for chunk in self._chunks(removed):
+            await self._send_cmd(
+                "update_subscription",
+                {"sids": [sid], "market_tickers": chunk, "action": "delete_markets"},
+            )
+    
+    def _abandon_subscribe(self, cmd_id: int, reason: str):
+        """
+        Stop waiting for a subscribe command. Its markets that no channel
+        confirmed are forgotten, so the next set_subscriptions resends them.
+        """
+        pending = self._pending_subscribes.pop(cmd_id, None)
+        if pending is None:
+            return
+        unconfirmed = {t for t in pending[0] if t not in self._market_sids}
+        self.subscribed_markets.difference_update(unconfirmed)
+        log.warning(f"Subscribe command {cmd_id} {reason}; {len(unconfirmed)} markets left unsubscribed")
+    
+    def _expire_subscribes(self):
+        deadline = time.monotonic() - SUBSCRIBE_ACK_TIMEOUT_SECS
+        for cmd_id in [c for c, p in self._pending_subscribes.items() if p[2] < deadline]:
+            self._abandon_subscribe(cmd_id, f"not acked within {SUBSCRIBE_ACK_TIMEOUT_SECS:g}s")
+    
+    def _reset_subscription_state(self):
+        """Forget sids and in-flight commands (they don't survive a reconnect)."""
+        self._pending_subscribes.clear()
+        self._sid_markets.clear()
+        self._market_sids.clear()
+    
     async def subscribe_to_market(self, ticker: str):
         """
         Subscribe to real-time updates for a specific market.
@@ -119,45 +315,79 @@ class KalshiWebSocketClient:
         Args:
             ticker: Kalshi market ticker (e.g., "BIDEN-2024")
         """
+        await self.subscribe_to_markets([ticker])
+    
+    async def subscribe_to_markets(self, tickers: list[str]):
+        """Subscribe to many markets, batching tickers into as few frames as possible."""
         if not self.ws:
             raise RuntimeError("WebSocket not connected")
         
-        # Kalshi WebSocket subscription message format
-        # This may need adjustment based on actual API documentation
-        subscribe_msg = {
-            "action": "subscribe",
-            "ticker": ticker,
-        }
-        
-        await self.ws.send(json.dumps(subscribe_msg))
-        self.subscribed_markets.add(ticker)
-        log.info(f"Subscribed to market: {ticker}")
-    
-    async def subscribe_to_markets(self, tickers: list[str]):
-        """Subscribe to multiple markets at once."""
-        for ticker in tickers:
-            await self.subscribe_to_market(ticker)
+        new = [t for t in dict.fromkeys(tickers) if t not in self.subscribed_markets]
+        self.subscribed_markets.update(new)
+        await self._send_subscribe(new)
     
     async def unsubscribe_from_market(self, ticker: str):
         """Unsubscribe from a market."""
-        if not self.ws:
+        await self.unsubscribe_from_markets([ticker])
+    
+    async def unsubscribe_from_markets(self, tickers: list[str]):
+        """
+        Unsubscribe from many markets.
+        
+        Subscriptions whose markets are all removed are dropped with one
+        unsubscribe for their sids; partially removed ones get
+        update_subscription/delete_markets frames, chunked like subscribes.
+        """
+        removing = {t for t in tickers if t in self.subscribed_markets}
+        self.subscribed_markets.difference_update(removing)
+        if not self.ws or not removing:
             return
         
-        unsubscribe_msg = {
-            "action": "unsubscribe",
-            "ticker": ticker,
-        }
+        by_sid: Dict[int, list[str]] = {}
+        for ticker in removing:
+            for sid in self._market_sids.pop(ticker, ()):
+                by_sid.setdefault(sid, []).append(ticker)
+        
+        drop_sids = []
+        for sid, sid_tickers in by_sid.items():
+            remaining = self._sid_markets.get(sid, set())
+            remaining.difference_update(sid_tickers)
+            if not remaining:
+                drop_sids.append(sid)
+                self._sid_markets.pop(sid, None)
+                continue
+            for chunk in self._chunks(sid_tickers):
+                await self._send_cmd(
+                    "update_subscription",
+                    {"sids": [sid], "market_tickers": chunk, "action": "delete_markets"},
+                )
+        
+        if drop_sids:
+            await self._send_cmd("unsubscribe", {"sids": drop_sids})
+        log.info(f"Unsubscribed from {len(removing)} markets ({len(drop_sids)} subscriptions dropped)")
+    
+    async def set_subscriptions(self, tickers: list[str]) -> tuple[int, int]:
+        """
+        Make the subscribed set exactly `tickers`, sending only the difference.
+        
+        Returns (added, removed) market counts.
+        """
+        desired = set(tickers)
+        to_remove = list(self.subscribed_markets - desired)
+        to_add = [t for t in dict.fromkeys(tickers) if t not in self.subscribed_markets]
         
-        await self.ws.send(json.dumps(unsubscribe_msg))
-        self.subscribed_markets.discard(ticker)
-        log.info(f"Unsubscribed from market: {ticker}")
+        await self.unsubscribe_from_markets(to_remove)
+        await self.subscribe_to_markets(to_add)
+        return len(to_add), len(to_remove)
     
-    async def process_market_update(self, data: Dict[str, Any]):
+    def process_market_update(self, data: Dict[str, Any]):
         """
         Process a market data update from WebSocket.
         
-        Stores the update in Redis with a TTL for fast access.
+        Queues the update for Redis with a TTL for fast access; the batch
+        writer sends it in the next pipeline flush.
         Format: kalshi:market:{ticker} -> JSON market data
+        With KALSHI_WS_TICK_STREAM, also appended to the kalshi:ticks stream.
         """
         ticker = data.get("ticker")
         if not ticker:
@@ -165,70 +395,131 @@ class KalshiWebSocketClient:
         
         # Store in Redis with 1 hour TTL
         redis_key = f"kalshi:market:{ticker}"
-        await self.redis_client.setex(
-            redis_key,
-            3600,  # 1 hour TTL
-            json.dumps(data),
-        )
+        self.redis_writer.submit(redis_key, REDIS_TTL_SECS, codec.dumps(data))
+        
+        # Append to the tick stream for downstream consumers (history, not
+        # coalesced)
+        ts_ms = int(time.time() * 1000)
+        if TICK_STREAM:
+            self.redis_writer.append(TICK_STREAM_KEY, normalize_tick(ticker, data, ts_ms), TICK_STREAM_MAXLEN)
         
         # Also store latest price in a separate key for quick access
         if "yes_price" in data or "yes_bid" in data:
-            price_data = {
-                "ticker": ticker,
-                "yes_price": data.get("yes_price") or 
-                           ((data.get("yes_bid", 0) + data.get("yes_ask", 0)) / 2),
-                "volume": data.get("volume", 0),
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-            }
-            price_key = f"kalshi:price:{ticker}"
-            await self.redis_client.setex(
-                price_key,
-                3600,
-                json.dumps(price_data),
+            yes_price = data.get("yes_price") or ((data.get("yes_bid", 0) + data.get("yes_ask", 0)) / 2)
+            value = kalshi_quotes.encode_price(
+                ticker,
+                yes_price,
+                data.get("volume", 0),
+                ts_ms,
+                PRICE_ENCODING,
+            )
+            self.redis_writer.submit(
+                kalshi_quotes.price_key(ticker),
+                REDIS_TTL_SECS,
+                value,
+                op="hash" if PRICE_ENCODING == "hash" else "set",
             )
     
     async def handle_message(self, message: str):
         """Handle incoming WebSocket message."""
         try:
-            data = json.loads(message)
+            data = codec.loads(message)
             
             # Handle different message types
             msg_type = data.get("type") or data.get("action")
             
-            if msg_type == "market_update" or "ticker" in data:
-                await self.process_market_update(data)
+            if msg_type == "subscribed":
+                await self._on_subscribed(data)
+            elif msg_type == "ticker" and isinstance(data.get("msg") or data.get("data"), dict):
+                # Channel update: {"type": "ticker", "sid": n, "msg": {"market_ticker": ...}}
+                payload = data.get("msg") or data.get("data")
+                self.process_market_update({"ticker": payload.get("market_ticker"), **payload})
+            elif msg_type == "market_update" or "ticker" in data:
+                self.process_market_update(data)
             elif msg_type == "error":
-                log.error(f"WebSocket error: {data.get('message')}")
+                error = data.get("msg") or {}
+                log.error(f"WebSocket error: {data.get('message') or error.get('msg') or error}")
+                if data.get("id") in self._pending_subscribes:
+                    self._abandon_subscribe(data["id"], "failed")
             elif msg_type == "ping":
                 # Respond to ping
-                await self.ws.send(json.dumps({"type": "pong"}))
+                await self.ws.send(codec.dumps({"type": "pong"}))
             else:
                 log.debug(f"Received message type: {msg_type}")
                 
-        except json.JSONDecodeError as e:
+        except codec.DecodeError as e:
             log.warning(f"Failed to parse WebSocket message: {e}")
         except Exception as e:
             log.error(f"Error handling WebSocket message: {e}")
     
+    async def _process_worker(self):
+        """Take frames off the inbound queue and handle them."""
+        while True:
+            message = await self.inbound.get()
+            try:
+                await self.handle_message(message)
+            finally:
+                self.inbound.task_done()
+    
+    async def _log_stats(self):
+        while True:
+            await asyncio.sleep(STATS_INTERVAL_SECS)
+            log.info(self.inbound.summary())
+    
+    async def _watch_subscribes(self):
+        while True:
+            await asyncio.sleep(max(0.1, SUBSCRIBE_ACK_TIMEOUT_SECS / 2))
+            self._expire_subscribes()
+    
+    @staticmethod
+    def _is_control_frame(message: str) -> bool:
+        """Subscribe acks and errors, handled on the reader so overflow can't drop them."""
+        return '"subscribed"' in message or '"error"' in message
+    
     async def listen(self):
-        """Main listening loop for WebSocket messages."""
+        """
+        Main listening loop for WebSocket messages.
+        
+        The reader only enqueues market frames; PROCESS_WORKERS tasks parse
+        and store them. Subscribe acks and errors are handled on the reader
+        itself, so the inbound overflow policy never drops them. Frames
+        still queued when the socket closes are processed before the workers
+        stop.
+        """
         if not self.ws:
             raise RuntimeError("WebSocket not connected")
         
         self.running = True
-        log.info("Starting WebSocket listener...")
+        log.info(
+            f"Starting WebSocket listener ({PROCESS_WORKERS} workers, "
+            f"queue {INBOUND_QUEUE_SIZE}, overflow={INBOUND_OVERFLOW})..."
+        )
+        
+        tasks = [asyncio.create_task(self._process_worker()) for _ in range(max(1, PROCESS_WORKERS))]
+        tasks.append(asyncio.create_task(self._log_stats()))
+        tasks.append(asyncio.create_task(self._watch_subscribes()))
         
         try:
             async for message in self.ws:
                 if not self.running:
                     break
-                await self.handle_message(message)
+                self.messages_received += 1
+                if self._is_control_frame(message):
+                    await self.handle_message(message)
+                else:
+                    await self.inbound.put(message)
         except websockets.exceptions.ConnectionClosed:
             log.warning("WebSocket connection closed")
         except Exception as e:
             log.error(f"Error in WebSocket listener: {e}")
         finally:
             self.running = False
+            # Let workers finish what was already received
+            await self.inbound.join()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            log.info(self.inbound.summary())
     
     async def start(self, tickers: Optional[list[str]] = None):
         """
@@ -263,9 +554,11 @@ class KalshiWebSocketClient:
                 log.info(f"Reconnection attempt {attempt + 1}/{max_retries}")
                 await self.connect_websocket()
                 
-                # Resubscribe to all markets
+                # Resubscribe to all markets: sids from the old connection are
+                # gone, so replay the whole set in SUBSCRIBE_CHUNK_SIZE frames
+                self._reset_subscription_state()
                 if self.subscribed_markets:
-                    await self.subscribe_to_markets(list(self.subscribed_markets))
+                    await self._send_subscribe(sorted(self.subscribed_markets))
                 
                 # Resume listening
                 await self.listen()
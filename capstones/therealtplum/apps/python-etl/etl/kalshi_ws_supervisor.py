@@ -0,0 +1,291 @@
+"""
+Sharded supervisor for the Kalshi WebSocket feed.
+
+Spreads the active Kalshi universe (instruments where primary_source =
+'kalshi') across KALSHI_WS_SHARDS KalshiWebSocketClient connections using a
+consistent-hash ring, so:
+
+- one slow or dropped connection only affects its own shard
+- each shard is restarted on its own with exponential backoff
+- when the universe changes (checked every KALSHI_WS_REBALANCE_SECS) only
+  the markets that moved are subscribed/unsubscribed, via set_subscriptions()
+- per-shard message rates, market counts and restarts are logged every
+  KALSHI_WS_STATS_INTERVAL_SECS
+
+Run:
+    python -m etl.kalshi_ws_supervisor
+"""
+
+import os
+import asyncio
+import bisect
+import hashlib
+import logging
+import time
+from typing import Callable, Optional
+
+import psycopg2
+
+from etl.kalshi_websocket import KalshiWebSocketClient, STATS_INTERVAL_SECS
+
+DATABASE_URL = os.getenv("DATABASE_URL", "postgres://app:app@db:5432/fmhub")
+
+# Number of websocket connections the universe is spread across
+NUM_SHARDS = int(os.getenv("KALSHI_WS_SHARDS", "4"))
+
+# Virtual nodes per shard on the hash ring (smooths the distribution)
+RING_VNODES = int(os.getenv("KALSHI_WS_RING_VNODES", "64"))
+
+# How often the universe is reloaded from instruments and shards rebalanced
+REBALANCE_SECS = float(os.getenv("KALSHI_WS_REBALANCE_SECS", "300"))
+
+# Backoff between restarts of a failed shard
+RESTART_BACKOFF_BASE_SECS = float(os.getenv("KALSHI_WS_RESTART_BACKOFF_SECS", "1"))
+RESTART_BACKOFF_MAX_SECS = float(os.getenv("KALSHI_WS_RESTART_BACKOFF_MAX_SECS", "60"))
+
+# Force-restart a shard whose connection has received nothing for this long
+# while it has markets assigned (0 = disabled)
+SHARD_IDLE_SECS = float(os.getenv("KALSHI_WS_SHARD_IDLE_SECS", "0"))
+
+# A connection that stayed up this long resets the shard's backoff
+STABLE_CONNECTION_SECS = 60
+
+log = logging.getLogger(__name__)
+
+
+def load_kalshi_universe() -> set[str]:
+    """Tickers of all active Kalshi instruments."""
+    conn = psycopg2.connect(DATABASE_URL)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT ticker
+                FROM instruments
+                WHERE primary_source = 'kalshi'
+                  AND status = 'active'
+                """
+            )
+            return {row[0] for row in cur.fetchall()}
+    finally:
+        conn.close()
+
+
+class HashRing:
+    """
+    Consistent-hash ring mapping keys to shard indexes. Changing the number
+    of shards only moves about 1/N of the keys.
+    """
+
+    def __init__(self, shards: int, vnodes: int = RING_VNODES):
+        points = []
+        for shard in range(shards):
+            for v in range(max(1, vnodes)):
+                points.append((self._hash(f"shard-{shard}-{v}"), shard))
+        points.sort()
+        self._hashes = [h for h, _ in points]
+        self._shards = [s for _, s in points]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def shard_for(self, key: str) -> int:
+        i = bisect.bisect(self._hashes, self._hash(key)) % len(self._hashes)
+        return self._shards[i]
+
+    def assign(self, keys) -> dict[int, set[str]]:
+        assignment: dict[int, set[str]] = {}
+        for key in keys:
+            assignment.setdefault(self.shard_for(key), set()).add(key)
+        return assignment
+
+
+class Shard:
+    """One websocket connection and the markets assigned to it."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.client = KalshiWebSocketClient()
+        self.markets: set[str] = set()
+        self.task: Optional[asyncio.Task] = None
+        self.restarts = 0
+        self.connected_at: Optional[float] = None
+
+        # For per-interval message rates and the idle watchdog
+        self._last_count = 0
+        self._last_stats_at = time.monotonic()
+        self._last_message_at = time.monotonic()
+
+    @property
+    def connected(self) -> bool:
+        return self.connected_at is not None and self.client.running
+
+    def message_rate(self) -> float:
+        now = time.monotonic()
+        count = self.client.messages_received
+        rate = (count - self._last_count) / max(now - self._last_stats_at, 1e-9)
+        self._last_count, self._last_stats_at = count, now
+        return rate
+
+
+class KalshiWebSocketSupervisor:
+    def __init__(
+        self,
+        shards: int = NUM_SHARDS,
+        universe_loader: Callable[[], set[str]] = load_kalshi_universe,
+    ):
+        self.ring = HashRing(max(1, shards))
+        self.shards = [Shard(i) for i in range(max(1, shards))]
+        self.universe_loader = universe_loader
+        self.universe: set[str] = set()
+        self.running = False
+
+    # ------------------------------------------------------------------
+    # Assignment
+    # ------------------------------------------------------------------
+
+    async def rebalance(self):
+        """Reload the universe and push only the changes to each shard."""
+        try:
+            universe = await asyncio.to_thread(self.universe_loader)
+        except Exception as e:
+            log.error(f"Failed to load Kalshi universe, keeping previous assignment: {e}")
+            return
+
+        added = len(universe - self.universe)
+        removed = len(self.universe - universe)
+        self.universe = universe
+        assignment = self.ring.assign(universe)
+
+        for shard in self.shards:
+            shard.markets = assignment.get(shard.index, set())
+            if shard.connected:
+                try:
+                    await shard.client.set_subscriptions(sorted(shard.markets))
+                except Exception as e:
+                    # The shard's connection is failing; its restart resubscribes
+                    log.warning(f"Shard {shard.index}: rebalance failed ({e})")
+
+        log.info(
+            f"Universe: {len(universe)} markets (+{added} / -{removed}) across "
+            f"{len(self.shards)} shards: {[len(s.markets) for s in self.shards]}"
+        )
+
+    async def _rebalance_loop(self):
+        while self.running:
+            await asyncio.sleep(REBALANCE_SECS)
+            await self.rebalance()
+
+    # ------------------------------------------------------------------
+    # Shard lifecycle
+    # ------------------------------------------------------------------
+
+    async def _run_shard(self, shard: Shard):
+        """Keep one shard connected, restarting it with backoff when it fails."""
+        client = shard.client
+        failures = 0
+
+        while self.running:
+            try:
+                if client.redis_client is None:
+                    await client.connect_redis()
+                await client.connect_websocket()
+                shard.connected_at = time.monotonic()
+                shard._last_message_at = shard.connected_at
+
+                # Fresh connection: no sids survive, subscribe the full set
+                client._reset_subscription_state()
+                client.subscribed_markets.clear()
+                await client.subscribe_to_markets(sorted(shard.markets))
+                log.info(f"Shard {shard.index}: connected with {len(shard.markets)} markets")
+
+                await client.listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"Shard {shard.index}: connection failed: {e}")
+
+            if not self.running:
+                break
+
+            uptime = time.monotonic() - shard.connected_at if shard.connected_at else 0
+            shard.connected_at = None
+            failures = 0 if uptime >= STABLE_CONNECTION_SECS else failures + 1
+            shard.restarts += 1
+
+            delay = min(RESTART_BACKOFF_MAX_SECS, RESTART_BACKOFF_BASE_SECS * (2 ** failures))
+            log.warning(f"Shard {shard.index}: restarting in {delay:.1f}s (restart #{shard.restarts})")
+            await asyncio.sleep(delay)
+
+    async def _stats_loop(self):
+        while self.running:
+            await asyncio.sleep(STATS_INTERVAL_SECS)
+            now = time.monotonic()
+            parts = []
+            for shard in self.shards:
+                rate = shard.message_rate()
+                if rate > 0:
+                    shard._last_message_at = now
+                parts.append(
+                    f"#{shard.index}: {rate:.1f} msg/s, {len(shard.markets)} markets, "
+                    f"{'up' if shard.connected else 'down'}, {shard.restarts} restarts"
+                )
+
+                # Watchdog: a silent connection with markets assigned is
+                # treated as dead and closed so _run_shard restarts it
+                idle = now - shard._last_message_at
+                if SHARD_IDLE_SECS and shard.connected and shard.markets and idle >= SHARD_IDLE_SECS:
+                    log.warning(f"Shard {shard.index}: no messages for {idle:.0f}s, forcing restart")
+                    await shard.client.ws.close()
+            log.info("Shards: " + " | ".join(parts))
+
+    # ------------------------------------------------------------------
+    # Entry points
+    # ------------------------------------------------------------------
+
+    async def run(self):
+        self.running = True
+        await self.rebalance()
+
+        for shard in self.shards:
+            shard.task = asyncio.create_task(self._run_shard(shard))
+        background = [
+            asyncio.create_task(self._rebalance_loop()),
+            asyncio.create_task(self._stats_loop()),
+        ]
+
+        try:
+            await asyncio.gather(*(shard.task for shard in self.shards))
+        finally:
+            for task in background:
+                task.cancel()
+            await asyncio.gather(*background, return_exceptions=True)
+
+    async def stop(self):
+        self.running = False
+        for shard in self.shards:
+            shard.client.running = False
+            if shard.task:
+                shard.task.cancel()
+        for shard in self.shards:
+            if shard.task:
+                await asyncio.gather(shard.task, return_exceptions=True)
+            try:
+                await shard.client.stop()
+            except Exception as e:
+                log.warning(f"Shard {shard.index}: error during stop: {e}")
+
+
+async def main():
+    supervisor = KalshiWebSocketSupervisor()
+    try:
+        await supervisor.run()
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        log.info("Received interrupt signal")
+    finally:
+        await supervisor.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,149 @@
+"""
+Bounded asyncio queue with a selectable overflow policy.
+
+Sits between a websocket receive loop and its processing tasks so the
+reader never waits on parsing, Redis or DB work. Policies:
+
+- "drop_oldest": when full, evict the oldest queued item to make room
+                 (reader never waits)
+- "coalesce":    an item whose key is already queued replaces it in place;
+                 when full, a new key evicts the oldest (reader never waits)
+- "block":       when full, wait for space (lossless; backpressure reaches
+                 the socket)
+
+Items without a key (key_func returns None) are never coalesced.
+
+As with asyncio.Queue, workers call task_done() per item and join() waits
+until every queued item has been processed (evicted items count as done).
+
+Usage:
+    q = MessageQueue(10000, policy="coalesce", key_func=frame_key)
+    await q.put(frame)        # in the receive loop
+    frame = await q.get()     # in each worker task
+    q.task_done()
+    await q.join()            # on shutdown: let workers drain the queue
+"""
+
+import asyncio
+import itertools
+from collections import deque
+from typing import Any, Callable, Hashable, Optional
+
+POLICIES = ("drop_oldest", "coalesce", "block")
+
+
+class MessageQueue:
+    def __init__(
+        self,
+        maxsize: int,
+        policy: str = "drop_oldest",
+        key_func: Optional[Callable[[Any], Optional[Hashable]]] = None,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r}; expected one of {POLICIES}")
+        if policy == "coalesce" and key_func is None:
+            raise ValueError("coalesce policy needs a key_func")
+
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.key_func = key_func
+
+        # Queue order is kept as keys; items live in _items. Unkeyed items get
+        # a unique key so they are never replaced.
+        self._order: deque = deque()
+        self._items: dict = {}
+        self._unique = itertools.count()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._unfinished = 0
+        self._finished = asyncio.Event()
+        self._finished.set()
+
+        # Counters
+        self.enqueued = 0
+        self.dequeued = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.blocked_secs = 0.0
+        self.max_depth = 0
+
+    def qsize(self) -> int:
+        return len(self._order)
+
+    def full(self) -> bool:
+        return len(self._order) >= self.maxsize
+
+    def _key(self, item: Any) -> Hashable:
+        key = self.key_func(item) if self.policy == "coalesce" else None
+        return key if key is not None else ("_unique", next(self._unique))
+
+    def _evict_oldest(self):
+        key = self._order.popleft()
+        del self._items[key]
+        self.dropped += 1
+        self._done()
+
+    async def put(self, item: Any):
+        """Enqueue an item; only ever waits under the "block" policy."""
+        key = self._key(item)
+
+        if key in self._items:
+            # Same key already queued: newest item takes its place
+            self._items[key] = item
+            self.coalesced += 1
+            return
+
+        if self.full():
+            if self.policy == "block":
+                loop = asyncio.get_running_loop()
+                start = loop.time()
+                while self.full():
+                    self._not_full.clear()
+                    await self._not_full.wait()
+                self.blocked_secs += loop.time() - start
+            else:
+                self._evict_oldest()
+
+        self._order.append(key)
+        self._items[key] = item
+        self.enqueued += 1
+        self._unfinished += 1
+        self._finished.clear()
+        self.max_depth = max(self.max_depth, len(self._order))
+        self._not_empty.set()
+
+    async def get(self) -> Any:
+        while not self._order:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+
+        key = self._order.popleft()
+        item = self._items.pop(key)
+        self.dequeued += 1
+        self._not_full.set()
+        return item
+
+    def _done(self):
+        self._unfinished -= 1
+        if self._unfinished <= 0:
+            self._unfinished = 0
+            self._finished.set()
+
+    def task_done(self):
+        """Mark an item returned by get() as processed."""
+        if self._unfinished <= 0:
+            raise ValueError("task_done() called too many times")
+        self._done()
+
+    async def join(self):
+        """Wait until every queued item has been taken and marked done."""
+        await self._finished.wait()
+
+    def summary(self) -> str:
+        return (
+            f"Inbound queue ({self.policy}): depth {self.qsize()}/{self.maxsize} "
+            f"(max {self.max_depth}), enqueued {self.enqueued}, processed {self.dequeued}, "
+            f"dropped {self.dropped}, coalesced {self.coalesced}, "
+            f"reader blocked {self.blocked_secs:.2f}s"
+        )
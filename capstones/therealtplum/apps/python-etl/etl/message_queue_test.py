@@ -0,0 +1,104 @@
+"""
+Unit tests for MessageQueue overflow policies and join().
+
+Run with: python -m pytest etl/message_queue_test.py
+Or: python etl/message_queue_test.py
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from etl.message_queue import MessageQueue
+
+
+def last_value_key(item):
+    kind, market, _ = item
+    return (kind, market) if kind == "ticker" else None
+
+
+async def drain(queue):
+    items = []
+    while queue.qsize():
+        items.append(await queue.get())
+        queue.task_done()
+    return items
+
+
+class TestOverflow(unittest.TestCase):
+    def test_coalesce_only_keyed_items(self):
+        async def run():
+            q = MessageQueue(10, policy="coalesce", key_func=last_value_key)
+            await q.put(("ticker", "A", 1))
+            await q.put(("fill", "A", 1))
+            await q.put(("ticker", "A", 2))
+            await q.put(("fill", "A", 2))
+            return q, await drain(q)
+
+        q, items = asyncio.run(run())
+        # The newer ticker takes the older one's place; both fills survive
+        self.assertEqual(items, [("ticker", "A", 2), ("fill", "A", 1), ("fill", "A", 2)])
+        self.assertEqual(q.coalesced, 1)
+
+    def test_drop_oldest(self):
+        async def run():
+            q = MessageQueue(2, policy="drop_oldest")
+            for i in range(3):
+                await q.put(i)
+            return q, await drain(q)
+
+        q, items = asyncio.run(run())
+        self.assertEqual(items, [1, 2])
+        self.assertEqual(q.dropped, 1)
+
+
+class TestJoin(unittest.TestCase):
+    def test_join_waits_for_task_done(self):
+        async def run():
+            q = MessageQueue(10)
+            processed = []
+
+            async def worker():
+                while True:
+                    item = await q.get()
+                    await asyncio.sleep(0.01)
+                    processed.append(item)
+                    q.task_done()
+
+            for i in range(3):
+                await q.put(i)
+            task = asyncio.create_task(worker())
+            await asyncio.wait_for(q.join(), timeout=1.0)
+            task.cancel()
+            return processed
+
+        self.assertEqual(asyncio.run(run()), [0, 1, 2])
+
+    def test_evicted_items_count_as_done(self):
+        async def run():
+            q = MessageQueue(1, policy="drop_oldest")
+            await q.put("old")
+            await q.put("new")
+            await drain(q)
+            await asyncio.wait_for(q.join(), timeout=1.0)
+
+        asyncio.run(run())
+
+    def test_task_done_too_many_times(self):
+        async def run():
+            q = MessageQueue(1)
+            await q.put("x")
+            await q.get()
+            q.task_done()
+            q.task_done()
+
+        with self.assertRaises(ValueError):
+            asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
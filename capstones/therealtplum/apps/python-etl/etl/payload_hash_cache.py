@@ -0,0 +1,132 @@
+"""
+In-memory cache of instruments.source_payload_hash for one primary_source.
+
+Reference loaders (polygon_instruments, kalshi_instruments) preload every
+(ticker, source_payload_hash) pair once at startup, check each incoming
+payload's hash locally, and only send new or changed rows to Postgres.
+
+Modes (PAYLOAD_HASH_PRELOAD):
+- "full":    keep the hex digest per ticker
+- "compact": keep only the first 8 bytes of the digest as an int, roughly a
+             third of the memory per entry; a change is missed only on a
+             64-bit prefix collision
+- "off":     no preload, every row goes to the DB as before
+
+PAYLOAD_HASH_PRELOAD_MAX_ROWS bounds how many entries the cache holds,
+both at preload and as writes are remembered during the run. Tickers that
+didn't fit are simply treated as unknown and checked by the DB, so a
+partial cache is always safe.
+
+Hashes of rows written during the run are staged and only remembered once
+the caller's transaction commits:
+
+    cache.stage(ticker, payload_hash)   # after the write statement
+    conn.commit()
+    cache.commit()
+"""
+
+import os
+import logging
+from typing import Optional
+
+PRELOAD_MODE = os.getenv("PAYLOAD_HASH_PRELOAD", "full").lower()
+PRELOAD_MAX_ROWS = int(os.getenv("PAYLOAD_HASH_PRELOAD_MAX_ROWS", "0"))  # 0 = no limit
+
+# Rows fetched per round trip from the server-side cursor while preloading
+PRELOAD_FETCH_SIZE = 10000
+
+log = logging.getLogger(__name__)
+
+
+class PayloadHashCache:
+    """
+    ticker -> payload hash lookup used to skip unchanged instruments.
+    """
+
+    def __init__(self, compact: bool = False, max_rows: int = PRELOAD_MAX_ROWS):
+        self.compact = compact
+        self.max_rows = max_rows
+        self._hashes: dict = {}
+        # Written in the current (uncommitted) transaction
+        self._staged: dict = {}
+        self.skipped = 0
+        self.passed = 0
+
+    def _key(self, payload_hash: str):
+        if self.compact:
+            return int(payload_hash[:16], 16)
+        return payload_hash
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def is_unchanged(self, ticker: Optional[str], payload_hash: str) -> bool:
+        """
+        True if we already hold exactly this hash for the ticker. A staged
+        hash counts: skipping a repeat of a row written in the same
+        transaction is equivalent to writing it again.
+        """
+        if ticker and self._staged.get(ticker, self._hashes.get(ticker)) == self._key(payload_hash):
+            self.skipped += 1
+            return True
+        self.passed += 1
+        return False
+
+    def _store(self, ticker: str, key) -> bool:
+        if self.max_rows and ticker not in self._hashes and len(self._hashes) >= self.max_rows:
+            return False
+        self._hashes[ticker] = key
+        return True
+
+    def remember(self, ticker: str, payload_hash: str) -> bool:
+        """
+        Record a hash known to be in the DB. Once max_rows tickers are held
+        only existing entries are updated; returns False if it didn't fit.
+        """
+        return self._store(ticker, self._key(payload_hash))
+
+    def stage(self, ticker: str, payload_hash: str):
+        """Record a hash written in the open transaction; see commit()."""
+        self._staged[ticker] = self._key(payload_hash)
+
+    def commit(self):
+        """Remember everything staged; call right after the DB commit."""
+        for ticker, key in self._staged.items():
+            self._store(ticker, key)
+        self._staged.clear()
+
+    @classmethod
+    def load(cls, conn, primary_source: str, mode: Optional[str] = None) -> Optional["PayloadHashCache"]:
+        """
+        Stream all (ticker, source_payload_hash) pairs for primary_source into
+        a new cache. Returns None when preloading is turned off.
+        """
+        mode = (mode or PRELOAD_MODE).lower()
+        if mode == "off":
+            return None
+
+        cache = cls(compact=(mode == "compact"))
+
+        # Named (server-side) cursor so a large universe is never materialised
+        # in one fetchall on the client
+        with conn.cursor(name="payload_hash_preload") as cur:
+            cur.itersize = PRELOAD_FETCH_SIZE
+            cur.execute(
+                """
+                SELECT ticker, source_payload_hash
+                FROM instruments
+                WHERE primary_source = %s
+                  AND source_payload_hash IS NOT NULL
+                """,
+                (primary_source,),
+            )
+            for ticker, payload_hash in cur:
+                if not cache.remember(ticker, payload_hash):
+                    log.info(
+                        f"Payload hash preload hit PAYLOAD_HASH_PRELOAD_MAX_ROWS={cache.max_rows}; "
+                        "remaining tickers will be checked in the DB"
+                    )
+                    break
+
+        log.info(f"Preloaded {len(cache)} payload hashes for primary_source={primary_source} (mode={mode})")
+        return cache
@@ -0,0 +1,66 @@
+"""
+Unit tests for PayloadHashCache.
+
+Run with: python -m pytest etl/payload_hash_cache_test.py
+Or: python etl/payload_hash_cache_test.py
+"""
+
+import os
+import sys
+import unittest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from etl.payload_hash_cache import PayloadHashCache
+
+HASH_A = "a" * 64
+HASH_B = "b" * 64
+
+
+class TestStaging(unittest.TestCase):
+    def test_staged_hash_remembered_only_after_commit(self):
+        cache = PayloadHashCache()
+        cache.stage("AAPL", HASH_A)
+        self.assertEqual(len(cache), 0)
+        cache.commit()
+        self.assertEqual(len(cache), 1)
+        self.assertTrue(cache.is_unchanged("AAPL", HASH_A))
+
+    def test_staged_hash_skips_repeats_in_same_transaction(self):
+        cache = PayloadHashCache()
+        cache.remember("AAPL", HASH_A)
+        cache.stage("AAPL", HASH_B)
+        self.assertTrue(cache.is_unchanged("AAPL", HASH_B))
+        self.assertFalse(cache.is_unchanged("AAPL", HASH_A))
+
+    def test_compact_keys(self):
+        cache = PayloadHashCache(compact=True)
+        cache.remember("AAPL", HASH_A)
+        self.assertTrue(cache.is_unchanged("AAPL", HASH_A))
+        self.assertFalse(cache.is_unchanged("AAPL", HASH_B))
+
+
+class TestMaxRows(unittest.TestCase):
+    def test_cap_applies_during_the_run(self):
+        cache = PayloadHashCache(max_rows=2)
+        self.assertTrue(cache.remember("A", HASH_A))
+        self.assertTrue(cache.remember("B", HASH_A))
+        self.assertFalse(cache.remember("C", HASH_A))
+        for ticker in ("C", "D"):
+            cache.stage(ticker, HASH_A)
+        cache.commit()
+        self.assertEqual(len(cache), 2)
+        # Tickers that didn't fit are unknown, i.e. checked by the DB
+        self.assertFalse(cache.is_unchanged("D", HASH_A))
+
+    def test_cap_still_updates_held_tickers(self):
+        cache = PayloadHashCache(max_rows=1)
+        cache.remember("A", HASH_A)
+        cache.stage("A", HASH_B)
+        cache.commit()
+        self.assertTrue(cache.is_unchanged("A", HASH_B))
+
+
+if __name__ == "__main__":
+    unittest.main()
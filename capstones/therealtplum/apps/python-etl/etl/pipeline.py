@@ -0,0 +1,200 @@
+"""
+Producer/consumer stage for overlapping network fetches with DB writes.
+
+Cursor-paginated reference loads (polygon_instruments, kalshi_instruments)
+used to fetch a page, write it, commit, and only then fetch the next page,
+so every page paid network latency + DB latency back to back. A
+PipelineStage runs the page iterator on a background thread and hands pages
+to the caller through a bounded queue, so the next fetch is in flight while
+the current page is written.
+
+The writing side stays on the calling thread, so the caller's psycopg2
+connection is never shared across threads.
+
+Usage:
+    stage = PipelineStage(iter_pages(...), name="polygon_instruments")
+    for page in stage:
+        write(page)
+        conn.commit()
+    log.info(stage.stats.summary())
+
+Errors raised by the source are re-raised on the consumer side; if the
+consumer stops early the producer is told to stop and joined.
+"""
+
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator
+
+# Pages buffered between the fetch and write sides
+DEFAULT_QUEUE_SIZE = int(os.getenv("ETL_PIPELINE_QUEUE_SIZE", "2"))
+
+# How often a blocked producer re-checks whether the consumer has gone away
+_PUT_POLL_SECS = 0.1
+
+_DONE = object()
+
+
+@dataclass
+class PipelineStats:
+    """
+    Counters and timings for one PipelineStage run.
+
+    fetch_secs / write_secs are the busy time of each stage. producer_wait_secs
+    is time the producer spent blocked on a full queue (writes are the
+    bottleneck); consumer_wait_secs is time the consumer spent waiting on an
+    empty queue (fetches are the bottleneck).
+    """
+
+    name: str = "pipeline"
+    items: int = 0
+    fetch_secs: float = 0.0
+    write_secs: float = 0.0
+    producer_wait_secs: float = 0.0
+    consumer_wait_secs: float = 0.0
+    max_queue_depth: int = 0
+    queue_depth_total: int = 0
+    wall_secs: float = 0.0
+
+    @property
+    def avg_queue_depth(self) -> float:
+        return self.queue_depth_total / self.items if self.items else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"Pipeline {self.name}: {self.items} items in {self.wall_secs:.2f}s "
+            f"(fetch {self.fetch_secs:.2f}s, write {self.write_secs:.2f}s, "
+            f"producer waited {self.producer_wait_secs:.2f}s, "
+            f"consumer waited {self.consumer_wait_secs:.2f}s, "
+            f"queue depth avg {self.avg_queue_depth:.1f} / max {self.max_queue_depth})"
+        )
+
+
+class _ProducerError:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+class PipelineStage:
+    """
+    Iterate `source` on a background thread, buffering up to `maxsize` items.
+
+    With threaded=False the source is consumed inline (no overlap) but the
+    same stats are collected, so both modes log comparable numbers.
+    """
+
+    def __init__(
+        self,
+        source: Iterable,
+        maxsize: int | None = None,
+        name: str = "pipeline",
+        threaded: bool = True,
+    ):
+        self.source = source
+        self.maxsize = max(1, maxsize or DEFAULT_QUEUE_SIZE)
+        self.threaded = threaded
+        self.stats = PipelineStats(name=name)
+        self._queue: queue.Queue = queue.Queue(maxsize=self.maxsize)
+        self._stop = threading.Event()
+
+    @property
+    def queue_depth(self) -> int:
+        """Items fetched and waiting to be written right now."""
+        return self._queue.qsize()
+
+    # ------------------------------------------------------------------
+    # Producer (background thread)
+    # ------------------------------------------------------------------
+
+    def _put(self, item: Any) -> bool:
+        start = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(item, timeout=_PUT_POLL_SECS)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            self.stats.producer_wait_secs += time.monotonic() - start
+
+    def _produce(self):
+        it = iter(self.source)
+        try:
+            while not self._stop.is_set():
+                start = time.monotonic()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    break
+                finally:
+                    self.stats.fetch_secs += time.monotonic() - start
+                if not self._put(item):
+                    return
+            self._put(_DONE)
+        except BaseException as e:
+            self._put(_ProducerError(e))
+
+    # ------------------------------------------------------------------
+    # Consumer (calling thread)
+    # ------------------------------------------------------------------
+
+    def __iter__(self) -> Iterator:
+        if not self.threaded:
+            yield from self._iter_inline()
+            return
+
+        started = time.monotonic()
+        producer = threading.Thread(
+            target=self._produce,
+            name=f"{self.stats.name}-producer",
+            daemon=True,
+        )
+        producer.start()
+        try:
+            while True:
+                depth = self._queue.qsize()
+                start = time.monotonic()
+                item = self._queue.get()
+                self.stats.consumer_wait_secs += time.monotonic() - start
+
+                if item is _DONE:
+                    return
+                if isinstance(item, _ProducerError):
+                    raise item.exc
+
+                self.stats.items += 1
+                self.stats.queue_depth_total += depth
+                self.stats.max_queue_depth = max(self.stats.max_queue_depth, depth)
+
+                start = time.monotonic()
+                yield item
+                self.stats.write_secs += time.monotonic() - start
+        finally:
+            self._stop.set()
+            producer.join()
+            self.stats.wall_secs = time.monotonic() - started
+
+    def _iter_inline(self) -> Iterator:
+        started = time.monotonic()
+        it = iter(self.source)
+        try:
+            while True:
+                start = time.monotonic()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+                finally:
+                    self.stats.fetch_secs += time.monotonic() - start
+
+                self.stats.items += 1
+                start = time.monotonic()
+                yield item
+                self.stats.write_secs += time.monotonic() - start
+        finally:
+            self.stats.wall_secs = time.monotonic() - started
@@ -0,0 +1,165 @@
+"""
+Shared Polygon REST client for the ETL jobs.
+
+Provides:
+- one pooled keep-alive requests.Session per process (no TLS handshake per call)
+- a process-wide token-bucket rate limiter sized to our Polygon plan
+- retry with jittered exponential backoff on 429 / 5xx / connection errors
+- iter_pages() to walk Polygon's next_url pagination
+
+Usage:
+    from etl import polygon_client
+
+    data = polygon_client.get_json("/v1/marketstatus/now")
+    for page in polygon_client.iter_pages("/v3/reference/tickers", {"limit": 1000}):
+        ...
+"""
+
+import os
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from etl import codec
+from etl.rate_limit import TokenBucket
+
+BASE_URL = os.getenv("POLYGON_BASE_URL", "https://api.polygon.io")
+
+# Polygon plan request budget for this process (0 = unlimited)
+MAX_REQUESTS_PER_SEC = float(os.getenv("POLYGON_MAX_REQUESTS_PER_SEC", "50"))
+
+# How many requests may go out back-to-back before the limiter spaces them
+REQUEST_BURST = int(os.getenv("POLYGON_REQUEST_BURST", "1"))
+
+# Keep-alive connections held open to api.polygon.io
+POOL_SIZE = int(os.getenv("POLYGON_POOL_SIZE", "16"))
+
+# Retries on 429 / 5xx / connection errors, with jittered exponential backoff
+MAX_RETRIES = int(os.getenv("POLYGON_MAX_RETRIES", "4"))
+BACKOFF_BASE_SECS = float(os.getenv("POLYGON_BACKOFF_BASE_SECS", "0.5"))
+BACKOFF_MAX_SECS = float(os.getenv("POLYGON_BACKOFF_MAX_SECS", "30"))
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+log = logging.getLogger(__name__)
+
+rate_limiter = TokenBucket(MAX_REQUESTS_PER_SEC, burst=REQUEST_BURST)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_api_key() -> Optional[str]:
+    return os.getenv("POLYGON_API_KEY")
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _backoff_delay(attempt: int, resp: Optional[requests.Response] = None) -> float:
+    """
+    Full-jitter exponential backoff, honouring Retry-After on 429s when present.
+    """
+    if resp is not None:
+        retry_after = resp.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(BACKOFF_MAX_SECS, float(retry_after))
+            except ValueError:
+                pass
+    ceiling = min(BACKOFF_MAX_SECS, BACKOFF_BASE_SECS * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+def get(url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 30) -> requests.Response:
+    """
+    GET a Polygon endpoint through the shared session and rate limiter.
+
+    `url` may be a path ("/v3/reference/tickers") or a full URL such as a
+    next_url from a previous page. The API key is added automatically.
+
+    Retries 429 / 5xx responses and connection errors up to MAX_RETRIES times,
+    then raises the usual requests exceptions.
+    """
+    if not url.startswith("http"):
+        url = f"{BASE_URL}{url}"
+
+    params = dict(params or {})
+    params.setdefault("apiKey", get_api_key())
+
+    session = get_session()
+    attempt = 0
+    while True:
+        rate_limiter.acquire()
+        try:
+            resp = session.get(url, params=params, timeout=timeout)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt >= MAX_RETRIES:
+                raise
+            delay = _backoff_delay(attempt)
+            log.warning(f"Polygon request error ({e}); retry {attempt + 1}/{MAX_RETRIES} in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
+            continue
+
+        if resp.status_code in RETRY_STATUS_CODES and attempt < MAX_RETRIES:
+            delay = _backoff_delay(attempt, resp)
+            log.warning(
+                f"Polygon returned {resp.status_code} for {url}; "
+                f"retry {attempt + 1}/{MAX_RETRIES} in {delay:.2f}s"
+            )
+            time.sleep(delay)
+            attempt += 1
+            continue
+
+        resp.raise_for_status()
+        return resp
+
+
+def get_json(url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 30) -> Any:
+    """GET a Polygon endpoint and return the decoded JSON body."""
+    return codec.loads(get(url, params=params, timeout=timeout).content)
+
+
+def iter_pages(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    timeout: float = 30,
+    max_pages: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield each JSON page of a paginated Polygon endpoint, following next_url.
+
+    The first request uses `params`; next_url already carries the cursor and
+    query, so later requests only add the API key.
+    """
+    data = get_json(url, params=params, timeout=timeout)
+    page = 1
+    while True:
+        yield data
+
+        next_url = data.get("next_url")
+        if not next_url:
+            return
+        if max_pages is not None and page >= max_pages:
+            log.warning(f"Stopping pagination after {page} pages (max_pages={max_pages})")
+            return
+
+        page += 1
+        data = get_json(next_url, timeout=timeout)
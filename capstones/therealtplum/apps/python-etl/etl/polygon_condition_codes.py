@@ -11,6 +11,8 @@ import requests
 import psycopg2
 from typing import List, Dict, Any
 
+from etl import polygon_client
+
 POLYGON_API_KEY = os.getenv("POLYGON_API_KEY")
 if not POLYGON_API_KEY:
     raise RuntimeError("POLYGON_API_KEY environment variable is required")
@@ -38,31 +40,16 @@ def fetch_condition_codes(limit: int = 1000) -> List[Dict[str, Any]]:
     Returns:
         List of condition code dictionaries
     """
-    url = "https://api.polygon.io/v3/reference/conditions"
+    url = "/v3/reference/conditions"
     params = {
-        "apiKey": POLYGON_API_KEY,
         "limit": limit,
     }
     
     all_results = []
-    next_url = None
     
     try:
-        while True:
-            if next_url:
-                log.info(f"Fetching next page: {next_url}")
-                resp = requests.get(
-                    next_url,
-                    params={"apiKey": POLYGON_API_KEY},
-                    timeout=30,
-                )
-            else:
-                log.info(f"Fetching condition codes from Polygon: {url}")
-                resp = requests.get(url, params=params, timeout=30)
-            
-            resp.raise_for_status()
-            data = resp.json()
-            
+        log.info(f"Fetching condition codes from Polygon: {url}")
+        for data in polygon_client.iter_pages(url, params):
             if data.get("status") != "OK":
                 log.warning(f"Non-OK status from Polygon: {data.get('status')}")
                 break
@@ -70,10 +57,6 @@ def fetch_condition_codes(limit: int = 1000) -> List[Dict[str, Any]]:
             results = data.get("results", []) or []
             all_results.extend(results)
             log.info(f"Received {len(results)} condition codes (total: {len(all_results)})")
-            
-            next_url = data.get("next_url")
-            if not next_url:
-                break
                 
         log.info(f"Fetched {len(all_results)} total condition codes")
         return all_results
@@ -1,10 +1,13 @@
 import os
-import json
-import hashlib
+import io
+import csv
 import logging
-import requests
 import psycopg2
 
+from etl import codec, polygon_client
+from etl.payload_hash_cache import PayloadHashCache
+from etl.pipeline import PipelineStage
+
 POLYGON_API_KEY = os.getenv("POLYGON_API_KEY")
 if not POLYGON_API_KEY:
     raise RuntimeError("POLYGON_API_KEY environment variable is required for polygon_instruments ETL")
@@ -17,6 +20,31 @@ logging.basicConfig(
 )
 log = logging.getLogger(__name__)
 
+# "bulk": COPY each page into a temp staging table and merge it into
+#         instruments with a single INSERT ... ON CONFLICT statement
+# "row":  SELECT-then-UPDATE/INSERT per ticker (original behaviour)
+UPSERT_MODE = os.getenv("POLYGON_INSTRUMENTS_UPSERT_MODE", "bulk").lower()
+
+# Fetch pages on a background thread while earlier pages are being written
+# (see etl.pipeline); "false" runs fetch and write strictly in turn
+PIPELINE = os.getenv("POLYGON_INSTRUMENTS_PIPELINE", "true").lower() in ("1", "true", "yes")
+
+PRIMARY_SOURCE = "polygon_reference"
+
+# Columns carried through the staging table, in COPY order
+STAGE_COLUMNS = (
+    "ticker",
+    "name",
+    "asset_class",
+    "exchange",
+    "currency_code",
+    "region",
+    "country_code",
+    "primary_source",
+    "status",
+    "source_payload_hash",
+)
+
 
 def get_conn():
     return psycopg2.connect(DATABASE_URL)
@@ -76,19 +104,22 @@ def compute_payload_hash(ticker: dict) -> str:
         "currency_name": ticker.get("currency_name"),
         "locale": ticker.get("locale"),
     }
-    s = json.dumps(relevant, sort_keys=True)
-    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+    return codec.payload_hash(relevant)
 
 
 # ----------------------------------------------------------------------
-# Upsert with change detection (no ON CONFLICT)
+# Map a Polygon ticker payload to our instruments columns
 # ----------------------------------------------------------------------
 
 
-def upsert_instrument(cur, t: dict):
+def instrument_row(t: dict) -> dict | None:
+    """
+    Build the instruments column values (see STAGE_COLUMNS) for one Polygon
+    reference ticker, or None if the payload has no ticker.
+    """
     ticker = t.get("ticker")
     if not ticker:
-        return
+        return None
 
     name = t.get("name") or ticker
     market = t.get("market")
@@ -106,10 +137,42 @@ def upsert_instrument(cur, t: dict):
     region = (locale or "us").upper()
     country_code = "US" if region == "US" else None
 
-    primary_source = "polygon_reference"
     status = "active" if t.get("active", True) else "inactive"
 
-    payload_hash = compute_payload_hash(t)
+    return {
+        "ticker": ticker,
+        "name": name,
+        "asset_class": asset_class,
+        "exchange": exchange,
+        "currency_code": currency_code,
+        "region": region,
+        "country_code": country_code,
+        "primary_source": PRIMARY_SOURCE,
+        "status": status,
+        "source_payload_hash": compute_payload_hash(t),
+    }
+
+
+# ----------------------------------------------------------------------
+# Upsert with change detection (no ON CONFLICT)
+# ----------------------------------------------------------------------
+
+
+def upsert_instrument(cur, t: dict, hash_cache: PayloadHashCache | None = None):
+    row = instrument_row(t)
+    if row is None:
+        return
+
+    ticker = row["ticker"]
+    primary_source = row["primary_source"]
+    payload_hash = row["source_payload_hash"]
+
+    # 0) Skip without a round trip if the preloaded hash already matches
+    if hash_cache is not None:
+        if hash_cache.is_unchanged(ticker, payload_hash):
+            return
+        # Remembered only once the page's transaction commits
+        hash_cache.stage(ticker, payload_hash)
 
     # 1) Check existing hash for (ticker, primary_source)
     cur.execute(
@@ -121,10 +184,10 @@ def upsert_instrument(cur, t: dict):
         """,
         (ticker, primary_source),
     )
-    row = cur.fetchone()
+    existing = cur.fetchone()
 
-    if row is not None:
-        existing_hash = row[0]
+    if existing is not None:
+        existing_hash = existing[0]
         # If nothing changed, skip
         if existing_hash == payload_hash:
             return
@@ -148,14 +211,14 @@ def upsert_instrument(cur, t: dict):
               AND primary_source = %s
             """,
             (
-                name,
-                asset_class,
-                exchange,
-                currency_code,
-                region,
-                country_code,
+                row["name"],
+                row["asset_class"],
+                row["exchange"],
+                row["currency_code"],
+                row["region"],
+                row["country_code"],
                 primary_source,
-                status,
+                row["status"],
                 payload_hash,
                 ticker,
                 primary_source,
@@ -182,32 +245,184 @@ def upsert_instrument(cur, t: dict):
             """,
             (
                 ticker,
-                name,
-                asset_class,
-                exchange,
-                currency_code,
-                region,
-                country_code,
+                row["name"],
+                row["asset_class"],
+                row["exchange"],
+                row["currency_code"],
+                row["region"],
+                row["country_code"],
                 primary_source,
-                status,
+                row["status"],
                 payload_hash,
             ),
         )
 
 
+# ----------------------------------------------------------------------
+# Set-based upsert via a COPY-loaded staging table
+# ----------------------------------------------------------------------
+
+
+def ensure_staging_table(cur):
+    """
+    Create the session-local staging table if it doesn't exist yet.
+
+    Built from instruments itself so column types (including enums) match,
+    and emptied automatically at every commit.
+    """
+    cur.execute(
+        f"""
+        CREATE TEMP TABLE IF NOT EXISTS polygon_instruments_stage
+        ON COMMIT DELETE ROWS
+        AS SELECT {", ".join(STAGE_COLUMNS)}
+        FROM instruments
+        WITH NO DATA
+        """
+    )
+
+
+def upsert_instruments_page(cur, tickers: list[dict], hash_cache: PayloadHashCache | None = None) -> dict:
+    """
+    Upsert one page of Polygon tickers with a constant number of statements:
+    COPY into the staging table, one UPDATE of existing rows whose
+    source_payload_hash changed, then one INSERT of the new tickers.
+
+    Like the row path, existing rows are matched on (ticker, primary_source)
+    and asset_class is updated in place, so a reclassified ticker keeps its
+    instrument id.
+
+    With a preloaded hash_cache, rows whose hash already matches are dropped
+    before staging and counted as unchanged without touching the DB.
+
+    Returns counts: {"staged", "inserted", "updated", "reclassified", "unchanged"}.
+    """
+    # Last occurrence wins if Polygon ever repeats a ticker within a page;
+    # ON CONFLICT cannot touch the same row twice in one statement.
+    rows = {}
+    skipped = 0
+    for t in tickers:
+        row = instrument_row(t)
+        if row is None:
+            continue
+        if hash_cache is not None and hash_cache.is_unchanged(row["ticker"], row["source_payload_hash"]):
+            skipped += 1
+            continue
+        rows[row["ticker"]] = row
+
+    counts = {"staged": len(rows), "inserted": 0, "updated": 0, "reclassified": 0, "unchanged": skipped}
+    if not rows:
+        return counts
+
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows.values():
+        writer.writerow([row[col] for col in STAGE_COLUMNS])
+    buf.seek(0)
+
+    ensure_staging_table(cur)
+    cur.copy_expert(
+        f"COPY polygon_instruments_stage ({', '.join(STAGE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        buf,
+    )
+
+    # Existing rows match on (ticker, primary_source) like the row path, so a
+    # reclassified ticker (e.g. CS -> ETF) updates asset_class in place
+    # instead of gaining a second instruments row. A row is left alone if
+    # another row for the ticker already carries the new asset_class.
+    cur.execute(
+        """
+        UPDATE instruments i
+        SET
+            name                = s.name,
+            asset_class         = s.asset_class,
+            exchange            = s.exchange,
+            currency_code       = s.currency_code,
+            region              = s.region,
+            country_code        = s.country_code,
+            status              = s.status,
+            source_last_seen_at = NOW(),
+            source_payload_hash = s.source_payload_hash
+        FROM polygon_instruments_stage s, instruments prev
+        WHERE i.ticker = s.ticker
+          AND i.primary_source = s.primary_source
+          AND prev.id = i.id
+          AND i.source_payload_hash IS DISTINCT FROM s.source_payload_hash
+          AND NOT EXISTS (
+              SELECT 1
+              FROM instruments other
+              WHERE other.ticker = s.ticker
+                AND other.primary_source = s.primary_source
+                AND other.asset_class IS NOT DISTINCT FROM s.asset_class
+                AND other.id <> i.id
+          )
+        RETURNING i.ticker, prev.asset_class, i.asset_class
+        """
+    )
+    updated = cur.fetchall()
+    reclassified = [(ticker, old, new) for ticker, old, new in updated if old != new]
+    for ticker, old, new in reclassified:
+        log.info(f"ticker={ticker}: asset_class {old} -> {new}")
+
+    cur.execute(
+        """
+        INSERT INTO instruments (
+            ticker,
+            name,
+            asset_class,
+            exchange,
+            currency_code,
+            region,
+            country_code,
+            primary_source,
+            status,
+            source_last_seen_at,
+            source_payload_hash
+        )
+        SELECT
+            s.ticker,
+            s.name,
+            s.asset_class,
+            s.exchange,
+            s.currency_code,
+            s.region,
+            s.country_code,
+            s.primary_source,
+            s.status,
+            NOW(),
+            s.source_payload_hash
+        FROM polygon_instruments_stage s
+        WHERE NOT EXISTS (
+            SELECT 1
+            FROM instruments i
+            WHERE i.ticker = s.ticker
+              AND i.primary_source = s.primary_source
+        )
+        ON CONFLICT (ticker, asset_class, primary_source) DO NOTHING
+        RETURNING ticker
+        """
+    )
+    inserted = cur.fetchall()
+
+    counts["inserted"] = len(inserted)
+    counts["updated"] = len(updated)
+    counts["reclassified"] = len(reclassified)
+    counts["unchanged"] += counts["staged"] - len(inserted) - len(updated)
+
+    if hash_cache is not None:
+        for row in rows.values():
+            hash_cache.stage(row["ticker"], row["source_payload_hash"])
+    return counts
+
+
 # ----------------------------------------------------------------------
 # Fetch all tickers from Polygon
 # ----------------------------------------------------------------------
 
 
-# TODO: consider a shared Polygon client module for pagination/backoff logic
-#       so polygon_instruments + instrument_focus_universe don’t diverge.
 def fetch_all_tickers():
-    base_url = "https://api.polygon.io/v3/reference/tickers"
     params = {
         "active": "true",
         "limit": 1000,
-        "apiKey": POLYGON_API_KEY,
     }
 
     conn = get_conn()
@@ -215,41 +430,53 @@ def fetch_all_tickers():
     cur = conn.cursor()
 
     updates = 0
-    page = 1
-    next_url = base_url
+    totals = {"inserted": 0, "updated": 0, "reclassified": 0, "unchanged": 0}
 
     try:
-        while True:
-            if next_url == base_url:
-                log.info(f"Fetching page {page}: {base_url} params={params}")
-                resp = requests.get(base_url, params=params, timeout=30)
-            else:
-                log.info(f"Fetching page {page}: {next_url} (apiKey only)")
-                resp = requests.get(
-                    next_url,
-                    params={"apiKey": POLYGON_API_KEY},
-                    timeout=30,
-                )
+        hash_cache = PayloadHashCache.load(conn, PRIMARY_SOURCE)
 
-            resp.raise_for_status()
-            data = resp.json()
+        log.info(f"Fetching /v3/reference/tickers params={params}")
+        stage = PipelineStage(
+            polygon_client.iter_pages("/v3/reference/tickers", params),
+            name="polygon_instruments",
+            threaded=PIPELINE,
+        )
 
+        for page, data in enumerate(stage, start=1):
             results = data.get("results", []) or []
             log.info(f"Received {len(results)} instruments on page {page}")
 
-            for t in results:
-                upsert_instrument(cur, t)
-                updates += 1
+            if UPSERT_MODE == "bulk":
+                counts = upsert_instruments_page(cur, results, hash_cache)
+                for key in totals:
+                    totals[key] += counts[key]
+                log.info(
+                    f"Page {page}: staged {counts['staged']}, inserted {counts['inserted']}, "
+                    f"updated {counts['updated']} ({counts['reclassified']} reclassified), "
+                    f"unchanged {counts['unchanged']}"
+                )
+            else:
+                for t in results:
+                    upsert_instrument(cur, t, hash_cache)
 
+            updates += len(results)
             conn.commit()
-
-            next_url = data.get("next_url")
-            if not next_url:
-                break
-
-            page += 1
+            if hash_cache is not None:
+                hash_cache.commit()
 
         log.info(f"Done. Upserted/checked ~{updates} instruments.")
+        log.info(stage.stats.summary())
+        if UPSERT_MODE == "bulk":
+            log.info(
+                f"Totals: inserted {totals['inserted']}, updated {totals['updated']} "
+                f"({totals['reclassified']} reclassified), "
+                f"unchanged {totals['unchanged']}"
+            )
+        if hash_cache is not None:
+            log.info(
+                f"Payload hash cache: {hash_cache.skipped} unchanged skipped locally, "
+                f"{hash_cache.passed} sent to DB"
+            )
 
     finally:
         cur.close()
@@ -0,0 +1,142 @@
+"""
+Unit tests for the polygon_instruments bulk upsert.
+
+There is no database here, so FakeCursor plays instruments in memory,
+applying each statement the way Postgres would for these tests.
+
+Run with: python -m pytest etl/polygon_instruments_test.py
+Or: python etl/polygon_instruments_test.py
+"""
+
+import csv
+import os
+import sys
+import unittest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("POLYGON_API_KEY", "test")
+
+from etl import polygon_instruments as pi
+
+
+class FakeCursor:
+    """instruments rows as dicts (with an id), plus the COPY staging table."""
+
+    def __init__(self, instruments):
+        self.instruments = [dict(row, id=i) for i, row in enumerate(instruments, start=1)]
+        self.stage = []
+        self.statements = []
+        self._result = []
+
+    def copy_expert(self, sql, buf):
+        self.stage = [dict(zip(pi.STAGE_COLUMNS, values)) for values in csv.reader(buf)]
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+        if sql.lstrip().startswith("UPDATE instruments"):
+            self._result = self._update()
+        elif sql.lstrip().startswith("INSERT INTO instruments"):
+            self._result = self._insert()
+        else:
+            self._result = []
+
+    def fetchall(self):
+        return self._result
+
+    def _matching(self, s):
+        return [
+            i for i in self.instruments
+            if i["ticker"] == s["ticker"] and i["primary_source"] == s["primary_source"]
+        ]
+
+    def _update(self):
+        returned = []
+        for s in self.stage:
+            for i in self._matching(s):
+                if i["source_payload_hash"] == s["source_payload_hash"]:
+                    continue
+                if any(o["asset_class"] == s["asset_class"] and o["id"] != i["id"] for o in self._matching(s)):
+                    continue
+                old = i["asset_class"]
+                i.update({col: s[col] for col in pi.STAGE_COLUMNS})
+                returned.append((i["ticker"], old, i["asset_class"]))
+        return returned
+
+    def _insert(self):
+        returned = []
+        for s in self.stage:
+            if not self._matching(s):
+                self.instruments.append(dict(s, id=len(self.instruments) + 1))
+                returned.append((s["ticker"],))
+        return returned
+
+
+def polygon_ticker(ticker, instrument_type, name=None):
+    return {
+        "ticker": ticker,
+        "name": name or ticker,
+        "type": instrument_type,
+        "market": "stocks",
+        "primary_exchange": "XNAS",
+        "currency_name": "usd",
+        "locale": "us",
+        "active": True,
+    }
+
+
+class TestUpsertInstrumentsPage(unittest.TestCase):
+    def existing(self, t):
+        return dict(pi.instrument_row(t))
+
+    def test_reclassified_ticker_is_updated_in_place(self):
+        cur = FakeCursor([self.existing(polygon_ticker("QQQX", "CS"))])
+        counts = pi.upsert_instruments_page(cur, [polygon_ticker("QQQX", "ETF")])
+
+        self.assertEqual(len(cur.instruments), 1)
+        self.assertEqual(cur.instruments[0]["id"], 1)
+        self.assertEqual(cur.instruments[0]["asset_class"], "etf")
+        self.assertEqual(
+            {k: counts[k] for k in ("inserted", "updated", "reclassified", "unchanged")},
+            {"inserted": 0, "updated": 1, "reclassified": 1, "unchanged": 0},
+        )
+
+    def test_existing_rows_match_on_ticker_and_source(self):
+        cur = FakeCursor([])
+        pi.upsert_instruments_page(cur, [polygon_ticker("AAPL", "CS")])
+        update = next(sql for sql in cur.statements if sql.lstrip().startswith("UPDATE instruments"))
+        self.assertIn("i.ticker = s.ticker", update)
+        self.assertIn("i.primary_source = s.primary_source", update)
+        self.assertIn("asset_class         = s.asset_class", update)
+
+    def test_new_changed_and_unchanged(self):
+        unchanged = polygon_ticker("MSFT", "CS")
+        cur = FakeCursor([
+            self.existing(unchanged),
+            self.existing(polygon_ticker("AAPL", "CS", name="Apple")),
+        ])
+        counts = pi.upsert_instruments_page(
+            cur,
+            [unchanged, polygon_ticker("AAPL", "CS", name="Apple Inc."), polygon_ticker("NVDA", "CS")],
+        )
+        self.assertEqual(
+            {k: counts[k] for k in ("staged", "inserted", "updated", "reclassified", "unchanged")},
+            {"staged": 3, "inserted": 1, "updated": 1, "reclassified": 0, "unchanged": 1},
+        )
+        self.assertEqual(sorted(i["ticker"] for i in cur.instruments), ["AAPL", "MSFT", "NVDA"])
+
+    def test_existing_duplicate_is_not_collided(self):
+        # Left over from before: the ticker already has rows in both classes
+        old = self.existing(polygon_ticker("QQQX", "CS"))
+        etf = self.existing(polygon_ticker("QQQX", "ETF"))
+        etf["source_payload_hash"] = "stale"
+        cur = FakeCursor([old, etf])
+        counts = pi.upsert_instruments_page(cur, [polygon_ticker("QQQX", "ETF")])
+
+        self.assertEqual(len(cur.instruments), 2)
+        self.assertEqual(counts["updated"], 1)
+        self.assertEqual([i["asset_class"] for i in cur.instruments], ["equity", "etf"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,6 +12,8 @@ import psycopg2
 from datetime import datetime
 from typing import List, Dict, Any
 
+from etl import polygon_client
+
 POLYGON_API_KEY = os.getenv("POLYGON_API_KEY")
 if not POLYGON_API_KEY:
     raise RuntimeError("POLYGON_API_KEY environment variable is required")
@@ -36,16 +38,11 @@ def fetch_market_holidays() -> List[Dict[str, Any]]:
     Returns:
         List of holiday dictionaries
     """
-    url = "https://api.polygon.io/v1/marketstatus/upcoming"
-    params = {
-        "apiKey": POLYGON_API_KEY,
-    }
+    url = "/v1/marketstatus/upcoming"
     
     try:
         log.info(f"Fetching market holidays from Polygon: {url}")
-        resp = requests.get(url, params=params, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
+        data = polygon_client.get_json(url, timeout=30)
         
         holidays = data if isinstance(data, list) else []
         log.info(f"Received {len(holidays)} market holidays")
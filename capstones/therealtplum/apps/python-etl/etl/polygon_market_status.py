@@ -13,6 +13,8 @@ import psycopg2
 from datetime import datetime
 from typing import Dict
 
+from etl import polygon_client
+
 POLYGON_API_KEY = os.getenv("POLYGON_API_KEY")
 if not POLYGON_API_KEY:
     raise RuntimeError("POLYGON_API_KEY environment variable is required")
@@ -37,16 +39,11 @@ def fetch_market_status() -> Dict:
     Returns:
         Market status dictionary
     """
-    url = "https://api.polygon.io/v1/marketstatus/now"
-    params = {
-        "apiKey": POLYGON_API_KEY,
-    }
+    url = "/v1/marketstatus/now"
     
     try:
         log.info(f"Fetching market status from Polygon: {url}")
-        resp = requests.get(url, params=params, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
+        data = polygon_client.get_json(url, timeout=30)
         
         log.info(f"Received market status: market={data.get('market')}")
         return data
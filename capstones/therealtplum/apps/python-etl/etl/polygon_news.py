@@ -1,14 +1,17 @@
 import os
 import json
 import logging
-import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 import psycopg2
-from psycopg2.extras import execute_batch
+from psycopg2 import errors
+from psycopg2.extras import execute_batch, execute_values
+
+from etl import codec, polygon_client
 
 POLYGON_API_KEY = os.getenv("POLYGON_API_KEY")
 if not POLYGON_API_KEY:
@@ -19,8 +22,19 @@ DATABASE_URL = os.getenv("DATABASE_URL", "postgres://app:app@db:5432/fmhub")
 # How many news articles to fetch per ticker
 NEWS_LIMIT_PER_TICKER = int(os.getenv("POLYGON_NEWS_LIMIT_PER_TICKER", "3"))
 
-# Small sleep between requests to be nice to Polygon
-REQUEST_SLEEP_SECS = float(os.getenv("POLYGON_NEWS_SLEEP_SECS", "0.1"))
+# Per-ticker news requests in flight at once (still paced by the shared
+# Polygon rate limiter)
+NEWS_CONCURRENCY = int(os.getenv("POLYGON_NEWS_CONCURRENCY", "8"))
+
+# "incremental": ask only for articles newer than the latest one each
+#                ticker's own fetch returned before (news_fetch_watermarks,
+#                schema_news_watermarks.sql); tickers without a watermark
+#                fall back to the backfill window
+# "backfill":    ask for the whole backfill window for every ticker
+NEWS_MODE = os.getenv("POLYGON_NEWS_MODE", "incremental").lower()
+
+# Lookback window for backfill mode and cold-start tickers
+NEWS_BACKFILL_DAYS = int(os.getenv("POLYGON_NEWS_BACKFILL_DAYS", "30"))
 
 # Where to find sample_tickers.json
 # In Docker, the volume mount is at /export/web-data
@@ -74,49 +88,82 @@ def load_sample_tickers() -> List[Dict[str, Any]]:
     return data
 
 
-def get_instrument_id_by_ticker(cur, ticker: str) -> Optional[int]:
+class InstrumentResolver:
     """
-    Look up instrument_id by ticker from the instruments table.
-    Returns the most recent active instrument for this ticker.
+    ticker -> instrument_id for the active universe, loaded once per run.
+
+    Resolution matches the old per-ticker queries: among active instruments
+    sharing a ticker, the most recently seen (then most recently created) wins.
+    Every lookup after load() is a dict hit; tickers that aren't active
+    instruments resolve to None without another query.
     """
-    cur.execute(
-        """
-        SELECT id
-        FROM instruments
-        WHERE ticker = %s
-          AND status = 'active'
-        ORDER BY source_last_seen_at DESC NULLS LAST, created_at DESC
-        LIMIT 1
-        """,
-        (ticker,),
-    )
-    row = cur.fetchone()
-    return row[0] if row else None
 
+    def __init__(self, ids_by_ticker: Dict[str, int]):
+        self.ids_by_ticker = ids_by_ticker
+
+    def __len__(self) -> int:
+        return len(self.ids_by_ticker)
+
+    @classmethod
+    def load(cls, cur) -> "InstrumentResolver":
+        cur.execute(
+            """
+            SELECT DISTINCT ON (ticker)
+                ticker, id
+            FROM instruments
+            WHERE status = 'active'
+            ORDER BY ticker, source_last_seen_at DESC NULLS LAST, created_at DESC
+            """
+        )
+        resolver = cls({ticker: instrument_id for ticker, instrument_id in cur.fetchall()})
+        log.info(f"Loaded {len(resolver)} active ticker -> instrument_id mappings")
+        return resolver
+
+    def get(self, ticker: str) -> Optional[int]:
+        return self.ids_by_ticker.get(ticker)
 
-def fetch_news_from_polygon(ticker: str) -> List[Dict[str, Any]]:
+    def get_many(self, tickers: List[str]) -> Dict[str, int]:
+        """Map each known ticker to its instrument_id (unknown tickers are omitted)."""
+        return {t: self.ids_by_ticker[t] for t in tickers if t in self.ids_by_ticker}
+
+
+def existing_instrument_ids(cur, instrument_ids: List[int]) -> set:
+    """
+    Return the subset of instrument_ids that exist in the instruments table,
+    checked in one query.
+    """
+    if not instrument_ids:
+        return set()
+    cur.execute("SELECT id FROM instruments WHERE id = ANY(%s)", (instrument_ids,))
+    return {row[0] for row in cur.fetchall()}
+
+
+def fetch_news_from_polygon(ticker: str, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
     """
     Fetch recent news articles from Polygon API for a given ticker.
+
+    With `since` (the ticker's watermark), only articles published strictly
+    after it are requested; otherwise the last NEWS_BACKFILL_DAYS days.
     Returns list of article dicts, or empty list on error.
     """
-    # Calculate date range: last 30 days
     end_date = datetime.now(timezone.utc)
-    start_date = end_date - timedelta(days=30)
+    start_date = end_date - timedelta(days=NEWS_BACKFILL_DAYS)
 
-    url = "https://api.polygon.io/v2/reference/news"
+    url = "/v2/reference/news"
     params = {
         "ticker": ticker,
         "limit": NEWS_LIMIT_PER_TICKER,
         "order": "desc",
-        "published_utc.gte": start_date.strftime("%Y-%m-%dT00:00:00Z"),
         "published_utc.lte": end_date.strftime("%Y-%m-%dT23:59:59Z"),
-        "apiKey": POLYGON_API_KEY,
     }
+    # Never look further back than the backfill window
+    if since is not None and since > start_date:
+        params["published_utc.gt"] = since.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    else:
+        params["published_utc.gte"] = start_date.strftime("%Y-%m-%dT00:00:00Z")
 
     try:
-        resp = requests.get(url, params=params, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
+        data = polygon_client.get_json(url, params=params, timeout=30)
 
         if data.get("status") != "OK":
             log.warning(f"ticker={ticker}: non-OK status from Polygon news: {data}")
@@ -158,37 +205,128 @@ def parse_published_at(article: Dict[str, Any]) -> Optional[datetime]:
         return None
 
 
-def get_instrument_ids_for_tickers(cur, tickers: List[str]) -> Dict[str, int]:
+def article_key(article: Dict[str, Any]) -> Tuple[str, str]:
+    """Identity of an article across tickers: (article_url, published_utc)."""
+    return (
+        article.get("article_url") or article.get("url") or "",
+        article.get("published_utc") or "",
+    )
+
+
+def load_news_watermarks(cur, tickers: List[str]) -> Optional[Dict[str, datetime]]:
     """
-    Look up instrument_ids for a list of tickers.
-    Returns dict mapping ticker -> instrument_id (only for tickers that exist).
+    Per-ticker watermarks (latest published_at from that ticker's own
+    fetches), loaded in one query. Tickers never fetched are absent.
+
+    Not derived from news_articles: an instrument also gets rows for
+    articles surfaced by other tickers' requests, and their dates say
+    nothing about what this ticker's request has seen.
+
+    Returns None (and logs) if news_fetch_watermarks doesn't exist yet.
     """
     if not tickers:
         return {}
-    
-    cur.execute(
+    try:
+        cur.execute(
+            """
+            SELECT ticker, last_published_at
+            FROM news_fetch_watermarks
+            WHERE source = %s
+              AND ticker = ANY(%s)
+            """,
+            (DATA_SOURCE, tickers),
+        )
+    except errors.UndefinedTable as e:
+        cur.connection.rollback()
+        log.warning(f"News watermarks unavailable, fetching the backfill window for every ticker: {e}")
+        return None
+    return {ticker: latest for ticker, latest in cur.fetchall()}
+
+
+def save_news_watermarks(cur, articles_by_ticker: Dict[str, List[Dict[str, Any]]]) -> int:
+    """
+    Advance each ticker's watermark to the newest article its own fetch
+    returned (never backwards). Run it in the same transaction as the
+    article upsert. Returns the number of tickers advanced.
+    """
+    latest: Dict[str, datetime] = {}
+    for ticker, articles in articles_by_ticker.items():
+        published = [p for p in map(parse_published_at, articles or []) if p is not None]
+        if published:
+            latest[ticker] = max(published)
+    if not latest:
+        return 0
+
+    execute_values(
+        cur,
         """
-        SELECT DISTINCT ON (ticker)
-            ticker, id
-        FROM instruments
-        WHERE ticker = ANY(%s)
-          AND status = 'active'
-        ORDER BY ticker, source_last_seen_at DESC NULLS LAST, created_at DESC
+        INSERT INTO news_fetch_watermarks (source, ticker, last_published_at)
+        VALUES %s
+        ON CONFLICT (source, ticker)
+        DO UPDATE SET
+            last_published_at = GREATEST(news_fetch_watermarks.last_published_at, EXCLUDED.last_published_at),
+            updated_at        = NOW();
         """,
-        (tickers,),
+        [(DATA_SOURCE, ticker, published_at) for ticker, published_at in latest.items()],
+        page_size=1000,
     )
-    rows = cur.fetchall()
-    return {row[0]: row[1] for row in rows}
+    return len(latest)
+
+
+def fetch_news_for_tickers(
+    work: List[Tuple[str, int]],
+    watermarks: Optional[Dict[str, datetime]] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Fetch news for every (ticker, instrument_id) in `work`, NEWS_CONCURRENCY
+    requests at a time, each starting after its ticker's watermark.
+    Returns ticker -> articles.
+    """
+    watermarks = watermarks or {}
+    tickers = [ticker for ticker, _ in work]
+    sinces = [watermarks.get(ticker) for ticker in tickers]
+    with ThreadPoolExecutor(max_workers=max(1, NEWS_CONCURRENCY)) as pool:
+        return dict(zip(tickers, pool.map(fetch_news_from_polygon, tickers, sinces)))
+
 
+def dedupe_articles(
+    work: List[Tuple[str, int]],
+    articles_by_ticker: Dict[str, List[Dict[str, Any]]],
+) -> List[Tuple[Dict[str, Any], Dict[str, int]]]:
+    """
+    Collapse articles returned for several tickers into one entry each,
+    keyed by (article_url, published_utc).
 
-def upsert_news_articles(cur, articles: List[Dict[str, Any]], primary_instrument_id: int, primary_ticker: str):
+    Returns (article, primary_ids) pairs, where primary_ids maps every
+    requested ticker that surfaced the article to its instrument_id.
+    """
+    unique: Dict[Tuple[str, str], Tuple[Dict[str, Any], Dict[str, int]]] = {}
+    for ticker, instrument_id in work:
+        for article in articles_by_ticker.get(ticker) or []:
+            key = article_key(article)
+            if key not in unique:
+                unique[key] = (article, {})
+            unique[key][1][ticker] = instrument_id
+    return list(unique.values())
+
+
+def upsert_news_articles(
+    cur,
+    articles: List[Tuple[Dict[str, Any], Dict[str, int]]],
+    resolver: InstrumentResolver,
+) -> int:
     """
-    Upsert news articles into the news_articles table.
-    For articles that mention multiple tickers, stores the article for ALL mentioned instruments.
+    Upsert unique news articles into the news_articles table.
+
+    `articles` are (article, primary_ids) pairs from dedupe_articles. Each
+    article is stored for ALL mentioned instruments plus every requested
+    ticker that surfaced it, and is parsed and JSON-encoded once.
     Uses ON CONFLICT to handle duplicates based on (source, url, published_at, instrument_id).
+
+    Returns the number of article-instrument rows written.
     """
     if not articles:
-        return
+        return 0
 
     sql = """
         INSERT INTO news_articles (
@@ -224,10 +362,10 @@ def upsert_news_articles(cur, articles: List[Dict[str, Any]], primary_instrument
     """
 
     param_rows = []
-    for article in articles:
+    for article, primary_ids in articles:
         published_at = parse_published_at(article)
         if not published_at:
-            log.warning(f"ticker={primary_ticker}: skipping article with invalid published_at")
+            log.warning(f"tickers={sorted(primary_ids)}: skipping article with invalid published_at")
             continue
 
         # Extract tickers from article (Polygon may include multiple)
@@ -237,50 +375,56 @@ def upsert_news_articles(cur, articles: List[Dict[str, Any]], primary_instrument
         elif not isinstance(article_tickers, list):
             article_tickers = []
 
-        # If no tickers in article, use the primary ticker
+        # If no tickers in article, use the tickers that surfaced it
         if not article_tickers:
-            article_tickers = [primary_ticker]
+            article_tickers = list(primary_ids)
 
         # Look up instrument_ids for all mentioned tickers
-        ticker_to_instrument_id = get_instrument_ids_for_tickers(cur, article_tickers)
-        
-        # If primary ticker not found in article tickers, ensure we include it
-        if primary_ticker not in ticker_to_instrument_id and primary_instrument_id:
-            ticker_to_instrument_id[primary_ticker] = primary_instrument_id
-
-        # Store article for each instrument mentioned
-        for ticker, instrument_id in ticker_to_instrument_id.items():
-            param_rows.append(
-                {
-                    "instrument_id": instrument_id,
-                    "source": DATA_SOURCE,
-                    "publisher": article.get("publisher", {}).get("name") if isinstance(article.get("publisher"), dict) else article.get("publisher"),
-                    "headline": article.get("title") or article.get("headline") or "No headline",
-                    "summary": article.get("description") or article.get("summary"),
-                    "url": article.get("article_url") or article.get("url") or "",
-                    "published_at": published_at,
-                    "tickers": json.dumps(article_tickers) if article_tickers else None,
-                    "raw_payload": json.dumps(article),
-                }
-            )
+        ticker_to_instrument_id = resolver.get_many(article_tickers)
+
+        # Ensure every requested ticker that surfaced the article is included
+        for ticker, instrument_id in primary_ids.items():
+            if ticker not in ticker_to_instrument_id and instrument_id:
+                ticker_to_instrument_id[ticker] = instrument_id
+
+        publisher = article.get("publisher")
+        base_row = {
+            "source": DATA_SOURCE,
+            "publisher": publisher.get("name") if isinstance(publisher, dict) else publisher,
+            "headline": article.get("title") or article.get("headline") or "No headline",
+            "summary": article.get("description") or article.get("summary"),
+            "url": article.get("article_url") or article.get("url") or "",
+            "published_at": published_at,
+            "tickers": codec.dumps(article_tickers) if article_tickers else None,
+            "raw_payload": codec.dumps(article),
+        }
+
+        # Store article for each instrument mentioned (distinct ids only;
+        # two tickers can resolve to the same instrument)
+        for instrument_id in dict.fromkeys(ticker_to_instrument_id.values()):
+            param_rows.append({**base_row, "instrument_id": instrument_id})
 
     if param_rows:
         execute_batch(cur, sql, param_rows, page_size=100)
-        unique_articles = len(set((r["url"], r["published_at"]) for r in param_rows))
-        log.info(f"ticker={primary_ticker}: upserted {len(param_rows)} news article-instrument links ({unique_articles} unique articles)")
+        log.info(f"Upserted {len(param_rows)} news article-instrument links ({len(articles)} unique articles)")
+    return len(param_rows)
 
 
 def main():
     """
     Main ETL routine:
     1. Load tickers from sample_tickers.json
-    2. For each ticker, look up instrument_id in DB
-    3. Fetch recent news from Polygon API
-    4. Upsert news articles into news_articles table
+    2. Load ticker -> instrument_id for the active universe once, then
+       resolve each sample ticker from memory
+    3. Fetch news from Polygon API, NEWS_CONCURRENCY tickers at a time; in
+       incremental mode only articles newer than each ticker's watermark
+    4. Dedupe articles across tickers by (article_url, published_utc)
+    5. Upsert each unique article once into news_articles, and advance
+       the watermarks in the same transaction
     """
     log.info(
-        f"Starting polygon_news ETL (limit={NEWS_LIMIT_PER_TICKER} per ticker, "
-        f"sleep={REQUEST_SLEEP_SECS}s)"
+        f"Starting polygon_news ETL (mode={NEWS_MODE}, limit={NEWS_LIMIT_PER_TICKER} per ticker, "
+        f"concurrency={NEWS_CONCURRENCY}, max_rps={polygon_client.MAX_REQUESTS_PER_SEC:g})"
     )
 
     # Load tickers
@@ -299,56 +443,70 @@ def main():
     conn.autocommit = False
     cur = conn.cursor()
 
-    total_articles = 0
-    processed = 0
     skipped_no_instrument = 0
 
     try:
+        # Resolve every ticker (sample and article-mentioned) from memory
+        resolver = InstrumentResolver.load(cur)
+        valid_sample_ids = existing_instrument_ids(
+            cur,
+            [t["instrument_id"] for t in sample_tickers if t.get("instrument_id")],
+        )
+
+        work: List[Tuple[str, int]] = []
+        seen_tickers = set()
         for idx, ticker_data in enumerate(sample_tickers, start=1):
             ticker = ticker_data.get("ticker")
             if not ticker:
                 log.warning(f"Row {idx}: missing ticker field, skipping")
                 continue
+            if ticker in seen_tickers:
+                continue
 
             # Try to get instrument_id from JSON first, fallback to DB lookup
             instrument_id = ticker_data.get("instrument_id")
-            if instrument_id:
-                # Verify it exists in DB
-                cur.execute("SELECT id FROM instruments WHERE id = %s", (instrument_id,))
-                if not cur.fetchone():
-                    instrument_id = None
+            if instrument_id and instrument_id not in valid_sample_ids:
+                instrument_id = None
 
             if not instrument_id:
-                instrument_id = get_instrument_id_by_ticker(cur, ticker)
+                instrument_id = resolver.get(ticker)
 
             if not instrument_id:
                 log.warning(f"ticker={ticker}: no instrument_id found in DB, skipping")
                 skipped_no_instrument += 1
                 continue
 
-            log.info(f"[{idx}/{len(sample_tickers)}] Processing {ticker} (instrument_id={instrument_id})")
+            seen_tickers.add(ticker)
+            work.append((ticker, instrument_id))
 
-            # Fetch news from Polygon
-            articles = fetch_news_from_polygon(ticker)
-            if not articles:
-                if REQUEST_SLEEP_SECS > 0:
-                    time.sleep(REQUEST_SLEEP_SECS)
-                continue
+        # Backfill runs ignore the watermarks but still advance them
+        watermarks = load_news_watermarks(cur, [ticker for ticker, _ in work])
+        track_watermarks = watermarks is not None
+        if NEWS_MODE == "backfill" or watermarks is None:
+            watermarks = {}
 
-            # Upsert articles
-            upsert_news_articles(cur, articles, instrument_id, ticker)
-            conn.commit()
+        log.info(
+            f"Fetching news for {len(work)} tickers "
+            f"({len(watermarks)} incremental from watermark, "
+            f"{len(work) - len(watermarks)} over the last {NEWS_BACKFILL_DAYS} days)"
+        )
+        articles_by_ticker = fetch_news_for_tickers(work, watermarks)
+        fetched = sum(len(a) for a in articles_by_ticker.values())
+        processed = sum(1 for a in articles_by_ticker.values() if a)
 
-            total_articles += len(articles)
-            processed += 1
+        articles = dedupe_articles(work, articles_by_ticker)
+        log.info(f"Fetched {fetched} articles, {len(articles)} unique after cross-ticker dedup")
 
-            if REQUEST_SLEEP_SECS > 0:
-                time.sleep(REQUEST_SLEEP_SECS)
+        links = upsert_news_articles(cur, articles, resolver)
+        if track_watermarks:
+            advanced = save_news_watermarks(cur, articles_by_ticker)
+            log.info(f"Advanced news watermarks for {advanced} tickers")
+        conn.commit()
 
         log.info(
             f"polygon_news ETL completed. "
             f"Processed {processed} tickers, "
-            f"upserted {total_articles} articles, "
+            f"upserted {len(articles)} unique articles ({links} article-instrument links), "
             f"skipped {skipped_no_instrument} tickers (no instrument_id)"
         )
 
@@ -1,13 +1,14 @@
 import os
-import json
 import logging
-import time
-from datetime import datetime, timezone
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta, timezone
 
 import requests
 import psycopg2
 from psycopg2.extras import execute_batch
 
+from etl import codec, polygon_client
+
 POLYGON_API_KEY = os.getenv("POLYGON_API_KEY")
 if not POLYGON_API_KEY:
     raise RuntimeError("POLYGON_API_KEY environment variable is required for polygon_price_prev_daily ETL")
@@ -20,11 +21,27 @@ logging.basicConfig(
 )
 log = logging.getLogger(__name__)
 
-# How many instruments to process in one run
+# "grouped": one /v2/aggs/grouped call per trading date for the whole market,
+#            with per-ticker /prev calls only for tickers it leaves out
+# "ticker":  one /prev call per instrument (original behaviour)
+PRICE_MODE = os.getenv("PRICE_PREV_MODE", "grouped").lower()
+
+# How many instruments to process in one run via the per-ticker /prev endpoint.
+# In grouped mode this only caps the fallback, not the bulk load.
 MAX_INSTRUMENTS = int(os.getenv("PRICE_PREV_MAX_INSTRUMENTS", "2000"))
 
-# Small sleep between requests to be nice to Polygon
-REQUEST_SLEEP_SECS = float(os.getenv("PRICE_PREV_SLEEP_SECS", "0.02"))
+# How far back (calendar days) grouped mode looks for trading dates to load
+GROUPED_LOOKBACK_DAYS = int(os.getenv("PRICE_PREV_GROUPED_LOOKBACK_DAYS", "7"))
+
+# Whether grouped mode asks Polygon to include OTC tickers in the response
+GROUPED_INCLUDE_OTC = os.getenv("PRICE_PREV_GROUPED_INCLUDE_OTC", "false").lower() == "true"
+
+# Whether grouped mode falls back to /prev for tickers missing from the bulk response
+GROUPED_FALLBACK = os.getenv("PRICE_PREV_GROUPED_FALLBACK", "true").lower() == "true"
+
+# Concurrent /prev requests in flight (1 = sequential). The overall request
+# rate is capped by polygon_client (POLYGON_MAX_REQUESTS_PER_SEC).
+CONCURRENCY = int(os.getenv("PRICE_PREV_CONCURRENCY", "8"))
 
 # Flush to DB every N price rows
 BATCH_SIZE = int(os.getenv("PRICE_PREV_BATCH_SIZE", "500"))
@@ -109,6 +126,25 @@ def fetch_instruments_for_prices(cur):
     return rows
 
 
+def fetch_active_instrument_ids(cur) -> dict[str, int]:
+    """
+    Load ticker -> instrument_id for every active instrument in instruments_useq.
+
+    Used by grouped mode to join the whole-market response in memory, so there
+    is no MAX_INSTRUMENTS cap here.
+    """
+    cur.execute(
+        """
+        SELECT id, ticker
+        FROM instruments_useq
+        WHERE status = 'active';
+        """
+    )
+    mapping = {ticker: instrument_id for instrument_id, ticker in cur.fetchall()}
+    log.info(f"Loaded {len(mapping)} active instruments from instruments_useq for grouped join")
+    return mapping
+
+
 def upsert_price_rows(cur, rows):
     """
     Upsert into instrument_price_daily using the unique constraint:
@@ -187,15 +223,13 @@ def fetch_prev_bar(ticker: str) -> dict | None:
         dict with keys (open, high, low, close, volume, timestamp_ms)
         or None if no data or if an error occurs.
     """
-    url = f"https://api.polygon.io/v2/aggs/ticker/{ticker}/prev"
+    url = f"/v2/aggs/ticker/{ticker}/prev"
     params = {
         "adjusted": "true",
-        "apiKey": POLYGON_API_KEY,
     }
 
     try:
-        resp = requests.get(url, params=params, timeout=20)  # bump timeout a bit
-        resp.raise_for_status()
+        resp = polygon_client.get(url, params=params, timeout=20)  # bump timeout a bit
     except requests.exceptions.ReadTimeout:
         log.warning(f"ticker={ticker}: Read timeout from Polygon prev endpoint, skipping.")
         return None
@@ -204,8 +238,8 @@ def fetch_prev_bar(ticker: str) -> dict | None:
         return None
 
     try:
-        data = resp.json()
-    except json.JSONDecodeError as e:
+        data = codec.decode_polygon_aggs(resp.content)
+    except codec.DecodeError as e:
         log.warning(f"ticker={ticker}: failed to decode JSON: {e}")
         return None
 
@@ -218,7 +252,15 @@ def fetch_prev_bar(ticker: str) -> dict | None:
         log.info(f"ticker={ticker}: no results in prev response")
         return None
 
-    r = results[0]
+    return parse_agg_bar(ticker, results[0])
+
+
+def parse_agg_bar(ticker: str, r: dict) -> dict | None:
+    """
+    Turn a Polygon aggregate bar (o/h/l/c/v/t) into our bar dict.
+
+    Shared by the /prev and grouped daily endpoints, which use the same bar shape.
+    """
     try:
         return {
             "open": float(r.get("o")),
@@ -229,9 +271,52 @@ def fetch_prev_bar(ticker: str) -> dict | None:
             "timestamp_ms": int(r.get("t")),
         }
     except Exception as e:
-        log.warning(f"ticker={ticker}: error parsing prev result: {e} data={json.dumps(r)}")
+        log.warning(f"ticker={ticker}: error parsing aggregate bar: {e} data={codec.dumps(r)}")
+        return None
+
+
+def fetch_grouped_bars(trade_date: date) -> dict[str, dict] | None:
+    """
+    Call Polygon /v2/aggs/grouped/locale/us/market/stocks/{date} to get the daily
+    OHLCV bar for every US stock ticker on one trading date.
+
+    Returns:
+        dict mapping ticker -> bar dict (same keys as fetch_prev_bar),
+        an empty dict if the market was closed that day,
+        or None if an error occurs.
+    """
+    url = f"/v2/aggs/grouped/locale/us/market/stocks/{trade_date.isoformat()}"
+    params = {
+        "adjusted": "true",
+        "include_otc": "true" if GROUPED_INCLUDE_OTC else "false",
+    }
+
+    try:
+        resp = polygon_client.get(url, params=params, timeout=60)
+    except requests.exceptions.RequestException as e:
+        log.warning(f"date={trade_date}: request error from Polygon grouped endpoint: {e}")
+        return None
+
+    try:
+        data = codec.decode_polygon_aggs(resp.content)
+    except codec.DecodeError as e:
+        log.warning(f"date={trade_date}: failed to decode JSON: {e}")
+        return None
+
+    if data.get("status") not in ("OK", "DELAYED"):
+        log.warning(f"date={trade_date}: non-OK status from Polygon grouped endpoint: {data.get('status')}")
         return None
 
+    bars = {}
+    for r in data.get("results") or []:
+        ticker = r.get("T")
+        if not ticker:
+            continue
+        bar = parse_agg_bar(ticker, r)
+        if bar:
+            bars[ticker] = bar
+    return bars
+
 
 def ms_to_date_utc(ts_ms: int):
     """
@@ -241,62 +326,200 @@ def ms_to_date_utc(ts_ms: int):
     return dt.date()
 
 
+def bar_to_row(instrument_id: int, bar: dict) -> dict:
+    """
+    Build an instrument_price_daily row from a parsed bar.
+    """
+    return {
+        "instrument_id": instrument_id,
+        "price_date": ms_to_date_utc(bar["timestamp_ms"]),
+        "open": bar["open"],
+        "high": bar["high"],
+        "low": bar["low"],
+        "close": bar["close"],
+        "adj_close": bar["close"],  # can adjust later if needed
+        "volume": bar["volume"],
+    }
+
+
+def candidate_trade_dates(latest_date: date | None) -> list[date]:
+    """
+    Weekdays we may still need to load, newest first.
+
+    Runs from yesterday (UTC) back to the day after latest_date, bounded by
+    GROUPED_LOOKBACK_DAYS. Holidays are not filtered here; Polygon returns an
+    empty result set for them and the caller skips them.
+    """
+    yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+    earliest = yesterday - timedelta(days=GROUPED_LOOKBACK_DAYS - 1)
+    if latest_date is not None and latest_date >= earliest:
+        earliest = latest_date + timedelta(days=1)
+
+    dates = []
+    d = yesterday
+    while d >= earliest:
+        if d.weekday() < 5:
+            dates.append(d)
+        d -= timedelta(days=1)
+    return dates
+
+
 # ----------------------------------------------------------------------
 # Main ETL logic
 # ----------------------------------------------------------------------
 
 
+def iter_prev_bars(instruments):
+    """
+    Fetch /prev bars on a thread pool and yield (instrument_id, bar) as each
+    request finishes, in completion order. bar is None when Polygon had nothing.
+
+    At most CONCURRENCY * 2 requests are queued at once so a large instrument
+    list doesn't build up thousands of futures; polygon_client's process-wide
+    rate limiter keeps the overall request rate within the plan budget.
+    """
+    workers = max(1, CONCURRENCY)
+    max_pending = workers * 2
+    it = iter(instruments)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="polygon-prev") as pool:
+        pending = {}
+
+        def submit_next() -> bool:
+            try:
+                instrument_id, ticker = next(it)
+            except StopIteration:
+                return False
+            pending[pool.submit(fetch_prev_bar, ticker)] = instrument_id
+            return True
+
+        while len(pending) < max_pending and submit_next():
+            pass
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                instrument_id = pending.pop(fut)
+                yield instrument_id, fut.result()
+                submit_next()
+
+
+def load_prev_bars(conn, cur, instruments) -> int:
+    """
+    Fetch /prev bars for each ticker and upsert them in BATCH_SIZE chunks as
+    results stream in.
+
+    instruments = list of (instrument_id, ticker)
+    Returns the number of rows upserted.
+    """
+    log.info(
+        f"Fetching /prev bars for {len(instruments)} instruments "
+        f"(concurrency={CONCURRENCY}, max_rps={polygon_client.MAX_REQUESTS_PER_SEC:g})"
+    )
+    batch_rows = []
+    total_rows = 0
+
+    for idx, (instrument_id, prev) in enumerate(iter_prev_bars(instruments), start=1):
+        if idx % 100 == 0:
+            log.info(f"Processed {idx}/{len(instruments)} instruments so far...")
+
+        if not prev:
+            continue
+
+        batch_rows.append(bar_to_row(instrument_id, prev))
+        total_rows += 1
+
+        # Flush periodically so we don't lose work on a late failure
+        if len(batch_rows) >= BATCH_SIZE:
+            log.info(f"Flushing batch of {len(batch_rows)} price rows to DB...")
+            upsert_price_rows(cur, batch_rows)
+            conn.commit()
+            batch_rows.clear()
+
+    # Final flush
+    if batch_rows:
+        log.info(f"Flushing final batch of {len(batch_rows)} price rows to DB...")
+        upsert_price_rows(cur, batch_rows)
+        conn.commit()
+        batch_rows.clear()
+
+    return total_rows
+
+
+def load_grouped_bars(conn, cur) -> int:
+    """
+    Load whole-market daily bars with one grouped request per trading date and
+    join them to instruments_useq in memory.
+
+    With no price data yet we stop at the most recent trading date (what /prev
+    would have returned); otherwise we fill every trading date since the latest
+    one in the DB, within GROUPED_LOOKBACK_DAYS.
+
+    Returns the number of rows upserted.
+    """
+    latest_date = get_latest_price_date(cur)
+    dates = candidate_trade_dates(latest_date)
+    if not dates:
+        log.info(f"Latest price_date in DB is {latest_date}; no new trading dates to load in grouped mode")
+        return 0
+
+    ticker_to_id = fetch_active_instrument_ids(cur)
+    total_rows = 0
+
+    # Oldest first when gap-filling so a late failure leaves a contiguous history
+    if latest_date is not None:
+        dates = list(reversed(dates))
+
+    for trade_date in dates:
+        bars = fetch_grouped_bars(trade_date)
+        if bars is None:
+            # Request failed; leave this date for the /prev fallback or the next run
+            continue
+        if not bars:
+            log.info(f"date={trade_date}: no grouped results (market closed?), skipping")
+            continue
+
+        rows = [
+            bar_to_row(ticker_to_id[ticker], bar)
+            for ticker, bar in bars.items()
+            if ticker in ticker_to_id
+        ]
+        log.info(
+            f"date={trade_date}: grouped response has {len(bars)} tickers, "
+            f"{len(rows)} match instruments_useq"
+        )
+
+        for start in range(0, len(rows), BATCH_SIZE):
+            upsert_price_rows(cur, rows[start:start + BATCH_SIZE])
+        conn.commit()
+        total_rows += len(rows)
+
+        if latest_date is None:
+            # Cold start: only the most recent trading date, like /prev
+            break
+
+    return total_rows
+
+
 def run():
     conn = get_conn()
     conn.autocommit = False
     cur = conn.cursor()
 
     try:
-        instruments = fetch_instruments_for_prices(cur)
-        batch_rows = []
         total_rows = 0
 
-        for idx, (instrument_id, ticker) in enumerate(instruments, start=1):
-            if idx % 100 == 0:
-                log.info(f"Processed {idx}/{len(instruments)} instruments so far...")
-
-            prev = fetch_prev_bar(ticker)
-            if not prev:
-                if REQUEST_SLEEP_SECS > 0:
-                    time.sleep(REQUEST_SLEEP_SECS)
-                continue
-
-            price_date = ms_to_date_utc(prev["timestamp_ms"])
-
-            row = {
-                "instrument_id": instrument_id,
-                "price_date": price_date,
-                "open": prev["open"],
-                "high": prev["high"],
-                "low": prev["low"],
-                "close": prev["close"],
-                "adj_close": prev["close"],  # can adjust later if needed
-                "volume": prev["volume"],
-            }
-            batch_rows.append(row)
-            total_rows += 1
-
-            # Flush periodically so we don't lose work on a late failure
-            if len(batch_rows) >= BATCH_SIZE:
-                log.info(f"Flushing batch of {len(batch_rows)} price rows to DB...")
-                upsert_price_rows(cur, batch_rows)
-                conn.commit()
-                batch_rows.clear()
-
-            if REQUEST_SLEEP_SECS > 0:
-                time.sleep(REQUEST_SLEEP_SECS)
-
-        # Final flush
-        if batch_rows:
-            log.info(f"Flushing final batch of {len(batch_rows)} price rows to DB...")
-            upsert_price_rows(cur, batch_rows)
-            conn.commit()
-            batch_rows.clear()
+        if PRICE_MODE == "grouped":
+            total_rows += load_grouped_bars(conn, cur)
+            if GROUPED_FALLBACK:
+                # Anything still missing the latest date was left out of the bulk response
+                instruments = fetch_instruments_for_prices(cur)
+                if instruments:
+                    log.info(f"Falling back to /prev for {len(instruments)} instruments missing from grouped response")
+                    total_rows += load_prev_bars(conn, cur, instruments)
+        else:
+            instruments = fetch_instruments_for_prices(cur)
+            total_rows += load_prev_bars(conn, cur, instruments)
 
         log.info(f"polygon_price_prev_daily ETL completed successfully. Total rows upserted ~{total_rows}.")
 
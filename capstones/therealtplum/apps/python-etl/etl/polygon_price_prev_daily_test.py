@@ -0,0 +1,75 @@
+"""
+Unit tests for polygon_price_prev_daily response handling.
+
+Run with: python -m pytest etl/polygon_price_prev_daily_test.py
+Or: python etl/polygon_price_prev_daily_test.py
+"""
+
+import os
+import sys
+import unittest
+from datetime import date
+from unittest import mock
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("POLYGON_API_KEY", "test")
+
+from etl import polygon_price_prev_daily as prev
+
+
+class FakeResponse:
+    def __init__(self, content: bytes):
+        self.content = content
+
+
+GROUPED_RESPONSE = b"""{
+    "status": "OK",
+    "resultsCount": 3,
+    "results": [
+        {"T": "AAPL", "o": 190.0, "h": 192.5, "l": 189.1, "c": 191.2, "v": 51234567, "t": 1732827600000},
+        {"T": "MSFT", "o": 420.0, "h": 425.0, "l": 418.0, "c": 423.5, "t": 1732827600000},
+        {"T": "BAD", "o": null, "h": 1.0, "l": 1.0, "c": 1.0, "t": 1732827600000}
+    ]
+}"""
+
+PREV_RESPONSE = b"""{
+    "status": "OK",
+    "ticker": "AAPL",
+    "results": [{"T": "AAPL", "o": 190.0, "h": 192.5, "l": 189.1, "c": 191.2, "v": 100, "t": 1732827600000}]
+}"""
+
+
+class TestParseAggBar(unittest.TestCase):
+    def test_parse_agg_bar(self):
+        bar = prev.parse_agg_bar("AAPL", {"o": 1, "h": 2, "l": 0.5, "c": 1.5, "v": 10, "t": 1732827600000})
+        self.assertEqual(
+            bar,
+            {"open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": 10.0, "timestamp_ms": 1732827600000},
+        )
+
+    def test_parse_agg_bar_missing_price(self):
+        self.assertIsNone(prev.parse_agg_bar("BAD", {"o": None, "h": 1, "l": 1, "c": 1, "t": 1}))
+
+
+class TestFetchBars(unittest.TestCase):
+    def test_fetch_grouped_bars(self):
+        with mock.patch.object(prev.polygon_client, "get", return_value=FakeResponse(GROUPED_RESPONSE)):
+            bars = prev.fetch_grouped_bars(date(2024, 11, 28))
+        self.assertEqual(set(bars), {"AAPL", "MSFT"})
+        self.assertEqual(bars["AAPL"]["close"], 191.2)
+        self.assertIsNone(bars["MSFT"]["volume"])
+
+    def test_fetch_grouped_bars_bad_json(self):
+        with mock.patch.object(prev.polygon_client, "get", return_value=FakeResponse(b"not json")):
+            self.assertIsNone(prev.fetch_grouped_bars(date(2024, 11, 28)))
+
+    def test_fetch_prev_bar(self):
+        with mock.patch.object(prev.polygon_client, "get", return_value=FakeResponse(PREV_RESPONSE)):
+            bar = prev.fetch_prev_bar("AAPL")
+        self.assertEqual(bar["open"], 190.0)
+        self.assertEqual(bar["timestamp_ms"], 1732827600000)
+
+
+if __name__ == "__main__":
+    unittest.main()
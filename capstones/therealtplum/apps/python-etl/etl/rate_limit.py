@@ -0,0 +1,48 @@
+"""
+Token-bucket rate limiter shared by ETL jobs that fan requests out over threads.
+
+The bucket refills at `rate` tokens per second up to `burst` tokens; each
+request takes one token and blocks until one is available. A rate of 0
+disables limiting.
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Usage:
+        bucket = TokenBucket(rate=50, burst=5)
+        bucket.acquire()   # blocks until a token is available
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate)
+        self.capacity = max(1, int(burst))
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._last
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._last = now
+
+    def acquire(self, tokens: int = 1):
+        """Block until `tokens` tokens are available, then take them."""
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,223 @@
+"""
+Batched, pipelined Redis writes for streaming services.
+
+Message handlers call submit() (no await, no I/O) to queue writes; a
+background task flushes the queue in one Redis pipeline when either
+`max_batch` writes are pending or `flush_interval` seconds have passed.
+A busy tape then costs one Redis round trip per batch instead of one (or
+two) per message.
+
+With coalesce=True (the default) pending writes are keyed by Redis key and a
+newer value replaces an unflushed older one, so a ticker updating many
+times per second costs one write per flush. `max_staleness` bounds how long
+any queued value may wait before the flusher wakes for it.
+
+Usage:
+    writer = RedisBatchWriter(redis_client)
+    await writer.start()
+    writer.submit(f"kalshi:market:{ticker}", 3600, payload)
+    writer.submit(f"kalshi:price:{ticker}", 3600, {"p": 4550}, op="hash")
+    writer.append("kalshi:ticks", {"ticker": ticker, "p": 4550}, maxlen=1_000_000)
+    ...
+    await writer.stop()   # flushes anything still pending
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, Optional
+
+log = logging.getLogger(__name__)
+
+
+class RedisBatchWriter:
+    """
+    Collects writes and flushes them in one pipeline per batch.
+
+    Ops: "set" (SETEX key ttl value), "hash" (HSET key mapping + EXPIRE)
+    and "xadd" (XADD stream MAXLEN ~ maxlen, via append()). Stream appends
+    are history, so they are never coalesced.
+
+    With transaction=True each batch is wrapped in MULTI/EXEC, so readers
+    never see half of a batch applied.
+
+    Coalescing keeps a key's place in the queue and its original enqueue
+    time, so replacing a value never delays it past max_staleness.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        max_batch: int = 500,
+        flush_interval: float = 0.05,
+        transaction: bool = False,
+        stats_interval: float = 60.0,
+        coalesce: bool = True,
+        max_staleness: Optional[float] = None,
+    ):
+        self.redis = redis_client
+        self.max_batch = max(1, max_batch)
+        self.flush_interval = flush_interval
+        self.transaction = transaction
+        self.stats_interval = stats_interval
+        self.coalesce = coalesce
+        self.max_staleness = max_staleness if max_staleness is not None else flush_interval
+
+        # queue key -> (op, redis key, ttl or maxlen, value, first enqueued
+        # at); the queue key is the Redis key when coalescing, else unique
+        # per submit
+        self._pending: dict[Any, tuple[str, str, int, Any, float]] = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._next_flush = time.monotonic() + flush_interval
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+        # Stats
+        self.batches = 0
+        self.writes = 0
+        self.max_batch_seen = 0
+        self.flush_secs_total = 0.0
+        self.last_flush_secs = 0.0
+        self.errors = 0
+        self.coalesced = 0
+        self._stats_started = time.monotonic()
+        self._stats_batches = 0
+        self._stats_writes = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def submit(self, key: str, ttl: int, value: Any, op: str = "set"):
+        """Queue a write. Never blocks and never touches Redis."""
+        if self.coalesce:
+            queued = self._pending.get(key)
+            if queued is not None:
+                # Newest value wins; keep the slot and the original enqueue time
+                self._pending[key] = (op, key, ttl, value, queued[4])
+                self.coalesced += 1
+                return
+            self._pending[key] = (op, key, ttl, value, time.monotonic())
+        else:
+            self._pending[next(self._seq)] = (op, key, ttl, value, time.monotonic())
+        self._queued()
+
+    def append(self, stream: str, fields: dict, maxlen: int):
+        """Queue an XADD to a stream capped at roughly maxlen entries."""
+        self._pending[next(self._seq)] = ("xadd", stream, maxlen, fields, time.monotonic())
+        self._queued()
+
+    def _queued(self):
+        # Wake the flusher for a full batch, and when the queue goes from
+        # empty to non-empty: it may be sleeping on a flush interval longer
+        # than the new value's staleness deadline
+        if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+
+    def _deadline(self) -> float:
+        """When the next flush is due: end of the flush interval or the oldest value going stale."""
+        deadline = self._next_flush
+        if self._pending:
+            oldest = next(iter(self._pending.values()))[4]
+            deadline = min(deadline, oldest + self.max_staleness)
+        return deadline
+
+    def _next_timeout(self) -> float:
+        return max(self._deadline() - time.monotonic(), 0.0)
+
+    async def start(self):
+        self._running = True
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write out anything still pending."""
+        self._running = False
+        self._wakeup.set()
+        if self._task:
+            await self._task
+            self._task = None
+        while self._pending:
+            await self.flush()
+        log.info(self.summary())
+
+    async def _run(self):
+        next_stats = time.monotonic() + self.stats_interval
+        while self._running:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._next_timeout())
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            # A wakeup for a newly queued value only re-arms the timeout
+            if (
+                not self._running
+                or len(self._pending) >= self.max_batch
+                or time.monotonic() >= self._deadline()
+            ):
+                while self._pending:
+                    await self.flush()
+                self._next_flush = time.monotonic() + self.flush_interval
+
+            if self.stats_interval and time.monotonic() >= next_stats:
+                log.info(self.interval_summary())
+                next_stats = time.monotonic() + self.stats_interval
+
+    async def flush(self):
+        """Send up to max_batch pending writes in one pipeline."""
+        if not self._pending:
+            return
+
+        queue_keys = list(itertools.islice(self._pending, self.max_batch))
+        batch = [self._pending.pop(k) for k in queue_keys]
+
+        start = time.monotonic()
+        try:
+            pipe = self.redis.pipeline(transaction=self.transaction)
+            for op, key, ttl, value, _ in batch:
+                if op == "hash":
+                    pipe.hset(key, mapping=value)
+                    pipe.expire(key, ttl)
+                elif op == "xadd":
+                    pipe.xadd(key, value, maxlen=ttl, approximate=True)
+                else:
+                    pipe.setex(key, ttl, value)
+            await pipe.execute()
+        except Exception as e:
+            # Drop the batch; the next update for these keys overwrites them
+            # anyway (stream appends in it are lost)
+            self.errors += 1
+            log.error(f"Redis batch flush of {len(batch)} writes failed: {e}")
+            return
+        finally:
+            self.last_flush_secs = time.monotonic() - start
+            self.flush_secs_total += self.last_flush_secs
+
+        self.batches += 1
+        self.writes += len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+    def interval_summary(self) -> str:
+        """Throughput since the previous call, for periodic logging."""
+        now = time.monotonic()
+        elapsed = max(now - self._stats_started, 1e-9)
+        batches = self.batches - self._stats_batches
+        writes = self.writes - self._stats_writes
+        self._stats_started, self._stats_batches, self._stats_writes = now, self.batches, self.writes
+        avg = writes / batches if batches else 0.0
+        return (
+            f"Redis writer: {writes / elapsed:.1f} writes/s in {batches} batches "
+            f"(avg batch {avg:.1f}, last flush {self.last_flush_secs * 1000:.1f}ms, "
+            f"pending {self.pending}, coalesced {self.coalesced}, errors {self.errors})"
+        )
+
+    def summary(self) -> str:
+        avg_batch = self.writes / self.batches if self.batches else 0.0
+        avg_flush_ms = self.flush_secs_total / self.batches * 1000 if self.batches else 0.0
+        return (
+            f"Redis writer totals: {self.writes} writes in {self.batches} batches "
+            f"(avg batch {avg_batch:.1f}, max {self.max_batch_seen}, "
+            f"avg flush {avg_flush_ms:.1f}ms, {self.coalesced} coalesced, errors {self.errors})"
+        )
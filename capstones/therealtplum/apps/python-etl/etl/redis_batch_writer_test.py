@@ -0,0 +1,122 @@
+"""
+Unit tests for RedisBatchWriter flush timing.
+
+Run with: python -m pytest etl/redis_batch_writer_test.py
+Or: python etl/redis_batch_writer_test.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from etl.redis_batch_writer import RedisBatchWriter
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.ops = []
+
+    def setex(self, key, ttl, value):
+        self.ops.append(("setex", key, value))
+
+    def hset(self, key, mapping):
+        self.ops.append(("hset", key, mapping))
+
+    def expire(self, key, ttl):
+        self.ops.append(("expire", key, ttl))
+
+    def xadd(self, key, fields, maxlen, approximate):
+        self.ops.append(("xadd", key, fields))
+
+    async def execute(self):
+        self.client.executed.append((time.monotonic(), self.ops))
+
+
+class FakeRedis:
+    def __init__(self):
+        self.executed = []
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+
+async def wait_for_flush(client, timeout):
+    deadline = time.monotonic() + timeout
+    while not client.executed and time.monotonic() < deadline:
+        await asyncio.sleep(0.005)
+
+
+class TestFlushTiming(unittest.TestCase):
+    def test_single_write_flushed_within_max_staleness(self):
+        async def run():
+            client = FakeRedis()
+            writer = RedisBatchWriter(client, flush_interval=5.0, max_staleness=0.05, stats_interval=0)
+            await writer.start()
+            # Let the flusher go to sleep on the (long) flush interval first
+            await asyncio.sleep(0.02)
+            submitted = time.monotonic()
+            writer.submit("kalshi:market:A", 60, "v1")
+            await wait_for_flush(client, 1.0)
+            await writer.stop()
+            return submitted, client.executed
+
+        submitted, executed = asyncio.run(run())
+        self.assertTrue(executed)
+        flushed_at, ops = executed[0]
+        self.assertEqual(ops, [("setex", "kalshi:market:A", "v1")])
+        self.assertLess(flushed_at - submitted, 0.5)
+
+    def test_append_flushed_within_max_staleness(self):
+        async def run():
+            client = FakeRedis()
+            writer = RedisBatchWriter(client, flush_interval=5.0, max_staleness=0.05, stats_interval=0)
+            await writer.start()
+            await asyncio.sleep(0.02)
+            submitted = time.monotonic()
+            writer.append("kalshi:ticks", {"ticker": "A"}, maxlen=100)
+            await wait_for_flush(client, 1.0)
+            await writer.stop()
+            return submitted, client.executed
+
+        submitted, executed = asyncio.run(run())
+        self.assertTrue(executed)
+        self.assertLess(executed[0][0] - submitted, 0.5)
+
+    def test_writes_are_still_batched(self):
+        async def run():
+            client = FakeRedis()
+            writer = RedisBatchWriter(client, flush_interval=5.0, max_staleness=0.1, stats_interval=0)
+            await writer.start()
+            writer.submit("a", 60, "1")
+            await asyncio.sleep(0.01)
+            writer.submit("b", 60, "2")
+            await wait_for_flush(client, 1.0)
+            await writer.stop()
+            return client.executed
+
+        executed = asyncio.run(run())
+        self.assertEqual([len(ops) for _, ops in executed], [2])
+
+    def test_stop_flushes_everything(self):
+        async def run():
+            client = FakeRedis()
+            writer = RedisBatchWriter(client, max_batch=2, flush_interval=5.0, max_staleness=5.0, stats_interval=0)
+            await writer.start()
+            for i in range(5):
+                writer.submit(f"k{i}", 60, str(i))
+            await writer.stop()
+            return writer
+
+        writer = asyncio.run(run())
+        self.assertEqual(writer.writes, 5)
+        self.assertEqual(writer.pending, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,245 @@
+"""
+Team dictionary for the Kalshi ticker parser, built from the database.
+
+Reads every active team in sports_teams (team_code and alternate_codes, as
+seeded by seed_sports_teams) plus the team's Kalshi codes from
+sports_teams_venue_codes, and builds an immutable lookup:
+
+    league_code -> code -> (team_id, team_name)
+
+Code precedence within a league: Kalshi venue code, then team_code, then
+alternate_codes (an alternate never shadows another team's main code).
+
+The dictionary is cached on disk (KALSHI_TEAM_DICTIONARY_CACHE) together
+with a version stamp (row counts and last update time of both tables), so
+workers start from the file without touching the database. Refresh it with:
+
+    python -m etl.sports_team_dictionary
+
+which only rewrites the file when the stamp changed. Workers call
+configure_parser() once at startup to plug it into kalshi_ticker_parser.
+"""
+
+import os
+import json
+import logging
+import time
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+DATABASE_URL = os.getenv("DATABASE_URL", "postgres://app:app@db:5432/fmhub")
+
+# Where the built dictionary is cached, and how old it may get before a
+# worker rebuilds it from the DB at startup (0 = never rebuild on startup)
+CACHE_PATH = os.getenv("KALSHI_TEAM_DICTIONARY_CACHE", "/tmp/kalshi_team_dictionary.json")
+CACHE_MAX_AGE_SECS = float(os.getenv("KALSHI_TEAM_DICTIONARY_MAX_AGE_SECS", "86400"))
+
+# venues.venue_code whose sports_teams_venue_codes entries are loaded
+VENUE_CODE = "KALSHI"
+
+# Bumped when the cache layout changes; older files are ignored
+CACHE_FORMAT = 1
+
+# Kalshi league codes (kalshi_ticker_parser.SPORTS_LEAGUES) -> sports_teams.league_code
+KALSHI_LEAGUES = {
+    "NBA": "NBA",
+    "NFL": "NFL",
+    "MLB": "MLB",
+    "NHL": "NHL",
+    "NCAA": "NCAAB",
+    "NCAAMB": "NCAAB",
+    "NCAAMBK": "NCAAB",
+    "NCAAFB": "NCAAF",
+}
+
+log = logging.getLogger(__name__)
+
+TeamEntry = Tuple[int, str]  # (sports_teams.id, team_name)
+
+
+class TeamDictionary:
+    """Immutable league -> code -> (team_id, team_name) lookup."""
+
+    __slots__ = ("leagues", "stamp", "built_at")
+
+    def __init__(self, leagues: Dict[str, Dict[str, TeamEntry]], stamp: str, built_at: float):
+        self.leagues: Mapping[str, Mapping[str, TeamEntry]] = MappingProxyType(
+            {league: MappingProxyType(codes) for league, codes in leagues.items()}
+        )
+        self.stamp = stamp
+        self.built_at = built_at
+
+    def __len__(self) -> int:
+        return sum(len(codes) for codes in self.leagues.values())
+
+    def lookup(self, league_code: str, code: str) -> Optional[TeamEntry]:
+        codes = self.leagues.get(league_code)
+        return codes.get(code) if codes else None
+
+    def kalshi_tables(self) -> Dict[str, Mapping[str, TeamEntry]]:
+        """Tables keyed by Kalshi league code, for kalshi_ticker_parser."""
+        return {
+            kalshi_league: self.leagues[league]
+            for kalshi_league, league in KALSHI_LEAGUES.items()
+            if league in self.leagues
+        }
+
+    # ------------------------------------------------------------------
+    # Disk cache
+    # ------------------------------------------------------------------
+
+    def save(self, path: str = CACHE_PATH):
+        """Write atomically, so a concurrently starting worker never reads half a file."""
+        data = {
+            "format": CACHE_FORMAT,
+            "stamp": self.stamp,
+            "built_at": self.built_at,
+            "leagues": {league: dict(codes) for league, codes in self.leagues.items()},
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = CACHE_PATH) -> Optional["TeamDictionary"]:
+        """The cached dictionary, or None if missing, unreadable or an older format."""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("format") != CACHE_FORMAT:
+            return None
+        leagues = {
+            league: {code: (entry[0], entry[1]) for code, entry in codes.items()}
+            for league, codes in data["leagues"].items()
+        }
+        return cls(leagues, data["stamp"], data["built_at"])
+
+
+# ----------------------------------------------------------------------
+# Database
+# ----------------------------------------------------------------------
+
+
+def fetch_stamp(cur) -> str:
+    """Cheap version stamp: row count and last update of both source tables."""
+    cur.execute(
+        """
+        SELECT
+            (SELECT COUNT(*) || ':' || COALESCE(MAX(updated_at)::text, '') FROM sports_teams),
+            (SELECT COUNT(*) || ':' || COALESCE(MAX(updated_at)::text, '') FROM sports_teams_venue_codes)
+        """
+    )
+    teams, venue_codes = cur.fetchone()
+    return f"{teams}/{venue_codes}"
+
+
+def build_from_db(cur, venue_code: str = VENUE_CODE) -> TeamDictionary:
+    stamp = fetch_stamp(cur)
+    cur.execute(
+        """
+        SELECT t.id, t.team_code, t.team_name, t.league_code,
+               COALESCE(t.alternate_codes, '{}'),
+               COALESCE(vc.codes, '{}')
+        FROM sports_teams t
+        LEFT JOIN (
+            SELECT stvc.team_id, array_agg(stvc.venue_code) AS codes
+            FROM sports_teams_venue_codes stvc
+            JOIN venues v ON v.id = stvc.venue_id
+            WHERE v.venue_code = %s
+              AND stvc.is_active = true
+            GROUP BY stvc.team_id
+        ) vc ON vc.team_id = t.id
+        WHERE t.is_active = true
+        ORDER BY t.id
+        """,
+        (venue_code,),
+    )
+    rows = cur.fetchall()
+
+    leagues: Dict[str, Dict[str, TeamEntry]] = {}
+    # One pass per precedence level so a weaker code never shadows a stronger one
+    for level in ("venue", "main", "alternate"):
+        for team_id, team_code, team_name, league_code, alternates, venue_codes in rows:
+            codes = leagues.setdefault(league_code, {})
+            if level == "venue":
+                candidates = venue_codes
+            elif level == "main":
+                candidates = [team_code]
+            else:
+                candidates = alternates
+            for code in candidates:
+                if code:
+                    codes.setdefault(code.upper(), (team_id, team_name))
+
+    return TeamDictionary(leagues, stamp, time.time())
+
+
+def refresh(database_url: str = DATABASE_URL, path: str = CACHE_PATH) -> TeamDictionary:
+    """Rebuild from the DB unless the cached stamp is still current; save either way."""
+    import psycopg2
+
+    cached = TeamDictionary.load(path)
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn.cursor() as cur:
+            if cached is not None and fetch_stamp(cur) == cached.stamp:
+                dictionary = TeamDictionary(
+                    {league: dict(codes) for league, codes in cached.leagues.items()},
+                    cached.stamp,
+                    time.time(),
+                )
+                log.info(f"Team dictionary unchanged ({len(dictionary)} codes, stamp {dictionary.stamp})")
+            else:
+                dictionary = build_from_db(cur)
+                log.info(
+                    f"Built team dictionary: {len(dictionary)} codes across "
+                    f"{len(dictionary.leagues)} leagues (stamp {dictionary.stamp})"
+                )
+    finally:
+        conn.close()
+
+    dictionary.save(path)
+    return dictionary
+
+
+def load_team_dictionary(path: str = CACHE_PATH, max_age_secs: float = CACHE_MAX_AGE_SECS) -> Optional[TeamDictionary]:
+    """
+    The team dictionary for a starting worker: the disk cache if it is
+    fresh enough, otherwise a refresh from the DB. A stale cache is still
+    used when the DB can't be reached. None if neither is available.
+    """
+    cached = TeamDictionary.load(path)
+    if cached is not None and (not max_age_secs or time.time() - cached.built_at < max_age_secs):
+        return cached
+
+    try:
+        return refresh(path=path)
+    except Exception as e:
+        if cached is not None:
+            log.warning(f"Team dictionary refresh failed, using cached copy (stamp {cached.stamp}): {e}")
+            return cached
+        log.warning(f"Team dictionary unavailable, parser keeps its built-in teams: {e}")
+        return None
+
+
+def configure_parser(path: str = CACHE_PATH) -> Optional[TeamDictionary]:
+    """Load the dictionary and install it into kalshi_ticker_parser."""
+    from etl import kalshi_ticker_parser
+
+    dictionary = load_team_dictionary(path)
+    if dictionary is not None:
+        kalshi_ticker_parser.install_team_dictionary(dictionary.kalshi_tables())
+    return dictionary
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="[sports_team_dictionary] %(message)s")
+    refresh()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Unit tests for the sports team dictionary.
+
+Run with: python -m pytest etl/sports_team_dictionary_test.py
+Or: python etl/sports_team_dictionary_test.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from etl.sports_team_dictionary import CACHE_FORMAT, TeamDictionary, build_from_db
+
+
+class FakeCursor:
+    """Answers fetch_stamp() and the team query in build_from_db()."""
+
+    def __init__(self, rows, stamp=("3:2024-01-01", "1:2024-01-02")):
+        self.rows = rows
+        self.stamp = stamp
+        self.queries = []
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+
+    def fetchone(self):
+        return self.stamp
+
+    def fetchall(self):
+        return self.rows
+
+
+# (id, team_code, team_name, league_code, alternate_codes, venue_codes)
+TEAM_ROWS = [
+    # Kansas: Kalshi calls it KU; "KAN" is an alternate
+    (1, "KANS", "Kansas", "NCAAB", ["KAN"], ["KU"]),
+    # Kentucky: main code UK, alternate KU must not take Kansas' venue code
+    (2, "UK", "Kentucky", "NCAAB", ["KU", "kent"], []),
+    # Kansas State: main code KAN beats Kansas' alternate KAN
+    (3, "KAN", "Kansas State", "NCAAB", [], []),
+    (4, "TOR", "Toronto Raptors", "NBA", [], ["TOR"]),
+]
+
+
+class TestBuildFromDb(unittest.TestCase):
+    def setUp(self):
+        self.cur = FakeCursor(TEAM_ROWS)
+        self.dictionary = build_from_db(self.cur, venue_code="KALSHI")
+
+    def test_venue_code_beats_alternate(self):
+        self.assertEqual(self.dictionary.lookup("NCAAB", "KU"), (1, "Kansas"))
+
+    def test_main_code_beats_alternate(self):
+        self.assertEqual(self.dictionary.lookup("NCAAB", "KAN"), (3, "Kansas State"))
+
+    def test_alternates_and_main_codes(self):
+        self.assertEqual(self.dictionary.lookup("NCAAB", "KANS"), (1, "Kansas"))
+        self.assertEqual(self.dictionary.lookup("NCAAB", "UK"), (2, "Kentucky"))
+        # Codes are upper-cased
+        self.assertEqual(self.dictionary.lookup("NCAAB", "KENT"), (2, "Kentucky"))
+        self.assertIsNone(self.dictionary.lookup("NCAAB", "kent"))
+
+    def test_leagues_are_separate(self):
+        self.assertEqual(self.dictionary.lookup("NBA", "TOR"), (4, "Toronto Raptors"))
+        self.assertIsNone(self.dictionary.lookup("NCAAB", "TOR"))
+        self.assertIsNone(self.dictionary.lookup("NFL", "TOR"))
+
+    def test_stamp_and_venue_param(self):
+        self.assertEqual(self.dictionary.stamp, "3:2024-01-01/1:2024-01-02")
+        self.assertEqual(self.cur.queries[-1][1], ("KALSHI",))
+
+    def test_kalshi_tables(self):
+        tables = self.dictionary.kalshi_tables()
+        self.assertIs(tables["NCAA"], tables["NCAAMB"])
+        self.assertEqual(tables["NCAA"]["KU"], (1, "Kansas"))
+        self.assertIn("NBA", tables)
+        self.assertNotIn("NFL", tables)
+
+    def test_immutable(self):
+        with self.assertRaises(TypeError):
+            self.dictionary.leagues["NBA"]["XXX"] = (9, "Nope")
+
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "teams", "dictionary.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        original = build_from_db(FakeCursor(TEAM_ROWS))
+        original.save(self.path)
+        loaded = TeamDictionary.load(self.path)
+        self.assertIsNotNone(loaded)
+        self.assertEqual(loaded.stamp, original.stamp)
+        self.assertEqual(loaded.built_at, original.built_at)
+        self.assertEqual(
+            {league: dict(codes) for league, codes in loaded.leagues.items()},
+            {league: dict(codes) for league, codes in original.leagues.items()},
+        )
+        # Entries come back as tuples, not JSON lists
+        self.assertEqual(loaded.lookup("NCAAB", "KU"), (1, "Kansas"))
+
+    def test_old_format_rejected(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as f:
+            json.dump({"format": CACHE_FORMAT - 1, "stamp": "x", "built_at": 0, "leagues": {}}, f)
+        self.assertIsNone(TeamDictionary.load(self.path))
+
+    def test_missing_or_corrupt_file(self):
+        self.assertIsNone(TeamDictionary.load(self.path))
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as f:
+            f.write("{not json")
+        self.assertIsNone(TeamDictionary.load(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+"""
+Redis Streams fan-out of normalized market ticks.
+
+The websocket service (KALSHI_WS_TICK_STREAM=true) appends every market
+update to a capped stream per venue with XADD MAXLEN ~, e.g. kalshi:ticks.
+Unlike the kalshi:price:* keys, which only hold the latest value, the stream
+keeps recent history, so downstream consumers (recorders, OHLC builders,
+strategies) can:
+
+- read ticks in batches instead of polling keys
+- replay their own unacknowledged ticks after a crash
+- scale out: consumers in the same group split the stream between them
+
+Tick fields (all strings on the wire):
+    ticker, yes_price, yes_bid, yes_ask, volume (when present), ts_ms
+
+Usage:
+    reader = TickStreamReader.from_url(REDIS_URL, "kalshi", group="ohlc", consumer="ohlc-1")
+    for batch in reader.iter_batches():
+        for entry_id, tick in batch:
+            ...
+        # the batch is acknowledged when the loop asks for the next one
+"""
+
+import logging
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+TICK_FIELDS = ("yes_price", "yes_bid", "yes_ask", "volume")
+
+Entry = Tuple[str, Dict[str, str]]
+
+
+def stream_key(venue: str) -> str:
+    return f"{venue}:ticks"
+
+
+def normalize_tick(ticker: str, data: Dict[str, Any], ts_ms: int) -> Dict[str, Any]:
+    """
+    Flat stream fields for one market update. Missing values are left out
+    (streams can't store None).
+    """
+    tick: Dict[str, Any] = {"ticker": ticker}
+    for field in TICK_FIELDS:
+        value = data.get(field)
+        if value is not None:
+            tick[field] = value
+    tick["ts_ms"] = ts_ms
+    return tick
+
+
+def _text(value) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _decode_entries(entries) -> List[Entry]:
+    return [
+        (_text(entry_id), {_text(k): _text(v) for k, v in (fields or {}).items()})
+        for entry_id, fields in entries
+    ]
+
+
+class TickStreamReader:
+    """
+    Consumer-group reader for a tick stream (synchronous redis client).
+
+    Each read first returns this consumer's pending (delivered but not
+    acknowledged) entries, so a restarted consumer replays what it was
+    working on before it takes new ticks. Entries left pending by a dead
+    consumer for `claim_idle_ms` are claimed with XAUTOCLAIM.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        venue: str,
+        group: str,
+        consumer: Optional[str] = None,
+        batch_size: int = 500,
+        block_ms: int = 1000,
+        claim_idle_ms: int = 60000,
+        start_id: str = "$",
+    ):
+        self.redis = redis_client
+        self.stream = stream_key(venue)
+        self.group = group
+        self.consumer = consumer or f"{group}-{os.getpid()}"
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.start_id = start_id
+
+        # Replay our own pending entries until they run out
+        self._replaying = True
+
+        # Stats
+        self.read = 0
+        self.acked = 0
+        self.replayed = 0
+        self.claimed = 0
+
+    @classmethod
+    def from_url(cls, redis_url: str, venue: str, group: str, **kwargs) -> "TickStreamReader":
+        import redis
+
+        return cls(redis.from_url(redis_url, decode_responses=True), venue, group, **kwargs)
+
+    def ensure_group(self):
+        """Create the consumer group (and the stream) if it doesn't exist yet."""
+        try:
+            self.redis.xgroup_create(self.stream, self.group, id=self.start_id, mkstream=True)
+            log.info(f"Created consumer group {self.group} on {self.stream}")
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def claim_stale(self) -> List[Entry]:
+        """Take over entries another consumer left unacknowledged too long."""
+        if not self.claim_idle_ms:
+            return []
+        result = self.redis.xautoclaim(
+            self.stream,
+            self.group,
+            self.consumer,
+            min_idle_time=self.claim_idle_ms,
+            start_id="0-0",
+            count=self.batch_size,
+        )
+        entries = _decode_entries(result[1])
+        self.claimed += len(entries)
+        return entries
+
+    def read_batch(self) -> List[Entry]:
+        """Next batch: own pending entries first, then stale ones, then new ticks."""
+        if self._replaying:
+            result = self.redis.xreadgroup(
+                self.group, self.consumer, {self.stream: "0"}, count=self.batch_size
+            )
+            entries = _decode_entries(result[0][1]) if result else []
+            if entries:
+                self.replayed += len(entries)
+                self.read += len(entries)
+                return entries
+            self._replaying = False
+
+        entries = self.claim_stale()
+        if not entries:
+            result = self.redis.xreadgroup(
+                self.group,
+                self.consumer,
+                {self.stream: ">"},
+                count=self.batch_size,
+                block=self.block_ms,
+            )
+            entries = _decode_entries(result[0][1]) if result else []
+        self.read += len(entries)
+        return entries
+
+    def ack(self, entries: List[Entry]):
+        if entries:
+            self.acked += self.redis.xack(self.stream, self.group, *(entry_id for entry_id, _ in entries))
+
+    def iter_batches(self) -> Iterator[List[Entry]]:
+        """
+        Yield batches forever (empty batches are skipped). A batch is
+        acknowledged when the caller asks for the next one, so a crash while
+        processing it leaves it pending for replay.
+        """
+        self.ensure_group()
+        while True:
+            batch = self.read_batch()
+            if not batch:
+                continue
+            yield batch
+            self.ack(batch)
+
+    def summary(self) -> str:
+        return (
+            f"Tick reader {self.group}/{self.consumer} on {self.stream}: read {self.read}, "
+            f"acked {self.acked}, replayed {self.replayed}, claimed {self.claimed}"
+        )
@@ -0,0 +1,151 @@
+"""
+Unit tests for the tick stream reader.
+
+Run with: python -m pytest etl/tick_stream_test.py
+Or: python etl/tick_stream_test.py
+"""
+
+import os
+import sys
+import unittest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from etl.tick_stream import TickStreamReader, normalize_tick
+
+
+class FakeRedis:
+    """
+    Scripted stand-in for the stream commands the reader uses. Each list
+    holds the pages returned by successive calls.
+    """
+
+    def __init__(self, pending=(), stale=(), new=()):
+        self.pending = list(pending)
+        self.stale = list(stale)
+        self.new = list(new)
+        self.calls = []
+        self.acks = []
+
+    def xgroup_create(self, stream, group, id="$", mkstream=False):
+        self.calls.append(("xgroup_create", stream, group))
+        raise Exception("BUSYGROUP Consumer Group name already exists")
+
+    def xreadgroup(self, group, consumer, streams, count=None, block=None):
+        (stream, start), = streams.items()
+        self.calls.append(("xreadgroup", start))
+        pages = self.pending if start == "0" else self.new
+        page = pages.pop(0) if pages else []
+        # Redis answers an exhausted pending read with an empty list, and
+        # a timed-out blocking read with nil
+        if start == ">" and not page:
+            return None
+        return [[stream, page]]
+
+    def xautoclaim(self, stream, group, consumer, min_idle_time, start_id="0-0", count=None):
+        self.calls.append(("xautoclaim", min_idle_time))
+        page = self.stale.pop(0) if self.stale else []
+        return ["0-0", page, []]
+
+    def xack(self, stream, group, *ids):
+        self.acks.append(ids)
+        return len(ids)
+
+
+def entry(entry_id, ticker="KXTEST-25"):
+    return (entry_id, {"ticker": ticker, "yes_price": "45", "ts_ms": "1"})
+
+
+class TestReadBatch(unittest.TestCase):
+    def test_pending_replayed_first(self):
+        redis = FakeRedis(
+            pending=[[entry("1-0"), entry("2-0")]],
+            new=[[entry("3-0")]],
+        )
+        reader = TickStreamReader(redis, "kalshi", "ohlc", consumer="c1")
+
+        batch = reader.read_batch()
+        self.assertEqual([entry_id for entry_id, _ in batch], ["1-0", "2-0"])
+        self.assertTrue(reader._replaying)
+        self.assertEqual(reader.replayed, 2)
+
+        batch = reader.read_batch()
+        self.assertEqual([entry_id for entry_id, _ in batch], ["3-0"])
+        self.assertFalse(reader._replaying)
+        self.assertEqual(reader.replayed, 2)
+        self.assertEqual(reader.read, 3)
+
+        # Once replay is over, pending is not read again
+        reader.read_batch()
+        self.assertEqual([c for c in redis.calls if c == ("xreadgroup", "0")], [("xreadgroup", "0")] * 2)
+
+    def test_claimed_entries_counted(self):
+        redis = FakeRedis(stale=[[entry("1-0"), entry("2-0")]], new=[[entry("3-0")]])
+        reader = TickStreamReader(redis, "kalshi", "ohlc", consumer="c1")
+
+        batch = reader.read_batch()
+        self.assertEqual([entry_id for entry_id, _ in batch], ["1-0", "2-0"])
+        self.assertEqual(reader.claimed, 2)
+        self.assertEqual(reader.read, 2)
+        self.assertNotIn(("xreadgroup", ">"), redis.calls)
+
+        batch = reader.read_batch()
+        self.assertEqual([entry_id for entry_id, _ in batch], ["3-0"])
+        self.assertEqual(reader.claimed, 2)
+
+    def test_claim_disabled(self):
+        redis = FakeRedis(new=[[entry("1-0")]])
+        reader = TickStreamReader(redis, "kalshi", "ohlc", consumer="c1", claim_idle_ms=0)
+        self.assertEqual(len(reader.read_batch()), 1)
+        self.assertNotIn("xautoclaim", [c[0] for c in redis.calls])
+
+    def test_trimmed_entries_decode_empty(self):
+        # Pending entries trimmed from the stream come back with nil fields
+        redis = FakeRedis(pending=[[("1-0", None), (b"2-0", {b"ticker": b"KXTEST-25"})]])
+        reader = TickStreamReader(redis, "kalshi", "ohlc", consumer="c1")
+        self.assertEqual(reader.read_batch(), [("1-0", {}), ("2-0", {"ticker": "KXTEST-25"})])
+
+
+class TestIterBatches(unittest.TestCase):
+    def test_ack_on_next(self):
+        redis = FakeRedis(new=[[entry("1-0")], [], [entry("2-0"), entry("3-0")]])
+        reader = TickStreamReader(redis, "kalshi", "ohlc", consumer="c1")
+        batches = reader.iter_batches()
+
+        first = next(batches)
+        self.assertEqual([entry_id for entry_id, _ in first], ["1-0"])
+        self.assertEqual(redis.acks, [])
+
+        # Asking for the next batch acks the previous one; the empty
+        # read in between is skipped
+        second = next(batches)
+        self.assertEqual([entry_id for entry_id, _ in second], ["2-0", "3-0"])
+        self.assertEqual(redis.acks, [("1-0",)])
+        self.assertEqual(reader.acked, 1)
+        self.assertEqual(redis.calls[0][0], "xgroup_create")
+
+    def test_unacked_when_abandoned(self):
+        redis = FakeRedis(new=[[entry("1-0")]])
+        reader = TickStreamReader(redis, "kalshi", "ohlc", consumer="c1")
+        batches = reader.iter_batches()
+        next(batches)
+        batches.close()
+        self.assertEqual(redis.acks, [])
+
+
+class TestNormalizeTick(unittest.TestCase):
+    def test_drops_none(self):
+        tick = normalize_tick(
+            "KXTEST-25",
+            {"yes_price": 45, "yes_bid": None, "yes_ask": 46, "volume": None, "other": 1},
+            1700000000000,
+        )
+        self.assertEqual(
+            tick,
+            {"ticker": "KXTEST-25", "yes_price": 45, "yes_ask": 46, "ts_ms": 1700000000000},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,23 @@
+-- =====================================================================
+-- DAILY BARS SCHEMA
+-- =====================================================================
+-- State for accumulated daily bars (etl/daily_bars.py).
+-- Run this after the main schema.sql
+
+-- =====================================================================
+-- TABLE: instrument_volume_baseline
+-- Last cumulative volume seen per instrument and source. Written in the
+-- same transaction as the instrument_price_daily merge, so the next run's
+-- volume deltas start exactly where the stored bars stop.
+-- =====================================================================
+
+CREATE TABLE instrument_volume_baseline (
+    instrument_id       BIGINT NOT NULL REFERENCES instruments(id) ON DELETE CASCADE,
+    data_source         TEXT NOT NULL,              -- matches instrument_price_daily.data_source
+    cumulative_volume   NUMERIC NOT NULL,
+
+    -- Audit
+    updated_at          TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+    PRIMARY KEY (instrument_id, data_source)
+);
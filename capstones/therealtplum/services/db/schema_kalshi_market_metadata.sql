@@ -0,0 +1,69 @@
+-- =====================================================================
+-- KALSHI MARKET METADATA SCHEMA
+-- =====================================================================
+-- Parsed Kalshi ticker structure (etl/kalshi_ticker_parser.py), stored
+-- once per instrument so consumers query it instead of reparsing tickers.
+-- Written by etl.kalshi_instruments.
+-- Run this after schema_sports_teams.sql
+
+-- =====================================================================
+-- TABLE: kalshi_market_metadata
+-- One row per Kalshi instrument
+-- =====================================================================
+
+CREATE TABLE kalshi_market_metadata (
+    instrument_id       BIGINT PRIMARY KEY REFERENCES instruments(id) ON DELETE CASCADE,
+    ticker              TEXT NOT NULL,
+
+    -- Classification
+    category            TEXT NOT NULL,              -- 'sports', 'election', 'corporate', 'economic', 'entertainment', 'other'
+    parsed              BOOLEAN NOT NULL,           -- false when no parser recognised the ticker
+    event_type          TEXT,                       -- 'game', 'primary', 'governor', 'Stock Split/Fold', ...
+    market_type         TEXT,                       -- sports: 'game', 'moneyline', 'tie', 'spread', 'other'
+
+    -- Sports
+    sport               TEXT,                       -- 'NBA', 'NCAA Men''s Basketball', ...
+    team_codes          TEXT[],                     -- ticker codes, e.g. ['KU', 'UK']
+    team_ids            BIGINT[],                   -- sports_teams.id per code (NULL where unresolved)
+    outcome             TEXT,                       -- outcome suffix, e.g. 'KU', 'TIE'
+
+    -- Dates
+    event_date          DATE,                       -- game / event / indicator date
+    event_year          SMALLINT,                   -- for year-only tickers (elections, indicators)
+
+    -- Full parser output
+    parsed_fields       JSONB NOT NULL,
+
+    -- instruments.source_payload_hash this row was parsed from, and the
+    -- parser version / team dictionary stamp it was parsed with; rows are
+    -- only reparsed when either changes
+    source_payload_hash TEXT,
+    parser_version      TEXT,
+
+    -- Audit
+    created_at          TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at          TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX kalshi_market_metadata_ticker_idx
+    ON kalshi_market_metadata (ticker);
+
+-- "NBA games next week", "all economic markets in December"
+CREATE INDEX kalshi_market_metadata_category_date_idx
+    ON kalshi_market_metadata (category, event_date);
+
+CREATE INDEX kalshi_market_metadata_sport_date_idx
+    ON kalshi_market_metadata (sport, market_type, event_date)
+    WHERE category = 'sports';
+
+-- Team lookups ("KU moneylines"): team_codes @> ARRAY['KU'], team_ids @> ARRAY[id]
+CREATE INDEX kalshi_market_metadata_team_codes_idx
+    ON kalshi_market_metadata USING GIN (team_codes);
+
+CREATE INDEX kalshi_market_metadata_team_ids_idx
+    ON kalshi_market_metadata USING GIN (team_ids);
+
+-- Trigger for updated_at
+CREATE TRIGGER kalshi_market_metadata_set_updated_at
+BEFORE UPDATE ON kalshi_market_metadata
+FOR EACH ROW EXECUTE FUNCTION set_updated_at_timestamp();
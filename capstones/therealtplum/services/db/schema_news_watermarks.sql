@@ -0,0 +1,24 @@
+-- =====================================================================
+-- NEWS WATERMARKS SCHEMA
+-- =====================================================================
+-- Incremental news fetch state (etl/polygon_news.py).
+-- Run this after the main schema.sql
+
+-- =====================================================================
+-- TABLE: news_fetch_watermarks
+-- Latest published_at returned by each ticker's own news fetch. Kept per
+-- requested ticker rather than derived from news_articles, where an
+-- instrument also gets rows for articles surfaced by other tickers' fetches.
+-- =====================================================================
+
+CREATE TABLE news_fetch_watermarks (
+    source              TEXT NOT NULL,              -- 'polygon'
+    ticker              TEXT NOT NULL,              -- ticker the news request was made for
+    last_published_at   TIMESTAMPTZ NOT NULL,
+
+    -- Audit
+    created_at          TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at          TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+    PRIMARY KEY (source, ticker)
+);